@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from PySide6.QtWidgets import QApplication
 from src.ui.main_window import MainWindow
@@ -11,4 +12,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # needed by the process-pool export engine in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,91 @@
+"""Benchmark batch export: worker threads vs worker processes.
+
+Usage:
+    python scripts/bench_export.py <image folder> [--workers 1,2,4,8] [--limit 200]
+
+Exports the images of the folder with the Pillow compositor into a temporary
+directory, once per engine and worker count, and prints images/s and the speedup
+over one worker. Both engines run the same run_export_job as the app.
+"""
+import argparse
+import concurrent.futures as cf
+import importlib
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.io.file_manager import iter_images  # noqa: E402
+from src.io.pil_exporter import run_export_job  # noqa: E402
+from src.io.process_export import default_worker_count  # noqa: E402
+
+CONFIG = {
+    'text': '© Benchmark', 'font_size': 48, 'opacity': 0.6, 'color': '#ffffff', 'rotation': -20,
+    'position': {'x': 0.5, 'y': 0.5}, 'anchor': 'center', 'shadow': True, 'shadow_alpha': 0.5,
+}
+
+
+def _jobs(paths, out_dir):
+    return [{'src': p, 'out': os.path.join(out_dir, f'{i:05d}.jpg'), 'config': CONFIG,
+             'fmt': 'JPEG', 'quality': 90, 'engine': 'pil'} for i, p in enumerate(paths)]
+
+
+def _warm(_):
+    # the first job of each worker would otherwise pay for the imports
+    importlib.import_module('src.io.pil_exporter')
+    return os.getpid()
+
+
+def run(engine: str, workers: int, paths) -> float:
+    out_dir = tempfile.mkdtemp(prefix='wm_bench_')
+    try:
+        jobs = _jobs(paths, out_dir)
+        if engine == 'processes':
+            executor = cf.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            # start the workers before timing, as the app keeps its pool warm
+            list(executor.map(_warm, range(workers * 4)))
+        else:
+            executor = cf.ThreadPoolExecutor(max_workers=workers)
+        with executor:
+            t0 = time.perf_counter()
+            failed = sum(1 for _, out, err, _ in executor.map(run_export_job, jobs) if err is not None)
+            secs = time.perf_counter() - t0
+        if failed:
+            print(f'  ({failed} exports failed)')
+        return len(jobs) / secs
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('folder')
+    ap.add_argument('--workers', default='')
+    ap.add_argument('--limit', type=int, default=200)
+    ap.add_argument('--engines', default='threads,processes')
+    args = ap.parse_args()
+
+    paths = list(iter_images(args.folder, recursive=True))[:args.limit]
+    if not paths:
+        sys.exit(f'no images in {args.folder}')
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(',')]
+    else:
+        n = default_worker_count()
+        counts = sorted({1, 2, 4, 8, 16, n} & set(range(1, n + 1)))
+    print(f'{len(paths)} images, {default_worker_count()} CPUs')
+    for engine in args.engines.split(','):
+        base = None
+        for w in counts:
+            rate = run(engine, w, paths)
+            base = base or rate
+            print(f'{engine:>9}  workers={w:<3} {rate:8.1f} img/s  x{rate / base:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -40,3 +40,35 @@ def save_config(cfg: Dict):
     p = cfg_dir / 'config.json'
     with open(p, 'w', encoding='utf-8') as f:
         json.dump(cfg, f, ensure_ascii=False, indent=2)
+
+
+# named worker pools (see src/utils/pools.py); override per pool in config.json, e.g.
+#   "pools": {"export": {"threads": 4, "priority": "low"}}
+# threads: 0 = derived from the CPU count; priority: lowest/low/normal/high;
+# queue: jobs a pool's scheduler keeps submitted at once (0 = one per thread)
+DEFAULT_POOLS = {
+    'thumbnails': {'threads': 0, 'priority': 'normal', 'queue': 0},
+    'preview': {'threads': 2, 'priority': 'high', 'queue': 0},
+    'export': {'threads': 0, 'priority': 'low', 'queue': 0},
+    'io': {'threads': 2, 'priority': 'normal', 'queue': 0},
+}
+
+
+def get_pool_settings(cfg: Dict = None) -> Dict[str, Dict]:
+    """DEFAULT_POOLS merged with the 'pools' section of cfg (or the saved config)."""
+    if cfg is None:
+        try:
+            cfg = load_config()
+        except Exception:
+            cfg = {}
+    user = cfg.get('pools') if isinstance(cfg, dict) else None
+    out = {}
+    for name, defaults in DEFAULT_POOLS.items():
+        merged = dict(defaults)
+        override = user.get(name) if isinstance(user, dict) else None
+        if isinstance(override, dict):
+            for k in defaults:
+                if k in override:
+                    merged[k] = override[k]
+        out[name] = merged
+    return out
@@ -1,265 +1,139 @@
-"""Core image processing functions: preview composition and final export helpers.
+"""Core image processing functions: watermark stamps and final export helpers.
 
-This module contains a preview compositor that uses Qt types (QPixmap/QPainter) so it
-should be called from the UI thread. Final export functions (Pillow-based) will be
-added later and reuse the same watermark parameters.
+The interactive preview is layered: PreviewLabel draws the cached preview proxy
+and, over it, the pre-rendered watermark stamp from get_watermark_stamp (rendered
+off the UI thread, at draft quality while the user is interacting). Export
+composition is available both on QImage (compose_export_qimage) and Qt-free on
+Pillow (compose_image_pil); all of them use the same watermark parameters.
 """
-from typing import Optional, Tuple
+import math
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
 
-from PySide6.QtGui import QPixmap, QPainter, QFont, QColor, QPainterPath, QPen, QBrush, QImage
-from PySide6.QtCore import Qt, QRect
+from PySide6.QtGui import (QPainter, QFont, QFontMetrics, QColor, QPainterPath, QPen, QBrush,
+                           QImage, QImageIOHandler, QImageReader, QTransform)
+from PySide6.QtCore import Qt, QRectF, QSize
 
+from src.core.watermark import (resize_factor, scale_watermark_config, shadow_alpha, stamp_cache_key,
+                                stamp_metrics, stamp_top_left)
 
-def compose_preview_qpixmap(base_pixmap: QPixmap, watermark_config: dict) -> QPixmap:
-    """Compose a preview QPixmap by drawing text watermark onto a copy of base_pixmap.
 
-    base_pixmap should already be scaled to the preview size.
-    watermark_config fields used:
-      - text: str
-      - font_family: str
-      - font_size: int
-      - opacity: float (0.0-1.0)
-      - color: QColor or hex string
-      - rotation: float degrees
-      - position: {'x': float, 'y': float} relative 0..1
+def compose_image_pil(image_path: str, watermark_config: dict, output_size: Optional[Tuple[int, int]] = None):
+    """Pillow-based export compositor; returns a PIL.Image (or None on decode failure).
 
-    Returns a new QPixmap.
+    The implementation lives in src.core.pil_compositor, which has no Qt dependency
+    so it can also be used from worker processes.
     """
-    if base_pixmap.isNull():
-        return base_pixmap
+    from src.core.pil_compositor import compose_image_pil as _compose
+    return _compose(image_path, watermark_config, output_size)
 
-    canvas = QPixmap(base_pixmap)
-    painter = QPainter(canvas)
-    try:
-        # prepare font
-        font_family = watermark_config.get('font_family', 'Sans')
-        font_size = int(watermark_config.get('font_size', 36))
-        font = QFont(font_family, font_size)
-        # bold/italic
-        try:
-            font.setBold(bool(watermark_config.get('bold', False)))
-            font.setItalic(bool(watermark_config.get('italic', False)))
-        except Exception:
-            pass
-        painter.setFont(font)
-
-        # color
-        color = watermark_config.get('color', '#FFFFFF')
-        if isinstance(color, QColor):
-            pen_color = QColor(color)
-        else:
-            pen_color = QColor(color)
-
-        opacity = float(watermark_config.get('opacity', 0.7))
-
-        text = watermark_config.get('text', '')
-        if not text:
-            return canvas
-
-        # calculate position
-        pos = watermark_config.get('position', {'x': 0.5, 'y': 0.5})
-        px = int(pos.get('x', 0.5) * canvas.width())
-        py = int(pos.get('y', 0.5) * canvas.height())
-
-        # rotation
-        rotation = float(watermark_config.get('rotation', 0.0))
-
-        # set up painter path for text so we can draw outline and shadow
-        fm = painter.fontMetrics()
-        text_w = fm.horizontalAdvance(text)
-        text_h = fm.height()
-        ascent = fm.ascent()
-
-        # build path centered at origin
-        path = QPainterPath()
-        # baseline y: ascent relative to vertical center
-        baseline_y = int(ascent - (text_h / 2))
-        path.addText(-text_w / 2, baseline_y, font, text)
-
-        painter.save()
-        painter.translate(px, py)
-        # apply anchor translation
-        anchor_name = str(watermark_config.get('anchor', 'center'))
-        anchor_map = {
-            'top-left': (0.0, 0.0), 'top-center': (0.5, 0.0), 'top-right': (1.0, 0.0),
-            'center-left': (0.0, 0.5), 'center': (0.5, 0.5), 'center-right': (1.0, 0.5),
-            'bottom-left': (0.0, 1.0), 'bottom-center': (0.5, 1.0), 'bottom-right': (1.0, 1.0),
-        }
-        ax, ay = anchor_map.get(anchor_name, (0.5, 0.5))
-        dx = (0.5 - ax) * text_w
-        dy = (0.5 - ay) * text_h
-        painter.translate(dx, dy)
-        if rotation != 0.0:
-            painter.rotate(rotation)
 
-        # shadow
-        shadow_enabled = bool(watermark_config.get('shadow', False))
-        shadow_offset = int(watermark_config.get('shadow_offset', max(2, font_size // 8)))
-        shadow_color = QColor(watermark_config.get('shadow_color', '#000000'))
-        shadow_color.setAlphaF(min(1.0, watermark_config.get('shadow_alpha', 0.5)))
-        if shadow_enabled:
-            try:
-                painter.save()
-                painter.translate(shadow_offset, shadow_offset)
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(QBrush(shadow_color))
-                painter.drawPath(path)
-            finally:
-                painter.restore()
-
-        # outline (stroke)
-        outline_enabled = bool(watermark_config.get('outline', False))
-        outline_size = int(watermark_config.get('outline_size', max(1, font_size // 14)))
-        outline_color = QColor(watermark_config.get('outline_color', '#000000'))
-        outline_color.setAlphaF(min(1.0, watermark_config.get('outline_alpha', opacity)))
-        if outline_enabled and outline_size > 0:
-            pen = QPen(outline_color)
-            pen.setWidth(outline_size)
-            pen.setJoinStyle(Qt.RoundJoin)
-            painter.setPen(pen)
-            painter.setBrush(Qt.NoBrush)
-            painter.drawPath(path)
+# ---------------------------------------------------------------------------
+# Pre-rendered watermark stamps
+#
+# Every image of a batch uses the same watermark_config, so the styled text
+# (shadow + outline + fill, rotated) is rasterized once into an ARGB stamp and
+# then simply blitted onto each image. Stamps are kept in a small LRU keyed by
+# a hash of the style fields and the effective (bucketed) font size.
+# ---------------------------------------------------------------------------
 
-        # fill text with main color at specified opacity
-        pen_color.setAlphaF(opacity)
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(QBrush(pen_color))
-        painter.drawPath(path)
+STAMP_CACHE_MAX = 32
 
-        painter.restore()
+# stamp quality: interactive previews use a half-resolution draft stamp drawn
+# scaled up, then a full one once the input has settled
+QUALITY_DRAFT = 'draft'
+QUALITY_FULL = 'full'
+DRAFT_STAMP_SCALE = 0.5
+_stamp_cache: 'OrderedDict[str, WatermarkStamp]' = OrderedDict()
+_stamp_lock = threading.Lock()
 
-    finally:
-        painter.end()
-
-    # optionally draw a small position handle (in canvas coordinates) to aid dragging
-    try:
-        show_handle = bool(watermark_config.get('show_handle', False))
-    except Exception:
-        show_handle = False
 
-    if show_handle:
-        hp = QPainter(canvas)
-        try:
-            pos = watermark_config.get('position', {'x': 0.5, 'y': 0.5})
-            px = int(pos.get('x', 0.5) * canvas.width())
-            py = int(pos.get('y', 0.5) * canvas.height())
-            # handle size relative to image size
-            r = max(6, int(min(canvas.width(), canvas.height()) * 0.02))
-            outer = QColor('#000000')
-            inner = QColor('#FFFFFF')
-            outer.setAlphaF(0.8)
-            inner.setAlphaF(0.95)
-            hp.setPen(outer)
-            hp.setBrush(outer)
-            hp.drawEllipse(px - r, py - r, r * 2, r * 2)
-            hp.setPen(inner)
-            hp.setBrush(inner)
-            hp.drawEllipse(px - r//2, py - r//2, (r//2) * 2, (r//2) * 2)
-        finally:
-            hp.end()
-    return canvas
+class WatermarkStamp(NamedTuple):
+    """A pre-rendered watermark: image plus where the text centre sits in it.
 
+    Draft stamps are rendered at scale < 1; their pixel fields are in stamp
+    pixels and must be divided by scale to place them (see stamp_placement).
+    """
+    image: QImage
+    origin_x: int
+    origin_y: int
+    text_w: int
+    text_h: int
+    scale: float = 1.0
 
-def compose_image_pil(image_path: str, watermark_config: dict, output_size: Optional[Tuple[int, int]] = None):
-    """Placeholder for Pillow-based export; to be implemented later."""
-    return None
 
+def clear_stamp_cache():
+    with _stamp_lock:
+        _stamp_cache.clear()
 
-def compose_export_qimage(image_path: str, watermark_config: dict) -> Optional[QImage]:
-    """Compose and return a QImage with watermark drawn at the original image size.
 
-    This mirrors compose_preview_qpixmap but works on QImage so it can be used in
-    non-GUI threads if needed. It loads the source image using QImage, converts to a
-    paintable format, and draws text with outline/shadow based on watermark_config.
-    """
-    base = QImage(image_path)
-    if base.isNull():
+def _render_stamp(watermark_config: dict, scale: float = 1.0) -> Optional[WatermarkStamp]:
+    text = watermark_config.get('text', '')
+    if not text:
         return None
-    if base.format() != QImage.Format_ARGB32:
-        base = base.convertToFormat(QImage.Format_ARGB32)
+    font_size, outline_size, shadow_offset = stamp_metrics(watermark_config)
 
-    canvas = QImage(base)
-    painter = QPainter(canvas)
+    font = QFont(watermark_config.get('font_family', 'Sans'), font_size)
     try:
-        # prepare font
-        font_family = watermark_config.get('font_family', 'Sans')
-        font_size = int(watermark_config.get('font_size', 36))
-        font = QFont(font_family, font_size)
-        try:
-            font.setBold(bool(watermark_config.get('bold', False)))
-            font.setItalic(bool(watermark_config.get('italic', False)))
-        except Exception:
-            pass
-        painter.setFont(font)
-
-        # color
-        color = watermark_config.get('color', '#FFFFFF')
-        pen_color = QColor(color) if not isinstance(color, QColor) else QColor(color)
-        opacity = float(watermark_config.get('opacity', 0.7))
-        text = watermark_config.get('text', '')
-        if not text:
-            return canvas
-
-        # position
-        pos = watermark_config.get('position', {'x': 0.5, 'y': 0.5})
-        px = int(pos.get('x', 0.5) * canvas.width())
-        py = int(pos.get('y', 0.5) * canvas.height())
-
-        rotation = float(watermark_config.get('rotation', 0.0))
-
-        fm = painter.fontMetrics()
-        text_w = fm.horizontalAdvance(text)
-        text_h = fm.height()
-        ascent = fm.ascent()
-
-        path = QPainterPath()
-        baseline_y = int(ascent - (text_h / 2))
-        path.addText(-text_w / 2, baseline_y, font, text)
-
-        painter.save()
-        painter.translate(px, py)
-        # apply anchor translation
-        anchor_name = str(watermark_config.get('anchor', 'center'))
-        anchor_map = {
-            'top-left': (0.0, 0.0), 'top-center': (0.5, 0.0), 'top-right': (1.0, 0.0),
-            'center-left': (0.0, 0.5), 'center': (0.5, 0.5), 'center-right': (1.0, 0.5),
-            'bottom-left': (0.0, 1.0), 'bottom-center': (0.5, 1.0), 'bottom-right': (1.0, 1.0),
-        }
-        ax, ay = anchor_map.get(anchor_name, (0.5, 0.5))
-        dx = (0.5 - ax) * text_w
-        dy = (0.5 - ay) * text_h
-        painter.translate(dx, dy)
+        font.setBold(bool(watermark_config.get('bold', False)))
+        font.setItalic(bool(watermark_config.get('italic', False)))
+    except Exception:
+        pass
+    # measure against a QImage so metrics use the image DPI, like painter.fontMetrics()
+    fm = QFontMetrics(font, QImage(1, 1, QImage.Format_ARGB32_Premultiplied))
+    text_w = fm.horizontalAdvance(text)
+    text_h = fm.height()
+    ascent = fm.ascent()
+
+    # path centered at origin, exactly as the per-image painter used to build it
+    path = QPainterPath()
+    baseline_y = int(ascent - (text_h / 2))
+    path.addText(-text_w / 2, baseline_y, font, text)
+
+    opacity = float(watermark_config.get('opacity', 0.7))
+    rotation = float(watermark_config.get('rotation', 0.0))
+
+    shadow_enabled = bool(watermark_config.get('shadow', False))
+    shadow_color = QColor(watermark_config.get('shadow_color', '#000000'))
+    shadow_color.setAlphaF(shadow_alpha(watermark_config))
+
+    outline_enabled = bool(watermark_config.get('outline', False)) and outline_size > 0
+    outline_color = QColor(watermark_config.get('outline_color', '#000000'))
+    outline_color.setAlphaF(min(1.0, float(watermark_config.get('outline_alpha', opacity))))
+
+    # bounding box of everything we draw, in rotated (image) space
+    local = path.boundingRect()
+    if shadow_enabled:
+        local = local.united(local.translated(shadow_offset, shadow_offset))
+    pad = (outline_size / 2.0 if outline_enabled else 0.0) + 2.0
+    local = local.adjusted(-pad, -pad, pad, pad)
+    xform = QTransform()
+    if rotation != 0.0:
+        xform.rotate(rotation)
+    bounds = xform.mapRect(local)
+    origin_x = int(math.floor(-bounds.left()))
+    origin_y = int(math.floor(-bounds.top()))
+    w = max(1, int(math.ceil(bounds.right())) + origin_x)
+    h = max(1, int(math.ceil(bounds.bottom())) + origin_y)
+
+    img = QImage(w, h, QImage.Format_ARGB32_Premultiplied)
+    img.fill(Qt.transparent)
+    painter = QPainter(img)
+    try:
+        painter.translate(origin_x, origin_y)
         if rotation != 0.0:
             painter.rotate(rotation)
 
-        # shadow
-        shadow_enabled = bool(watermark_config.get('shadow', False))
-        shadow_offset = int(watermark_config.get('shadow_offset', max(2, font_size // 8)))
-        shadow_color = QColor(watermark_config.get('shadow_color', '#000000'))
-        try:
-            # shadow_alpha may be 0..1
-            sa = watermark_config.get('shadow_alpha', 0.5)
-            if sa > 1:
-                sa = sa / 100.0
-        except Exception:
-            sa = 0.5
-        shadow_color.setAlphaF(min(1.0, float(sa)))
         if shadow_enabled:
-            try:
-                painter.save()
-                painter.translate(shadow_offset, shadow_offset)
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(QBrush(shadow_color))
-                painter.drawPath(path)
-            finally:
-                painter.restore()
-
-        # outline
-        outline_enabled = bool(watermark_config.get('outline', False))
-        outline_size = int(watermark_config.get('outline_size', max(1, font_size // 14)))
-        outline_color = QColor(watermark_config.get('outline_color', '#000000'))
-        outline_color.setAlphaF(min(1.0, float(watermark_config.get('outline_alpha', opacity))))
-        if outline_enabled and outline_size > 0:
+            painter.save()
+            painter.translate(shadow_offset, shadow_offset)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(shadow_color))
+            painter.drawPath(path)
+            painter.restore()
+
+        if outline_enabled:
             pen = QPen(outline_color)
             pen.setWidth(outline_size)
             pen.setJoinStyle(Qt.RoundJoin)
@@ -267,15 +141,133 @@ def compose_export_qimage(image_path: str, watermark_config: dict) -> Optional[Q
             painter.setBrush(Qt.NoBrush)
             painter.drawPath(path)
 
-        # fill text
+        pen_color = QColor(watermark_config.get('color', '#FFFFFF'))
         pen_color.setAlphaF(opacity)
         painter.setPen(Qt.NoPen)
         painter.setBrush(QBrush(pen_color))
         painter.drawPath(path)
-
-        painter.restore()
     finally:
         painter.end()
+    return WatermarkStamp(img, origin_x, origin_y, text_w, text_h, scale)
+
+
+def get_watermark_stamp(watermark_config: dict, quality: str = QUALITY_FULL) -> Optional[WatermarkStamp]:
+    """Return the rendered stamp for watermark_config, rendering it on a cache miss.
+
+    quality=QUALITY_DRAFT renders at DRAFT_STAMP_SCALE (about a quarter of the
+    work) for interactive previews. Returns None when there is no text to draw.
+    Safe to call from worker threads.
+    """
+    if not watermark_config.get('text', ''):
+        return None
+    key = stamp_cache_key(watermark_config)
+    scale = 1.0
+    if quality == QUALITY_DRAFT:
+        scale = DRAFT_STAMP_SCALE
+        key += ':draft'
+    with _stamp_lock:
+        stamp = _stamp_cache.get(key)
+        if stamp is not None:
+            _stamp_cache.move_to_end(key)
+            return stamp
+    if scale != 1.0:
+        stamp = _render_stamp(scale_watermark_config(watermark_config, scale), scale)
+    else:
+        stamp = _render_stamp(watermark_config)
+    if stamp is None:
+        return None
+    with _stamp_lock:
+        _stamp_cache[key] = stamp
+        _stamp_cache.move_to_end(key)
+        while len(_stamp_cache) > STAMP_CACHE_MAX:
+            _stamp_cache.popitem(last=False)
+    return stamp
+
+
+def stamp_placement(stamp: WatermarkStamp, watermark_config: dict, width: int, height: int) -> QRectF:
+    """Where stamp goes on a width x height image, in image pixels (scaled for drafts)."""
+    s = stamp.scale or 1.0
+    x, y = stamp_top_left((stamp.origin_x / s, stamp.origin_y / s), (stamp.text_w / s, stamp.text_h / s),
+                          watermark_config, width, height)
+    return QRectF(x, y, stamp.image.width() / s, stamp.image.height() / s)
+
+
+def read_export_qimage(image_path: str, target_size: Optional[Tuple[int, int]] = None) -> Tuple[QImage, Tuple[int, int]]:
+    """Decode image_path for export, already scaled to target_size when given.
+
+    EXIF orientation is applied, so sizes match probe_image_size. JPEG sources are
+    decoded at the smallest power-of-two reduction that still covers target_size
+    (libjpeg DCT scaling via QImageReader.setScaledSize) and the remainder is a
+    smooth rescale. Returns (image, original_size); the image is null on decode
+    failure.
+    """
+    reader = QImageReader(image_path)
+    reader.setAutoTransform(True)
+    raw = reader.size()
+    # reader.size()/setScaledSize work on the stored (unrotated) orientation
+    swapped = bool(reader.transformation() & QImageIOHandler.TransformationRotate90)
+    src_size = (0, 0)
+    if raw.isValid():
+        src_size = (raw.height(), raw.width()) if swapped else (raw.width(), raw.height())
+    tw = th = 0
+    if target_size and len(target_size) == 2:
+        tw, th = int(target_size[0]), int(target_size[1])
+    if tw > 0 and th > 0 and raw.isValid() and bytes(reader.format()).lower() in (b'jpeg', b'jpg'):
+        rw, rh = (th, tw) if swapped else (tw, th)
+        k = 1
+        while k < 8 and raw.width() // (k * 2) >= rw and raw.height() // (k * 2) >= rh:
+            k *= 2
+        if k > 1:
+            reader.setScaledSize(QSize(math.ceil(raw.width() / k), math.ceil(raw.height() / k)))
+    img = reader.read()
+    if img.isNull():
+        return img, src_size
+    if src_size == (0, 0):
+        src_size = (img.width(), img.height())
+    if tw > 0 and th > 0 and (img.width(), img.height()) != (tw, th):
+        img = img.scaled(tw, th, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return img, src_size
+
+
+def compose_export_qimage(image_path: str, watermark_config: dict,
+                          target_size: Optional[Tuple[int, int]] = None) -> Optional[QImage]:
+    """Compose and return a QImage with the watermark drawn, at the original image
+    size or, when target_size is given, scaled to target_size.
+
+    Works on QImage so it can be used in non-GUI threads. The styled text comes
+    from the shared stamp cache (see get_watermark_stamp) and is blitted at the
+    anchor/position, as the preview draws it.
+
+    With target_size the source is downscaled first (see read_export_qimage) and the
+    font/outline/shadow metrics are rescaled to match, so the watermark is composed
+    at output resolution with the same proportions.
+    """
+    base, src_size = read_export_qimage(image_path, target_size)
+    if base.isNull():
+        return None
+    if (base.width(), base.height()) != src_size:
+        watermark_config = scale_watermark_config(
+            watermark_config, resize_factor(src_size, (base.width(), base.height())))
+    if base.format() != QImage.Format_ARGB32:
+        base = base.convertToFormat(QImage.Format_ARGB32)
+
+    # paint straight onto the decoded image; a QImage(base) copy would detach into
+    # a second full-size buffer on the first paint
+    _draw_watermark(base, watermark_config)
+    return base
+
+
+def _draw_watermark(canvas: QImage, watermark_config: dict):
+    # blit the cached stamp at the anchor/position, plus the drag handle if enabled
+    stamp = get_watermark_stamp(watermark_config)
+    if stamp is not None:
+        x, y = stamp_top_left((stamp.origin_x, stamp.origin_y), (stamp.text_w, stamp.text_h),
+                              watermark_config, canvas.width(), canvas.height())
+        painter = QPainter(canvas)
+        try:
+            painter.drawImage(x, y, stamp.image)
+        finally:
+            painter.end()
 
     # handle marker if needed
     try:
@@ -296,4 +288,3 @@ def compose_export_qimage(image_path: str, watermark_config: dict) -> Optional[Q
         finally:
             hp.end()
 
-    return canvas
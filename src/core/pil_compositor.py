@@ -0,0 +1,519 @@
+"""Qt-free export compositor built on Pillow (+ NumPy when available).
+
+Produces the same result as compose_export_qimage (text stamp with shadow,
+outline, rotation, nine-grid anchor and relative position) without needing a
+QGuiApplication, so it can run in worker processes. The watermark is rendered
+once into an RGBA stamp (cached like the Qt stamps) and blended over only its
+bounding box of the target image.
+"""
+import functools
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageColor, ImageDraw, ImageFile, ImageFilter, ImageFont, ImageOps
+
+try:
+    import numpy as np
+except Exception:  # NumPy is optional; Pillow's alpha_composite is the fallback
+    np = None
+
+from src.core.watermark import (resize_factor, scale_watermark_config, shadow_alpha, stamp_cache_key,
+                                stamp_metrics, stamp_top_left)
+from src.io.probe import probe_orientation
+
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+try:
+    _BICUBIC = Image.Resampling.BICUBIC
+    _LANCZOS = Image.Resampling.LANCZOS
+except Exception:
+    _BICUBIC = Image.BICUBIC
+    _LANCZOS = Image.ANTIALIAS
+
+# Qt paints QImage at 96 dpi, so a QFont point size maps to this many pixels
+_PT_TO_PX = 96.0 / 72.0
+
+# 16-bit grayscale modes Pillow decodes high-bit-depth TIFF/PNG into
+_MODES_16 = ('I;16', 'I;16L', 'I;16B', 'I;16N')
+
+STAMP_CACHE_MAX = 32
+_stamp_cache: 'OrderedDict[str, PilStamp]' = OrderedDict()
+_stamp_lock = threading.Lock()
+
+_font_index: Optional[Dict[Tuple[str, bool, bool], Tuple[str, int]]] = None
+_font_lock = threading.Lock()
+
+# Pillow has no per-glyph fallback: when the chosen font lacks glyphs of the text,
+# the first of these that covers it is used instead. CJK families come first for
+# text the Latin fonts cannot show (the UI, and so most watermarks, is Chinese)
+_LATIN_FALLBACKS = ('dejavu sans', 'arial', 'helvetica', 'liberation sans')
+_CJK_FALLBACKS = (
+    'microsoft yahei', 'microsoft yahei ui', 'dengxian', 'simhei', 'simsun', 'pingfang sc',
+    'hiragino sans gb', 'heiti sc', 'noto sans cjk sc', 'noto sans sc', 'source han sans sc',
+    'source han sans cn', 'wenquanyi micro hei', 'wenquanyi zen hei', 'droid sans fallback',
+    'arial unicode ms',
+)
+# faces probed per .ttc collection at most
+_TTC_MAX_FACES = 64
+
+
+class PilStamp(NamedTuple):
+    """A pre-rendered RGBA watermark plus where the text centre sits in it."""
+    image: Image.Image
+    origin_x: int
+    origin_y: int
+    text_w: int
+    text_h: int
+
+
+# ----- fonts -----
+
+def _font_dirs():
+    dirs = []
+    if sys.platform.startswith('win'):
+        windir = os.environ.get('WINDIR', r'C:\Windows')
+        dirs.append(Path(windir) / 'Fonts')
+        local = os.environ.get('LOCALAPPDATA')
+        if local:
+            dirs.append(Path(local) / 'Microsoft' / 'Windows' / 'Fonts')
+    elif sys.platform == 'darwin':
+        dirs += [Path('/System/Library/Fonts'), Path('/Library/Fonts'), Path.home() / 'Library' / 'Fonts']
+    else:
+        dirs += [Path('/usr/share/fonts'), Path('/usr/local/share/fonts'),
+                 Path.home() / '.fonts', Path.home() / '.local' / 'share' / 'fonts']
+    return [d for d in dirs if d.exists()]
+
+
+def _build_font_index() -> Dict[Tuple[str, bool, bool], Tuple[str, int]]:
+    # (family, bold, italic) -> (file, face index); every face of a .ttc is indexed
+    index: Dict[Tuple[str, bool, bool], Tuple[str, int]] = {}
+    for d in _font_dirs():
+        for root, _, files in os.walk(d):
+            for f in files:
+                if not f.lower().endswith(('.ttf', '.otf', '.ttc')):
+                    continue
+                fp = os.path.join(root, f)
+                faces = _TTC_MAX_FACES if f.lower().endswith('.ttc') else 1
+                for face in range(faces):
+                    try:
+                        family, style = ImageFont.truetype(fp, 12, index=face).getname()
+                    except Exception:
+                        break
+                    style = (style or '').lower()
+                    key = (str(family).lower(), 'bold' in style, 'italic' in style or 'oblique' in style)
+                    index.setdefault(key, (fp, face))
+    return index
+
+
+@functools.lru_cache(maxsize=256)
+def _covers(path: str, face: int, text: str) -> bool:
+    """True if the font has a glyph for every non-blank character of text."""
+    try:
+        font = ImageFont.truetype(path, 24, index=face)
+    except Exception:
+        return False
+
+    def glyph(ch):
+        left, top, right, bottom = font.getbbox(ch)
+        im = Image.new('L', (max(1, right - left), max(1, bottom - top)))
+        ImageDraw.Draw(im).text((-left, -top), ch, font=font, fill=255)
+        return im.size, im.tobytes()
+
+    # a noncharacter always renders as .notdef (the empty box)
+    notdef = glyph('\uffff')
+    return all(ch.isspace() or glyph(ch) != notdef for ch in set(text))
+
+
+def resolve_font(family: str, bold: bool = False, italic: bool = False,
+                 text: str = '') -> Optional[Tuple[str, int]]:
+    """(font file, face index) for a Qt font family name; None if nothing matches.
+
+    With text, a font lacking some of its glyphs is replaced by the first fallback
+    (CJK families included) that has them all, like Qt's per-glyph fallback would.
+    """
+    global _font_index
+    with _font_lock:
+        if _font_index is None:
+            _font_index = _build_font_index()
+        index = _font_index
+
+    def lookup(fam):
+        for key in ((fam, bold, italic), (fam, bold, False), (fam, False, False)):
+            if key in index:
+                return index[key]
+        return None
+
+    chosen = lookup((family or '').lower())
+    if chosen is not None and (not text or _covers(chosen[0], chosen[1], text)):
+        return chosen
+    # same fallbacks Qt would typically land on for 'Sans'
+    fallbacks = [f for f in (lookup(fam) for fam in _LATIN_FALLBACKS + _CJK_FALLBACKS) if f is not None]
+    if text:
+        for font in fallbacks:
+            if _covers(font[0], font[1], text):
+                return font
+    if chosen is not None:
+        return chosen
+    return fallbacks[0] if fallbacks else None
+
+
+def resolve_font_path(family: str, bold: bool = False, italic: bool = False) -> Optional[str]:
+    """Find a font file for a Qt font family name; None if nothing matches."""
+    font = resolve_font(family, bold, italic)
+    return font[0] if font else None
+
+
+def _load_font(watermark_config: dict, font_size: int):
+    px = max(1, int(round(font_size * _PT_TO_PX)))
+    bold = bool(watermark_config.get('bold', False))
+    italic = bool(watermark_config.get('italic', False))
+    font = resolve_font(watermark_config.get('font_family', 'Sans'), bold, italic,
+                        str(watermark_config.get('text', '')))
+    if font:
+        try:
+            return ImageFont.truetype(font[0], px, index=font[1])
+        except Exception:
+            pass
+    try:
+        return ImageFont.load_default(px)
+    except TypeError:
+        # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+# ----- stamp rendering -----
+
+def _rgba(color, alpha: float) -> Tuple[int, int, int, int]:
+    try:
+        r, g, b = ImageColor.getrgb(str(color))[:3]
+    except Exception:
+        r, g, b = 255, 255, 255
+    return r, g, b, int(round(max(0.0, min(1.0, alpha)) * 255))
+
+
+def _layer(mask: Image.Image, rgba: Tuple[int, int, int, int]) -> Image.Image:
+    layer = Image.new('RGBA', mask.size, rgba[:3] + (0,))
+    layer.putalpha(mask.point(lambda v: v * rgba[3] // 255))
+    return layer
+
+
+def _rotate_about(img: Image.Image, ox: int, oy: int, degrees: float) -> Tuple[Image.Image, int, int]:
+    """Rotate img about (ox, oy) like QPainter.rotate (clockwise for positive angles).
+
+    The output is expanded to hold the whole rotated image; returns it with the new
+    position of (ox, oy).
+    """
+    rad = math.radians(degrees)
+    cos, sin = math.cos(rad), math.sin(rad)
+    w, h = img.size
+    xs, ys = [], []
+    for cx, cy in ((0, 0), (w, 0), (0, h), (w, h)):
+        rx, ry = cx - ox, cy - oy
+        xs.append(rx * cos - ry * sin)
+        ys.append(rx * sin + ry * cos)
+    nox = int(math.ceil(-min(xs)))
+    noy = int(math.ceil(-min(ys)))
+    size = (nox + int(math.ceil(max(xs))) + 1, noy + int(math.ceil(max(ys))) + 1)
+    # inverse mapping: output pixel -> source pixel
+    data = (cos, sin, ox - cos * nox - sin * noy,
+            -sin, cos, oy + sin * nox - cos * noy)
+    # transform premultiplied to avoid dark fringes along the edges
+    out = img.convert('RGBa').transform(size, Image.AFFINE, data, resample=_BICUBIC).convert('RGBA')
+    return out, nox, noy
+
+
+def _render_stamp(watermark_config: dict) -> Optional[PilStamp]:
+    text = watermark_config.get('text', '')
+    if not text:
+        return None
+    font_size, outline_size, shadow_offset = stamp_metrics(watermark_config)
+    font = _load_font(watermark_config, font_size)
+    try:
+        ascent, descent = font.getmetrics()
+    except Exception:
+        ascent, descent = font_size, 0
+    text_h = ascent + descent
+    text_w = int(round(font.getlength(text)))
+    baseline_y = int(ascent - (text_h / 2))
+
+    opacity = float(watermark_config.get('opacity', 0.7))
+    rotation = float(watermark_config.get('rotation', 0.0))
+    shadow_enabled = bool(watermark_config.get('shadow', False))
+    outline_enabled = bool(watermark_config.get('outline', False)) and outline_size > 0
+    half_stroke = int(math.ceil(outline_size / 2.0)) if outline_enabled else 0
+
+    # unrotated canvas around the text box; (ox, oy) is the text centre
+    pad = half_stroke + 2 + int(font_size * _PT_TO_PX * 0.1)
+    extra = shadow_offset if shadow_enabled else 0
+    ox = int(math.ceil(text_w / 2)) + pad
+    oy = ascent - baseline_y + pad
+    size = (2 * ox + extra, oy + baseline_y + descent + pad + extra)
+    text_xy = (ox - text_w / 2, oy + baseline_y)
+
+    fill_mask = Image.new('L', size, 0)
+    ImageDraw.Draw(fill_mask).text(text_xy, text, font=font, fill=255, anchor='ls')
+
+    layers = []
+    if shadow_enabled:
+        shadow_mask = ImageChops.offset(fill_mask, shadow_offset, shadow_offset)
+        layers.append(_layer(shadow_mask, _rgba(watermark_config.get('shadow_color', '#000000'),
+                                                shadow_alpha(watermark_config))))
+    if outline_enabled:
+        # a Qt pen is centred on the glyph edge: half outside, half inside the fill
+        inner = outline_size - half_stroke
+        outer = Image.new('L', size, 0)
+        ImageDraw.Draw(outer).text(text_xy, text, font=font, fill=255, anchor='ls',
+                                   stroke_width=half_stroke, stroke_fill=255)
+        if inner > 0:
+            # box-blur + threshold erodes in O(n) regardless of the pen width
+            eroded = fill_mask.filter(ImageFilter.BoxBlur(inner)).point(lambda v: 255 if v >= 250 else 0)
+        else:
+            eroded = fill_mask
+        ring = ImageChops.subtract(outer, eroded)
+        outline_alpha = float(watermark_config.get('outline_alpha', opacity))
+        layers.append(_layer(ring, _rgba(watermark_config.get('outline_color', '#000000'), outline_alpha)))
+    layers.append(_layer(fill_mask, _rgba(watermark_config.get('color', '#FFFFFF'), opacity)))
+
+    stamp = layers[0]
+    for layer in layers[1:]:
+        stamp = Image.alpha_composite(stamp, layer)
+
+    if rotation != 0.0:
+        stamp, ox, oy = _rotate_about(stamp, ox, oy, rotation)
+
+    bbox = stamp.getchannel('A').getbbox()
+    if bbox is None:
+        return None
+    stamp = stamp.crop(bbox)
+    return PilStamp(stamp, ox - bbox[0], oy - bbox[1], text_w, text_h)
+
+
+def get_pil_stamp(watermark_config: dict) -> Optional[PilStamp]:
+    """Return the Pillow stamp for watermark_config, rendering it on a cache miss."""
+    if not watermark_config.get('text', ''):
+        return None
+    key = stamp_cache_key(watermark_config)
+    with _stamp_lock:
+        stamp = _stamp_cache.get(key)
+        if stamp is not None:
+            _stamp_cache.move_to_end(key)
+            return stamp
+    stamp = _render_stamp(watermark_config)
+    if stamp is None:
+        return None
+    with _stamp_lock:
+        _stamp_cache[key] = stamp
+        while len(_stamp_cache) > STAMP_CACHE_MAX:
+            _stamp_cache.popitem(last=False)
+    return stamp
+
+
+# ----- compositing -----
+
+def _blend_region(region: Image.Image, stamp: Image.Image) -> Image.Image:
+    """Source-over blend of an RGBA stamp onto an RGB/RGBA region of equal size."""
+    if np is None:
+        if region.mode == 'RGBA':
+            return Image.alpha_composite(region, stamp)
+        return Image.alpha_composite(region.convert('RGBA'), stamp).convert(region.mode)
+    src = np.asarray(stamp, dtype=np.float32) / 255.0
+    dst = np.asarray(region, dtype=np.float32) / 255.0
+    sa = src[..., 3:4]
+    if region.mode == 'RGBA':
+        da = dst[..., 3:4]
+        out_a = sa + da * (1.0 - sa)
+        safe = np.where(out_a > 0, out_a, 1.0)
+        out_rgb = (src[..., :3] * sa + dst[..., :3] * da * (1.0 - sa)) / safe
+        out = np.concatenate([out_rgb, out_a], axis=-1)
+    else:
+        out = src[..., :3] * sa + dst * (1.0 - sa)
+    out = np.clip(out * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    return Image.fromarray(out, region.mode)
+
+
+def _blend_region_16(region: Image.Image, stamp: Image.Image) -> Image.Image:
+    """Source-over blend of an RGBA stamp onto a 16-bit grayscale region, keeping the depth."""
+    dst = np.asarray(region.convert('I'), dtype=np.float32)
+    src = np.asarray(stamp, dtype=np.float32)
+    # stamp luminance as convert('L') computes it, scaled to 16 bits
+    lum = (src[..., 0] * 299 + src[..., 1] * 587 + src[..., 2] * 114) / 1000.0 * 257.0
+    sa = src[..., 3] / 255.0
+    out = np.clip(lum * sa + dst * (1.0 - sa) + 0.5, 0, 65535).astype(np.int32)
+    return Image.fromarray(out).convert(region.mode)
+
+
+def _blend_into(img: Image.Image, box: Tuple[int, int, int, int], piece: Image.Image):
+    region = img.crop(box)
+    if region.mode in _MODES_16 or region.mode == 'I':
+        # an RGB round trip would clip 16-bit values (open_for_export only keeps
+        # these modes when NumPy is available)
+        img.paste(_blend_region_16(region, piece), box)
+        return
+    work_mode = region.mode if region.mode in ('RGB', 'RGBA') else (
+        'RGBA' if 'A' in region.getbands() else 'RGB')
+    if work_mode != region.mode:
+        # e.g. L / CMYK sources: blend in RGB, paste converts back per region
+        blended = _blend_region(region.convert(work_mode), piece).convert(region.mode)
+    else:
+        blended = _blend_region(region, piece)
+    img.paste(blended, box)
+
+
+def apply_stamp(img: Image.Image, stamp: PilStamp, watermark_config: dict, tile: int = 0) -> Image.Image:
+    """Blend stamp onto img in place, touching only its bounding box.
+
+    With tile > 0 the box is processed in tile x tile blocks and blocks where the
+    (rotated) stamp is fully transparent are skipped, so transient buffers stay
+    bounded by the tile size.
+    """
+    w, h = img.size
+    x, y = stamp_top_left((stamp.origin_x, stamp.origin_y), (stamp.text_w, stamp.text_h),
+                          watermark_config, w, h)
+    sw, sh = stamp.image.size
+    # clip the stamp box to the image
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(w, x + sw), min(h, y + sh)
+    if x0 >= x1 or y0 >= y1:
+        return img
+    if tile <= 0:
+        box = (x0, y0, x1, y1)
+        _blend_into(img, box, stamp.image.crop((x0 - x, y0 - y, x1 - x, y1 - y)))
+        return img
+    alpha = stamp.image.getchannel('A')
+    for ty in range(y0, y1, tile):
+        for tx in range(x0, x1, tile):
+            box = (tx, ty, min(tx + tile, x1), min(ty + tile, y1))
+            sbox = (box[0] - x, box[1] - y, box[2] - x, box[3] - y)
+            if alpha.crop(sbox).getbbox() is None:
+                continue
+            _blend_into(img, box, stamp.image.crop(sbox))
+    return img
+
+
+def _draw_handle(img: Image.Image, watermark_config: dict):
+    pos = watermark_config.get('position', {'x': 0.5, 'y': 0.5})
+    r = max(6, int(min(img.width, img.height) * 0.02))
+    overlay = Image.new('RGBA', (r * 2 + 1, r * 2 + 1), (0, 0, 0, 0))
+    d = ImageDraw.Draw(overlay)
+    d.ellipse((0, 0, r * 2, r * 2), fill=(0, 0, 0, 204))
+    d.ellipse((r - r // 2, r - r // 2, r + r // 2, r + r // 2), fill=(255, 255, 255, 242))
+    apply_stamp(img, PilStamp(overlay, r, r, 0, 0), {'position': pos, 'anchor': 'center'})
+
+
+def to_8bit(img: Image.Image) -> Image.Image:
+    """16-bit (or 32-bit integer) grayscale scaled down to 'L', the way Qt reads it.
+
+    A plain convert('L'/'RGB') clips such values instead, turning the image white.
+    Other modes are returned unchanged.
+    """
+    if img.mode not in _MODES_16 and img.mode != 'I':
+        return img
+    return img.convert('I').point(lambda v: v * (1 / 257.0) + 0.5).convert('L')
+
+
+def _reducible(img: Image.Image) -> Image.Image:
+    # reduce() needs a continuous-tone mode: expand palette/bilevel images and widen
+    # 16-bit grayscale to 32-bit 'I' (lossless)
+    if img.mode == 'P':
+        return img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode == '1':
+        return img.convert('L')
+    if img.mode in _MODES_16:
+        return img.convert('I')
+    return img
+
+
+def load_reduced(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Decode img (fresh from Image.open) reduced by the largest power of two that still covers size.
+
+    size is in the stored orientation. JPEGs use DCT scaling (draft), other formats
+    reduce() right after decoding; palette, bilevel and 16-bit sources are widened
+    for that first (16-bit to 'I'). Images not larger than size are just loaded.
+    """
+    rw, rh = int(size[0]), int(size[1])
+    if not (0 < rw < img.width and 0 < rh < img.height):
+        img.load()
+        return img
+    if img.format == 'JPEG':
+        try:
+            img.draft(img.mode, (rw, rh))
+        except Exception:
+            pass
+    img.load()
+    k = 1
+    while img.width // (k * 2) >= rw and img.height // (k * 2) >= rh:
+        k *= 2
+    if k > 1:
+        img = _reducible(img).reduce(k)
+    return img
+
+
+def open_for_export(image_path: str, target_size: Optional[Tuple[int, int]] = None,
+                    native_mode: bool = False) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Decode image_path for export, already resized to target_size when given.
+
+    EXIF orientation is applied, so sizes match probe_image_size. JPEGs are decoded
+    at a reduced DCT scale via draft(); other formats use reduce() by the largest
+    power of two that still covers the target, and a Lanczos resize finishes the
+    job. Returns (image, original_size). The image is converted to RGB or RGBA
+    unless native_mode is set (P is always expanded; 16-bit grayscale keeps its
+    mode when NumPy is available). Raises on decode failure.
+    """
+    img = Image.open(image_path)
+    source_mode = img.mode
+    swapped = probe_orientation(img) in (5, 6, 7, 8)
+    raw_size = img.size
+    src_size = (raw_size[1], raw_size[0]) if swapped else raw_size
+    tw = th = 0
+    if target_size and len(target_size) == 2:
+        tw, th = int(target_size[0]), int(target_size[1])
+    resize = tw > 0 and th > 0 and (tw, th) != src_size
+    # reduction works on the stored (unrotated) orientation
+    rw, rh = (th, tw) if swapped else (tw, th)
+    img = load_reduced(img, (rw, rh) if resize else (0, 0))
+    try:
+        img = ImageOps.exif_transpose(img)
+    except Exception:
+        pass
+
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+    if not native_mode or np is None:
+        # native 16-bit blending needs NumPy (see _blend_region_16)
+        img = to_8bit(img)
+    if img.mode == 'P' or (not native_mode and img.mode not in ('RGB', 'RGBA')):
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    if resize and img.size != (tw, th):
+        img = img.resize((tw, th), _LANCZOS)
+    if native_mode and source_mode in _MODES_16 and img.mode == 'I':
+        # widened for reduce(); values are still 16-bit
+        img = img.convert(source_mode)
+    return img, src_size
+
+
+def compose_image_pil(image_path: str, watermark_config: dict,
+                      output_size: Optional[Tuple[int, int]] = None) -> Optional[Image.Image]:
+    """Compose the watermark onto image_path with Pillow and return the image.
+
+    The result is RGB, or RGBA when the source has transparency. With output_size
+    the source is resized first and the watermark metrics are rescaled to match,
+    the same way compose_export_qimage handles target_size.
+    Returns None if the image cannot be decoded.
+    """
+    try:
+        img, src_size = open_for_export(image_path, output_size)
+    except Exception:
+        return None
+    if img.size != src_size:
+        watermark_config = scale_watermark_config(watermark_config, resize_factor(src_size, img.size))
+
+    stamp = get_pil_stamp(watermark_config)
+    if stamp is not None:
+        apply_stamp(img, stamp, watermark_config)
+    if bool(watermark_config.get('show_handle', False)):
+        _draw_handle(img, watermark_config)
+    return img
@@ -0,0 +1,132 @@
+"""Watermark config helpers shared by the Qt and Pillow compositors.
+
+Nothing in here depends on Qt, so it can be imported from worker processes.
+"""
+import hashlib
+import json
+from typing import Tuple
+
+
+ANCHOR_MAP = {
+    'top-left': (0.0, 0.0), 'top-center': (0.5, 0.0), 'top-right': (1.0, 0.0),
+    'center-left': (0.0, 0.5), 'center': (0.5, 0.5), 'center-right': (1.0, 0.5),
+    'bottom-left': (0.0, 1.0), 'bottom-center': (0.5, 1.0), 'bottom-right': (1.0, 1.0),
+}
+
+# config fields that change the rendered stamp (position/anchor/handle do not)
+STAMP_KEYS = (
+    'text', 'font_family', 'bold', 'italic', 'color', 'opacity', 'rotation',
+    'shadow', 'shadow_color', 'shadow_alpha',
+    'outline', 'outline_color', 'outline_alpha',
+)
+
+
+def bucket_font_size(font_size: int) -> int:
+    """Quantize large font sizes so images of similar scale share one stamp.
+
+    Sizes below 48 are kept exact; above that the step grows with the size so the
+    deviation stays around 1%.
+    """
+    font_size = max(1, int(font_size))
+    step = max(1, font_size // 48)
+    return max(1, int(round(font_size / step)) * step)
+
+
+def stamp_metrics(watermark_config: dict) -> Tuple[int, int, int]:
+    """Return bucketed (font_size, outline_size, shadow_offset) for a config."""
+    font_size = int(watermark_config.get('font_size', 36))
+    outline_size = int(watermark_config.get('outline_size', max(1, font_size // 14)))
+    shadow_offset = int(watermark_config.get('shadow_offset', max(2, font_size // 8)))
+    bucket = bucket_font_size(font_size)
+    if bucket != font_size and font_size > 0:
+        ratio = bucket / font_size
+        outline_size = int(max(1, round(outline_size * ratio)))
+        shadow_offset = int(max(2, round(shadow_offset * ratio)))
+    return bucket, outline_size, shadow_offset
+
+
+def stamp_cache_key(watermark_config: dict) -> str:
+    """Hash of the style fields and effective metrics of a watermark config."""
+    style = {k: watermark_config.get(k) for k in STAMP_KEYS}
+    style['metrics'] = stamp_metrics(watermark_config)
+    raw = json.dumps(style, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def shadow_alpha(watermark_config: dict) -> float:
+    """shadow_alpha as 0..1 (older configs stored it as 0..100)."""
+    try:
+        sa = watermark_config.get('shadow_alpha', 0.5)
+        if sa > 1:
+            sa = sa / 100.0
+        return min(1.0, float(sa))
+    except Exception:
+        return 0.5
+
+
+def stamp_top_left(origin: Tuple[int, int], text_size: Tuple[int, int], watermark_config: dict,
+                   width: int, height: int) -> Tuple[int, int]:
+    """Top-left pixel where a stamp must be blitted on a width x height image.
+
+    origin is where the text centre sits inside the stamp, text_size the unrotated
+    text advance/height used for the anchor offset.
+    """
+    pos = watermark_config.get('position', {'x': 0.5, 'y': 0.5})
+    px = int(pos.get('x', 0.5) * width)
+    py = int(pos.get('y', 0.5) * height)
+    ax, ay = ANCHOR_MAP.get(str(watermark_config.get('anchor', 'center')), (0.5, 0.5))
+    dx = (0.5 - ax) * text_size[0]
+    dy = (0.5 - ay) * text_size[1]
+    return int(round(px + dx)) - origin[0], int(round(py + dy)) - origin[1]
+
+
+def scale_watermark_config(watermark_config: dict, factor: float) -> dict:
+    """Return a copy of watermark_config with font, outline and shadow metrics scaled.
+
+    Used when compositing at a different resolution than the config was made for
+    (e.g. onto an already-downscaled export), so the result keeps the same
+    proportions as the preview.
+    """
+    cfg = dict(watermark_config)
+    if factor <= 0 or factor == 1.0:
+        return cfg
+    font_size = int(cfg.get('font_size', 36))
+    outline_size = int(cfg.get('outline_size', max(1, font_size // 14)))
+    shadow_offset = int(cfg.get('shadow_offset', max(2, font_size // 8)))
+    cfg['font_size'] = int(max(1, round(font_size * factor)))
+    cfg['outline_size'] = int(max(1, round(outline_size * factor)))
+    cfg['shadow_offset'] = int(max(1, round(shadow_offset * factor)))
+    return cfg
+
+
+def resize_factor(src_size: Tuple[int, int], target_size: Tuple[int, int]) -> float:
+    """Uniform scale factor between a source and an output size (mean of both axes)."""
+    sw, sh = src_size
+    tw, th = target_size
+    if sw <= 0 or sh <= 0:
+        return 1.0
+    return ((tw / sw) + (th / sh)) / 2.0
+
+
+def config_from_preview(watermark_config: dict, image_size: Tuple[int, int],
+                        preview_size: Tuple[int, int]) -> dict:
+    """Export config for one image from a config tuned on the preview label.
+
+    Font size, outline and shadow offset are set in preview pixels, where the image
+    is fitted into preview_size; scale them back up to the image's own size. The
+    position handle is never drawn on exports.
+    """
+    cfg = dict(watermark_config)
+    cfg['show_handle'] = False
+    w, h = image_size
+    lw, lh = preview_size
+    scale = min(lw / max(1, w), lh / max(1, h))
+    if scale > 0:
+        font_size = int(cfg.get('font_size', 36))
+        outline_size = int(cfg.get('outline_size', max(1, font_size // 14)))
+        cfg['font_size'] = int(max(1, round(font_size / scale)))
+        cfg['outline_size'] = int(max(1, round(outline_size / scale)))
+        # preview offset is font_size//8; scale it
+        prev_off = max(2, int(font_size // 8))
+        cfg['shadow_offset'] = int(max(2, round(prev_off / scale)))
+    return cfg
@@ -0,0 +1,251 @@
+"""Memory-budget admission control for exports.
+
+Every export decodes its source in full (or at a reduced JPEG scale), so a few
+parallel 100 MP TIFFs can use gigabytes. Before an export starts, its peak
+memory is estimated from the header dimensions (catalog) and it waits until the
+reservations of all running exports plus its own fit into the budget. Small
+images barely dent the budget and keep running at full parallelism; a job larger
+than the whole budget runs alone.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from src.io.catalog import catalog_image_size, get_catalog
+from src.io.exporter import export_job
+from src.io.pil_exporter import LARGE_IMAGE_MP, calc_target_size
+from src.utils.logger import get_logger
+
+_log = get_logger('admission')
+
+# ARGB32 / RGBA bytes per pixel, and how many full-size buffers an export holds
+# at its peak (decoded source + format conversion; the Pillow path similarly
+# holds the decode plus a transpose/convert copy)
+_BYTES_PER_PX = 4
+_DECODE_COPIES = 2
+# the large-image path keeps one native (mostly 3-byte) decode plus tiles
+_LARGE_FACTOR = 3.6
+# unknown size: assume a 24 MP photo
+_FALLBACK_PX = 24_000_000
+# default budget: this share of physical memory, and this much when unknown
+_BUDGET_SHARE = 0.25
+_FALLBACK_BUDGET = 2 * 1024 ** 3
+
+
+def physical_memory_bytes() -> Optional[int]:
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+
+            class _MemStatus(ctypes.Structure):
+                _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                            ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                            ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                            ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                            ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+            st = _MemStatus()
+            st.dwLength = ctypes.sizeof(_MemStatus)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(st)):
+                return int(st.ullTotalPhys)
+            return None
+        return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES'))
+    except Exception:
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident memory of this process so far, if the platform reports it."""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+            c = _Counters()
+            c.cb = ctypes.sizeof(_Counters)
+            proc = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(proc, ctypes.byref(c), c.cb):
+                return int(c.PeakWorkingSetSize)
+            return None
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return int(rss if sys.platform == 'darwin' else rss * 1024)
+    except Exception:
+        return None
+
+
+def estimate_export_bytes(job: dict) -> int:
+    """Estimated peak memory of export_job(job), from the header only."""
+    src = job['src']
+    size = catalog_image_size(src)
+    if not size:
+        return _BYTES_PER_PX * _DECODE_COPIES * _FALLBACK_PX
+    src_px = size[0] * size[1]
+    large_mp = job.get('large_image_mp', LARGE_IMAGE_MP)
+    if large_mp is not None and src_px >= float(large_mp) * 1_000_000:
+        return int(_LARGE_FACTOR * src_px)
+    decode_px = src_px
+    target = calc_target_size(size, job.get('resize'))
+    out_px = target[0] * target[1] if target else src_px
+    if target and out_px < src_px:
+        fmt = None
+        try:
+            cat = get_catalog()
+            info = cat.lookup(src) if cat is not None else None
+            fmt = info.format if info is not None else None
+        except Exception:
+            pass
+        if fmt in ('JPEG', 'MPO'):
+            # DCT-scaled decode: at most twice the target in each direction
+            decode_px = min(src_px, 4 * out_px)
+    return _BYTES_PER_PX * (_DECODE_COPIES * decode_px + (out_px if out_px != decode_px else 0))
+
+
+class MemoryBudget:
+    """Byte reservations with blocking admission; thread-safe."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget = max(1, int(budget_bytes))
+        self._cond = threading.Condition()
+        self._used = 0
+        self._running = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Start a new stats period (e.g. one export batch)."""
+        with self._cond:
+            self._peak = self._used
+            self._peak_running = self._running
+            self._admitted = 0
+            self._waited = 0
+            self._wait_secs = 0.0
+            self._max_job = 0
+
+    def acquire(self, nbytes: int, cancel: Optional[Callable[[], bool]] = None) -> bool:
+        """Block until nbytes fit in the budget; False if cancel() became true first.
+
+        A request larger than the whole budget is admitted once nothing else runs.
+        """
+        nbytes = max(0, int(nbytes))
+        t0 = None
+        with self._cond:
+            while self._used > 0 and self._used + nbytes > self.budget:
+                if cancel is not None and cancel():
+                    return False
+                if t0 is None:
+                    t0 = time.perf_counter()
+                    self._waited += 1
+                self._cond.wait(0.2)
+            if t0 is not None:
+                self._wait_secs += time.perf_counter() - t0
+            self._reserve(nbytes)
+            return True
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """Reserve nbytes if they fit right now (or nothing else is reserved)."""
+        nbytes = max(0, int(nbytes))
+        with self._cond:
+            if self._used > 0 and self._used + nbytes > self.budget:
+                return False
+            self._reserve(nbytes)
+            return True
+
+    def note_wait(self, secs: float):
+        """Count a wait that happened outside acquire() (callers polling try_acquire)."""
+        with self._cond:
+            self._waited += 1
+            self._wait_secs += secs
+
+    def _reserve(self, nbytes: int):
+        self._used += nbytes
+        self._running += 1
+        self._admitted += 1
+        self._peak = max(self._peak, self._used)
+        self._peak_running = max(self._peak_running, self._running)
+        self._max_job = max(self._max_job, nbytes)
+
+    def release(self, nbytes: int):
+        with self._cond:
+            self._used = max(0, self._used - max(0, int(nbytes)))
+            self._running = max(0, self._running - 1)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'budget': self.budget,
+                'reserved': self._used,
+                'peak_reserved': self._peak,
+                'peak_running': self._peak_running,
+                'admitted': self._admitted,
+                'waited': self._waited,
+                'wait_secs': self._wait_secs,
+                'largest_job': self._max_job,
+            }
+
+    def log_stats(self, label: str = 'batch'):
+        s = self.stats()
+        mb = 1024 * 1024
+        rss = peak_rss_bytes()
+        msg = (f"{label}: peak reserved {s['peak_reserved'] / mb:.0f} MB of {s['budget'] / mb:.0f} MB, "
+               f"up to {s['peak_running']} concurrent, largest job {s['largest_job'] / mb:.0f} MB, "
+               f"{s['waited']}/{s['admitted']} jobs waited {s['wait_secs']:.1f}s")
+        if rss:
+            msg += f", process peak RSS {rss / mb:.0f} MB"
+        _log.info(msg)
+        return s
+
+
+_budget: Optional[MemoryBudget] = None
+_budget_lock = threading.Lock()
+
+
+def default_budget_bytes(cfg: Optional[dict] = None) -> int:
+    """Budget from config 'export_memory_mb', else a quarter of physical memory."""
+    try:
+        mb = (cfg or {}).get('export_memory_mb')
+        if mb:
+            return int(float(mb) * 1024 * 1024)
+    except Exception:
+        pass
+    total = physical_memory_bytes()
+    return int(total * _BUDGET_SHARE) if total else _FALLBACK_BUDGET
+
+
+def get_export_budget() -> MemoryBudget:
+    """Shared budget for all exports of this process (batches and hot folders)."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            try:
+                from src.config.config_store import load_config
+                cfg = load_config()
+            except Exception:
+                cfg = {}
+            _budget = MemoryBudget(default_budget_bytes(cfg))
+        return _budget
+
+
+class AdmissionCancelled(Exception):
+    """The job was cancelled while waiting for memory."""
+
+
+def export_job_admitted(job: dict, cancel: Optional[Callable[[], bool]] = None,
+                        budget: Optional[MemoryBudget] = None) -> str:
+    """export_job(job) once its estimated peak memory fits into the budget."""
+    budget = budget or get_export_budget()
+    need = estimate_export_bytes(job)
+    if not budget.acquire(need, cancel):
+        raise AdmissionCancelled(job['src'])
+    try:
+        return export_job(job)
+    finally:
+        budget.release(need)
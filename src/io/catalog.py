@@ -0,0 +1,206 @@
+"""Persistent image metadata catalog (SQLite).
+
+Stores, per imported file: size, mtime, oriented dimensions, EXIF orientation,
+format, a content fingerprint and the thumbnail-store key of the thumbnail
+generated for it. Rows are only trusted while the file's size and mtime are
+unchanged; otherwise they are dropped and the file is probed again. This lets a
+re-opened library skip header reads and thumbnail decodes entirely.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from src.io.probe import probe_image_size, probe_orientation
+from src.utils.logger import get_logger
+from src.utils.paths import get_catalog_path
+
+_log = get_logger('catalog')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    orientation INTEGER NOT NULL DEFAULT 1,
+    format TEXT,
+    fingerprint TEXT,
+    thumb TEXT
+)
+'''
+
+# bytes hashed from each end of the file for the content fingerprint
+_FINGERPRINT_CHUNK = 64 * 1024
+
+
+class ImageInfo(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    width: int  # oriented (as displayed)
+    height: int
+    orientation: int
+    format: Optional[str]
+    fingerprint: Optional[str]
+    thumb: Optional[str]
+
+
+def content_fingerprint(path: str, size: Optional[int] = None) -> Optional[str]:
+    """sha1 over the file size and its first/last 64 KiB; cheap but content-aware."""
+    try:
+        if size is None:
+            size = os.path.getsize(path)
+        h = hashlib.sha1(str(size).encode('ascii'))
+        with open(path, 'rb') as f:
+            h.update(f.read(_FINGERPRINT_CHUNK))
+            if size > 2 * _FINGERPRINT_CHUNK:
+                f.seek(-_FINGERPRINT_CHUNK, os.SEEK_END)
+                h.update(f.read(_FINGERPRINT_CHUNK))
+        return h.hexdigest()
+    except Exception:
+        return None
+
+
+def _probe_header(path: str) -> Optional[Tuple[int, int, int, Optional[str]]]:
+    """(width, height, orientation, format) from the header; None if unreadable."""
+    try:
+        with Image.open(path) as img:
+            w, h = img.size
+            orientation = probe_orientation(img)
+            fmt = img.format
+    except Exception:
+        return None
+    if orientation in (5, 6, 7, 8):
+        w, h = h, w
+    return w, h, orientation, fmt
+
+
+class ImageCatalog:
+    """Thread-safe SQLite catalog; one shared connection guarded by a lock."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        except Exception:
+            pass
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _row(self, path: str) -> Optional[ImageInfo]:
+        cur = self._conn.execute(
+            'SELECT path, size, mtime_ns, width, height, orientation, format, fingerprint, thumb '
+            'FROM images WHERE path = ?', (path,))
+        row = cur.fetchone()
+        return ImageInfo(*row) if row else None
+
+    def lookup(self, path: str) -> Optional[ImageInfo]:
+        """Return the cached row for path if the file is unchanged, else None.
+
+        A row whose size/mtime no longer match the file is deleted.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            info = self._row(path)
+            if info is None:
+                return None
+            if info.size == st.st_size and info.mtime_ns == st.st_mtime_ns:
+                return info
+            self._conn.execute('DELETE FROM images WHERE path = ?', (path,))
+            self._conn.commit()
+        return None
+
+    def get_or_probe(self, path: str) -> Optional[ImageInfo]:
+        """Return metadata for path, probing the header and storing it on a miss."""
+        info = self.lookup(path)
+        if info is not None:
+            return info
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        header = _probe_header(path)
+        if header is None:
+            return None
+        w, h, orientation, fmt = header
+        info = ImageInfo(path, st.st_size, st.st_mtime_ns, w, h, orientation, fmt,
+                         content_fingerprint(path, st.st_size), None)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO images '
+                '(path, size, mtime_ns, width, height, orientation, format, fingerprint, thumb) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', info)
+            self._conn.commit()
+        return info
+
+    def image_size(self, path: str) -> Optional[Tuple[int, int]]:
+        """Oriented (width, height) of path, from the catalog when possible."""
+        info = self.get_or_probe(path)
+        return (info.width, info.height) if info else None
+
+    def set_thumb(self, path: str, thumb: Optional[str]):
+        """Record the thumbnail (store key) generated for the current version of path."""
+        with self._lock:
+            self._conn.execute('UPDATE images SET thumb = ? WHERE path = ?', (thumb, path))
+            self._conn.commit()
+
+    def forget(self, path: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM images WHERE path = ?', (path,))
+            self._conn.commit()
+
+    def clear_thumbs(self):
+        """Drop all thumbnail references (e.g. after the thumbnail cache was cleared)."""
+        with self._lock:
+            self._conn.execute('UPDATE images SET thumb = NULL')
+            self._conn.commit()
+
+
+_catalog: Optional[ImageCatalog] = None
+_catalog_lock = threading.Lock()
+# set once opening the catalog failed: the process then runs without one instead
+# of retrying the open on every lookup
+_catalog_failed = False
+
+
+def get_catalog() -> Optional[ImageCatalog]:
+    """Process-wide catalog in the app temp dir; None if it cannot be opened."""
+    global _catalog, _catalog_failed
+    with _catalog_lock:
+        if _catalog is None and not _catalog_failed:
+            try:
+                _catalog = ImageCatalog(get_catalog_path())
+            except Exception as e:
+                _catalog_failed = True
+                _log.warning(f"image catalog unavailable, continuing without it: {e}")
+        return _catalog
+
+
+def catalog_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """Oriented image size via the catalog, falling back to a plain header probe."""
+    cat = get_catalog()
+    if cat is not None:
+        try:
+            size = cat.image_size(path)
+            if size:
+                return size
+        except Exception:
+            pass
+    return probe_image_size(path)
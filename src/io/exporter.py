@@ -2,54 +2,73 @@ from pathlib import Path
 from typing import Optional
 
 from PySide6.QtGui import QImage
-from PySide6.QtCore import Qt
 
 from src.core.image_processor import compose_export_qimage
+from src.io.pil_exporter import (LARGE_IMAGE_MP, export_image_pil, format_for, is_large_image,
+                                 job_export_args, write_atomic)
 
 
-def export_image(image_path: str, watermark_config: dict, out_path: str, fmt: Optional[str] = None, quality: Optional[int] = None, target_size: Optional[tuple] = None) -> str:
+ENGINES = ('qt', 'pil')
+
+
+def export_image(image_path: str, watermark_config: dict, out_path: str, fmt: Optional[str] = None, quality: Optional[int] = None, target_size: Optional[tuple] = None, engine: str = 'qt', large_image_mp: Optional[float] = LARGE_IMAGE_MP) -> str:
     """
     Export the given image with watermark applied to out_path.
     - image_path: source image path
-    - watermark_config: same fields as compose_preview_qpixmap/compose_export_qimage
+    - watermark_config: same fields as compose_export_qimage/compose_image_pil
     - out_path: target file path (extension decides format unless fmt specified)
     - fmt: optional format override, e.g., 'PNG' or 'JPEG'
     - quality: optional quality (0-100) for lossy formats
+    - engine: 'qt' (QImage/QPainter) or 'pil' (Qt-free Pillow compositor)
+    - large_image_mp: sources of at least this many megapixels use export_image_large
+      (None disables the large-image path)
 
     Returns the output path on success; raises on failure.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown export engine: {engine}")
+    if engine == 'pil' or is_large_image(image_path, large_image_mp):
+        # large sources take export_image_large whatever the engine
+        return export_image_pil(image_path, watermark_config, out_path, fmt, quality, target_size,
+                                large_image_mp)
+    # the format follows out_path, then the file is written under a temporary name
+    # and renamed once complete: a failed or interrupted export leaves no partial file
     out = Path(out_path)
-    out.parent.mkdir(parents=True, exist_ok=True)
+    fmt = format_for(out, fmt)
+    return write_atomic(out, lambda tmp: _export_qt(image_path, watermark_config, tmp, fmt, quality, target_size))
+
 
-    qimg: Optional[QImage] = compose_export_qimage(image_path, watermark_config)
+def _export_qt(image_path: str, watermark_config: dict, out: Path, fmt: str, quality: Optional[int],
+               target_size: Optional[tuple]) -> str:
+    # resize happens before composition (reduced decode + rescaled watermark metrics)
+    qimg: Optional[QImage] = compose_export_qimage(image_path, watermark_config, target_size)
     if qimg is None or qimg.isNull():
         raise ValueError(f"Failed to load or compose image: {image_path}")
 
-    # optional resize prior to save
-    if target_size and len(target_size) == 2:
-        w, h = int(target_size[0]), int(target_size[1])
-        if w > 0 and h > 0:
-            qimg = qimg.scaled(w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
-
-    # Determine format from extension if not provided
-    if fmt is None:
-        ext = out.suffix.lower().strip('.')
-        if ext == 'jpg':
-            fmt = 'JPEG'
-        elif ext == 'jpeg':
-            fmt = 'JPEG'
-        elif ext == 'png':
-            fmt = 'PNG'
-        else:
-            # default to PNG
-            fmt = 'PNG'
-
     # Save with optional quality
-    if quality is not None and fmt.upper() in ('JPG', 'JPEG', 'WEBP', 'AVIF'):
+    if quality is not None and fmt in ('JPEG', 'WEBP', 'AVIF'):
         # Qt expects quality as int 0-100 when saving
         q = max(0, min(100, int(quality)))
-        qimg.save(str(out), fmt.upper(), q)
+        ok = qimg.save(str(out), fmt, q)
     else:
-        qimg.save(str(out), fmt.upper())
+        ok = qimg.save(str(out), fmt)
+    if not ok:
+        raise IOError(f"Failed to write image: {out}")
 
     return str(out)
+
+
+def export_job(job: dict) -> str:
+    """
+    Run one export described by a plain dict, so a batch can be prepared on the UI
+    thread without touching the images. The size comes from the image catalog (or a
+    header probe) here, and the image is decoded exactly once by export_image.
+    - job keys: src, out, config, fmt, quality, engine, large_image_mp,
+      preview_size ((w, h) the config's metrics were tuned on; optional),
+      resize (see calc_target_size; optional)
+
+    Returns the output path on success; raises on failure.
+    """
+    cfg, target_size = job_export_args(job)
+    return export_image(job['src'], cfg, job['out'], job.get('fmt'), job.get('quality'), target_size,
+                        engine=job.get('engine', 'qt'), large_image_mp=job.get('large_image_mp', LARGE_IMAGE_MP))
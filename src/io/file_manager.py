@@ -1,16 +1,93 @@
 import os
-from typing import List
+from fnmatch import fnmatch
+from typing import Callable, Iterator, List, Optional, Sequence
 
 
 SUPPORTED_EXT = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
 
+# symlink policies for iter_images
+SYMLINKS_SKIP = 'skip'      # ignore every symlink
+SYMLINKS_FILES = 'files'    # list symlinked files, do not descend into symlinked dirs
+SYMLINKS_FOLLOW = 'follow'  # also descend into symlinked dirs (loops are detected)
+
+
+def _matches(name: str, rel: str, patterns: Sequence[str]) -> bool:
+    # patterns match either the entry name or its path relative to the scan root
+    return any(fnmatch(name, p) or fnmatch(rel, p) for p in patterns)
+
+
+def iter_images(folder_path: str, recursive: bool = False, max_depth: Optional[int] = None,
+                include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None,
+                symlinks: str = SYMLINKS_FILES,
+                cancel: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+    """Yield image file paths under folder_path as the directory is read.
+
+    Built on os.scandir, so nothing is listed up front and the first paths arrive
+    immediately even for huge or remote folders. Subfolders are visited when
+    recursive is set, up to max_depth levels below folder_path (None = no limit).
+    include/exclude are glob patterns (case-insensitive) matched against the file
+    name or the path relative to folder_path; exclude also prunes directories.
+    symlinks is one of SYMLINKS_SKIP / SYMLINKS_FILES / SYMLINKS_FOLLOW. The scan
+    stops as soon as cancel() returns True. Unreadable directories are skipped.
+    """
+    include = [p.lower() for p in (include or [])]
+    exclude = [p.lower() for p in (exclude or [])]
+    visited = set()
+    stack = [(folder_path, '', 0)]
+    while stack:
+        if cancel is not None and cancel():
+            return
+        dir_path, rel_dir, depth = stack.pop()
+        if symlinks == SYMLINKS_FOLLOW:
+            try:
+                st = os.stat(dir_path)
+                ident = (st.st_dev, st.st_ino)
+                if ident in visited:
+                    continue
+                visited.add(ident)
+            except OSError:
+                continue
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if cancel is not None and cancel():
+                        return
+                    try:
+                        is_link = entry.is_symlink()
+                        if is_link and symlinks == SYMLINKS_SKIP:
+                            continue
+                        name = entry.name
+                        lower = name.lower()
+                        rel = f"{rel_dir}/{lower}" if rel_dir else lower
+                        if entry.is_dir(follow_symlinks=True):
+                            if not recursive or (max_depth is not None and depth >= max_depth):
+                                continue
+                            if is_link and symlinks != SYMLINKS_FOLLOW:
+                                continue
+                            if exclude and _matches(lower, rel, exclude):
+                                continue
+                            subdirs.append((entry.path, rel, depth + 1))
+                            continue
+                        _, ext = os.path.splitext(lower)
+                        if ext not in SUPPORTED_EXT:
+                            continue
+                        if include and not _matches(lower, rel, include):
+                            continue
+                        if exclude and _matches(lower, rel, exclude):
+                            continue
+                        if is_link and not entry.is_file(follow_symlinks=True):
+                            # dangling link
+                            continue
+                        yield entry.path
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        # depth-first, subfolders in the order they were read
+        stack.extend(reversed(subdirs))
+
 
 def list_images_in_folder(folder_path: str) -> List[str]:
     """Return list of image file paths under folder_path (non-recursive)."""
-    files = []
-    for name in os.listdir(folder_path):
-        lower = name.lower()
-        _, ext = os.path.splitext(lower)
-        if ext in SUPPORTED_EXT:
-            files.append(os.path.join(folder_path, name))
-    return files
+    return list(iter_images(folder_path))
@@ -0,0 +1,368 @@
+"""Hot-folder watch mode: export images as they arrive in watched folders.
+
+Folders are watched with QFileSystemWatcher plus a slow poll (change events are
+unreliable on network shares). A new file is only exported once its size and
+mtime have stopped changing for settle_secs and it can be opened, so files still
+being written by a tethering tool are left alone. Ready files go through a
+bounded queue with a fixed number of exports in flight; files beyond the queue
+limit simply wait in the pending set until there is room.
+
+Finished files are recorded in a SQLite ledger keyed by path, size and mtime, so
+a restart skips them while a replaced file (new size/mtime) is exported again.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from src.io.admission import AdmissionCancelled, export_job_admitted
+from src.io.file_manager import SUPPORTED_EXT
+from src.utils.logger import get_logger
+from src.utils.paths import get_hot_folder_ledger_path
+from src.utils.pools import POOL_EXPORT, get_pool
+from src.utils.workers import CancelToken, Worker
+
+_log = get_logger('hot_folder')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS processed (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    out TEXT,
+    done REAL NOT NULL
+)
+'''
+
+# latency/throughput figures cover the most recent exports only
+_STATS_WINDOW = 200
+
+
+class ProcessedLedger:
+    """Thread-safe record of the source files a watch session has exported."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        except Exception:
+            pass
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def load(self, folders: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        """path -> (size, mtime_ns) of the processed files inside folders."""
+        out = {}
+        with self._lock:
+            for folder in folders:
+                prefix = os.path.join(os.path.abspath(folder), '')
+                cur = self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM processed WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix))
+                for path, size, mtime_ns in cur:
+                    out[path] = (size, mtime_ns)
+        return out
+
+    def mark(self, path: str, size: int, mtime_ns: int, out_path: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO processed (path, size, mtime_ns, out, done) VALUES (?, ?, ?, ?, ?)',
+                (path, size, mtime_ns, out_path, time.time()))
+            self._conn.commit()
+
+    def forget_folder(self, folder: str) -> int:
+        """Drop the records under folder so its files are exported again."""
+        prefix = os.path.join(os.path.abspath(folder), '')
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM processed WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class HotFolderWatcher(QObject):
+    """Watch input folders and export every new, fully written image.
+
+    make_job(src) returns an export_job dict (including 'out') for a source
+    file; it is called on the UI thread when the file is handed to a worker.
+    start(worker) runs a Worker (e.g. MainWindow._start_tracked, which keeps it
+    referenced); by default the shared export pool is used.
+    ledger is owned by the caller, who closes it once no export can finish any more
+    (MainWindow keeps one for all watch sessions); without one the watcher opens
+    its own for the rest of the process.
+    """
+    fileExported = Signal(str, str)   # src, out
+    fileFailed = Signal(str, str)     # src, error message
+    statsChanged = Signal(dict)
+
+    def __init__(self, folders: Sequence[str], make_job: Callable[[str], dict],
+                 start: Optional[Callable] = None, ledger: Optional[ProcessedLedger] = None,
+                 settle_secs: float = 1.5, poll_secs: float = 5.0, debounce_ms: int = 300,
+                 max_queue: int = 64, max_in_flight: int = 2, parent=None):
+        super().__init__(parent)
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.make_job = make_job
+        if start is None:
+            start = get_pool(POOL_EXPORT).start
+        self._start = start
+        self.ledger = ledger if ledger is not None else ProcessedLedger(get_hot_folder_ledger_path())
+        self.settle_secs = settle_secs
+        self.max_queue = max(1, int(max_queue))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._done: Dict[str, Tuple[int, int]] = {}
+        # path -> [size, mtime_ns, first_seen, last_change]
+        self._pending: Dict[str, list] = {}
+        self._queue = deque()   # (path, size, mtime_ns, first_seen)
+        self._queued = set()
+        self._running: Dict[str, tuple] = {}
+        # (path, size, mtime_ns) that failed this session; retried only once changed
+        self._failed = set()
+        self._active = False
+        self._delete_when_idle = False
+        # set by stop(): jobs still waiting for export memory give up
+        self._cancel = CancelToken()
+        self._stats = {'detected': 0, 'exported': 0, 'failed': 0}
+        self._started_at = 0.0
+        self._latencies = deque(maxlen=_STATS_WINDOW)   # first seen -> exported, seconds
+        self._export_times = deque(maxlen=_STATS_WINDOW)  # worker run time, seconds
+        self._finish_times = deque(maxlen=_STATS_WINDOW)
+
+        self._fs = QFileSystemWatcher(self)
+        self._fs.directoryChanged.connect(self._schedule_scan)
+        # coalesce bursts of change events into one directory scan
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self.scan)
+        self._poll = QTimer(self)
+        self._poll.setInterval(int(poll_secs * 1000))
+        self._poll.timeout.connect(self.scan)
+        # re-checks pending files until they are stable
+        self._settle = QTimer(self)
+        self._settle.setInterval(max(100, int(settle_secs * 1000 / 3)))
+        self._settle.timeout.connect(self._check_pending)
+
+    # -- control ---------------------------------------------------------------
+
+    def start(self):
+        if self._active:
+            return
+        self._active = True
+        self._started_at = time.time()
+        self._cancel = CancelToken()
+        try:
+            self._done = self.ledger.load(self.folders)
+        except Exception as e:
+            _log.warning(f"ledger load failed: {e}")
+            self._done = {}
+        existing = [f for f in self.folders if os.path.isdir(f)]
+        if existing:
+            self._fs.addPaths(existing)
+        self._poll.start()
+        _log.info(f"watching {self.folders} ({len(self._done)} files already processed)")
+        self.scan()
+
+    def stop(self):
+        """Stop watching; exports already running finish, queued ones are dropped.
+
+        Jobs handed to the pool but still waiting for export memory are cancelled.
+        """
+        self._active = False
+        self._cancel.cancel()
+        self._debounce.stop()
+        self._poll.stop()
+        self._settle.stop()
+        dirs = self._fs.directories()
+        if dirs:
+            self._fs.removePaths(dirs)
+        self._pending.clear()
+        self._queue.clear()
+        self._queued.clear()
+        self._emit_stats()
+
+    def delete_when_idle(self):
+        """Stop and deleteLater() once the exports still running are recorded."""
+        self.stop()
+        self._delete_when_idle = True
+        self._delete_if_idle()
+
+    def _delete_if_idle(self):
+        if self._delete_when_idle and not self._running:
+            self.deleteLater()
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    # -- discovery -------------------------------------------------------------
+
+    def _schedule_scan(self, *args):
+        if self._active:
+            self._debounce.start()
+
+    def scan(self):
+        """List the watched folders and start tracking files not seen before."""
+        if not self._active:
+            return
+        now = time.monotonic()
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                path = entry.path
+                if path in self._pending or path in self._queued or path in self._running:
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in SUPPORTED_EXT:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                sig = (st.st_size, st.st_mtime_ns)
+                if self._done.get(path) == sig or (path,) + sig in self._failed:
+                    continue
+                self._pending[path] = [st.st_size, st.st_mtime_ns, now, now]
+                self._stats['detected'] += 1
+        if self._pending and not self._settle.isActive():
+            self._settle.start()
+
+    def _check_pending(self):
+        # promote files whose size/mtime held still for settle_secs
+        now = time.monotonic()
+        for path in list(self._pending):
+            if len(self._queue) >= self.max_queue:
+                # queue full: the rest stays pending (and keeps its settle state)
+                break
+            size, mtime_ns, first_seen, last_change = self._pending[path]
+            try:
+                st = os.stat(path)
+            except OSError:
+                # deleted or renamed away before it settled
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = [st.st_size, st.st_mtime_ns, first_seen, now]
+                continue
+            if st.st_size == 0 or now - last_change < self.settle_secs:
+                continue
+            if not self._can_open(path):
+                # still locked by the writer (Windows)
+                continue
+            del self._pending[path]
+            self._queue.append((path, size, mtime_ns, first_seen))
+            self._queued.add(path)
+        if not self._pending:
+            self._settle.stop()
+        self._pump()
+
+    @staticmethod
+    def _can_open(path: str) -> bool:
+        try:
+            with open(path, 'rb') as f:
+                f.read(1)
+            return True
+        except OSError:
+            return False
+
+    # -- export ----------------------------------------------------------------
+
+    def _pump(self):
+        while self._active and self._queue and len(self._running) < self.max_in_flight:
+            path, size, mtime_ns, first_seen = self._queue.popleft()
+            self._queued.discard(path)
+            try:
+                job = self.make_job(path)
+            except Exception as e:
+                self._on_failed(path, size, mtime_ns, str(e))
+                continue
+            worker = Worker(self._run_job, job, self._cancel)
+            self._running[path] = (size, mtime_ns, first_seen, job.get('out'))
+            worker.signals.result.connect(lambda res, p=path: self._on_done(p, res))
+            worker.signals.error.connect(lambda err, p=path: self._on_error(p, err))
+            self._start(worker)
+        self._emit_stats()
+        self._delete_if_idle()
+
+    @staticmethod
+    def _run_job(job: dict, cancel: CancelToken):
+        t0 = time.perf_counter()
+        # shares the export memory budget with batch exports
+        out = export_job_admitted(job, cancel)
+        return out, time.perf_counter() - t0
+
+    def _on_done(self, path: str, res):
+        info = self._running.pop(path, None)
+        if info is None:
+            return
+        size, mtime_ns, first_seen, _ = info
+        out_path, run_secs = res
+        try:
+            self.ledger.mark(path, size, mtime_ns, out_path)
+        except Exception as e:
+            _log.warning(f"ledger write failed: {path} -> {e}")
+        self._done[path] = (size, mtime_ns)
+        self._stats['exported'] += 1
+        self._latencies.append(time.monotonic() - first_seen)
+        self._export_times.append(run_secs)
+        self._finish_times.append(time.monotonic())
+        self.fileExported.emit(path, out_path)
+        self._pump()
+
+    def _on_error(self, path: str, err):
+        info = self._running.pop(path, None)
+        if info is None:
+            return
+        # cancelled by stop() before it could start: not a failure, retried next session
+        if err[0] is not AdmissionCancelled:
+            size, mtime_ns, _, _ = info
+            self._on_failed(path, size, mtime_ns, str(err[1]))
+        self._pump()
+
+    def _on_failed(self, path: str, size: int, mtime_ns: int, message: str):
+        _log.warning(f"export failed: {path} -> {message}")
+        self._failed.add((path, size, mtime_ns))
+        self._stats['failed'] += 1
+        self.fileFailed.emit(path, message)
+
+    # -- stats -----------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Counters plus throughput (files/min) and latency (seconds) of recent exports."""
+        s = dict(self._stats)
+        s['pending'] = len(self._pending)
+        s['queued'] = len(self._queue)
+        s['in_flight'] = len(self._running)
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        s['per_minute'] = 60.0 * s['exported'] / elapsed if elapsed > 0 else 0.0
+        # recent rate: exports finished within the last minute
+        now = time.monotonic()
+        s['last_minute'] = sum(1 for t in self._finish_times if now - t <= 60.0)
+        lat = sorted(self._latencies)
+        if lat:
+            s['latency_avg'] = sum(lat) / len(lat)
+            s['latency_p95'] = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+            s['export_avg'] = sum(self._export_times) / len(self._export_times)
+        else:
+            s['latency_avg'] = s['latency_p95'] = s['export_avg'] = 0.0
+        return s
+
+    def _emit_stats(self):
+        self.statsChanged.emit(self.stats())
+
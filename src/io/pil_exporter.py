@@ -0,0 +1,246 @@
+"""Qt-free export: Pillow compositor, large-image path and the worker process entry.
+
+Everything here runs without PySide6, so export worker processes (process_export)
+import only this module: run_export_job is pickled by reference and a spawned
+worker never loads Qt. exporter.py builds the Qt engine on top of it.
+"""
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from src.core.watermark import config_from_preview
+from src.io.catalog import catalog_image_size
+
+
+# sources at or above this many megapixels go through export_image_large. That path
+# still decodes the whole source once (reduced when resizing): peak memory is about one
+# native-mode decode, it is not bounded by strips or tiles of the file
+LARGE_IMAGE_MP = 64.0
+# tile edge used when compositing onto large images
+LARGE_IMAGE_TILE = 512
+
+# modes each encoder writes as is; others are converted before saving
+_SAVE_MODES = {
+    'JPEG': ('L', 'RGB', 'CMYK'),
+    'PNG': ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16', 'I;16B'),
+    'BMP': ('1', 'L', 'P', 'RGB', 'RGBA'),
+    'WEBP': ('RGB', 'RGBA'),
+}
+
+
+def _encodable(img, fmt: str):
+    """img in a mode fmt can write: 16-bit and float scaled to 8-bit, the rest to RGB(A)."""
+    modes = _SAVE_MODES.get(fmt)
+    if modes is None or img.mode in modes:
+        return img
+    from src.core.pil_compositor import to_8bit
+
+    if img.mode.startswith('I'):
+        # 16-bit grayscale is scaled down, not clipped
+        img = to_8bit(img)
+    elif img.mode == 'F':
+        img = img.convert('L')
+    if img.mode in modes:
+        return img
+    if 'A' in img.mode and 'RGBA' in modes:
+        return img.convert('RGBA')
+    return img.convert('RGB')
+
+
+def format_for(out: Path, fmt: Optional[str]) -> str:
+    """Upper-case Pillow/Qt format name for out, fmt overriding the extension."""
+    if fmt is not None:
+        fmt = fmt.upper()
+        return 'JPEG' if fmt == 'JPG' else fmt
+    ext = out.suffix.lower().strip('.')
+    if ext in ('jpg', 'jpeg'):
+        return 'JPEG'
+    # default to PNG
+    return 'PNG'
+
+
+def _save(img, out: Path, fmt: str, quality: Optional[int]) -> str:
+    img = _encodable(img, fmt)
+    if quality is not None and fmt in ('JPEG', 'WEBP', 'AVIF'):
+        img.save(str(out), fmt, quality=max(0, min(100, int(quality))))
+    else:
+        img.save(str(out), fmt)
+    return str(out)
+
+
+def _export_pil(image_path: str, watermark_config: dict, out: Path, fmt: str,
+                quality: Optional[int], target_size: Optional[tuple]) -> str:
+    from src.core.pil_compositor import compose_image_pil
+
+    size = None
+    if target_size and len(target_size) == 2:
+        size = (int(target_size[0]), int(target_size[1]))
+    img = compose_image_pil(image_path, watermark_config, size)
+    if img is None:
+        raise ValueError(f"Failed to load or compose image: {image_path}")
+    return _save(img, out, fmt, quality)
+
+
+def _megapixels(image_path: str) -> float:
+    """Size from the catalog (or a header probe); 0.0 when the file cannot be identified."""
+    size = catalog_image_size(image_path)
+    if not size:
+        return 0.0
+    return (size[0] * size[1]) / 1_000_000.0
+
+
+def is_large_image(image_path: str, large_image_mp: Optional[float] = LARGE_IMAGE_MP) -> bool:
+    """True if image_path should go through export_image_large (None disables it)."""
+    return large_image_mp is not None and _megapixels(image_path) >= float(large_image_mp)
+
+
+def calc_target_size(src_size: Optional[tuple], resize: Optional[dict]) -> Optional[tuple]:
+    """
+    Output size for an image of src_size under a resize spec, or None for no resize.
+    - resize: {'mode': 'None'|'Width'|'Height'|'Percent', 'width': int, 'height': int, 'percent': int}
+    Width/Height keep the aspect ratio.
+    """
+    if not src_size or not resize:
+        return None
+    sw, sh = int(src_size[0]), int(src_size[1])
+    if sw <= 0 or sh <= 0:
+        return None
+    mode = resize.get('mode', 'None')
+    if mode == 'Width':
+        w = int(resize.get('width', 0))
+        if w <= 0:
+            return None
+        return (w, max(1, int(round(sh * (w / sw)))))
+    if mode == 'Height':
+        h = int(resize.get('height', 0))
+        if h <= 0:
+            return None
+        return (max(1, int(round(sw * (h / sh)))), h)
+    if mode == 'Percent':
+        p = int(resize.get('percent', 100))
+        return (max(1, int(round(sw * (p / 100.0)))), max(1, int(round(sh * (p / 100.0)))))
+    return None
+
+
+def export_image_large(image_path: str, watermark_config: dict, out_path: str, fmt: Optional[str] = None, quality: Optional[int] = None, target_size: Optional[tuple] = None) -> str:
+    """
+    Large-image export path used above the megapixel threshold, whatever the engine.
+
+    The source is decoded once in its native mode (no ARGB32 conversion, no second
+    canvas copy, reduced first when target_size is smaller); the watermark is blended
+    tile by tile over only the tiles its rotated bounding box touches, and the image
+    is handed to the encoder, converted only if the format cannot write its mode.
+    Peak memory is roughly one native decode of the source instead of several 32-bit
+    copies; the decode itself is not split into strips.
+
+    Returns the output path on success; raises on failure.
+    """
+    from src.core.pil_compositor import apply_stamp, get_pil_stamp, open_for_export
+    from src.core.watermark import resize_factor, scale_watermark_config
+
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    fmt = format_for(out, fmt)
+
+    try:
+        img, src_size = open_for_export(image_path, target_size, native_mode=True)
+    except Exception as e:
+        raise ValueError(f"Failed to load or compose image: {image_path}") from e
+    if img.size != src_size:
+        watermark_config = scale_watermark_config(watermark_config, resize_factor(src_size, img.size))
+
+    stamp = get_pil_stamp(watermark_config)
+    if stamp is not None:
+        apply_stamp(img, stamp, watermark_config, tile=LARGE_IMAGE_TILE)
+    return _save(img, out, fmt, quality)
+
+
+def partial_path(out: Path) -> Path:
+    """Temporary name an export is written to before it is renamed to out."""
+    out = Path(out)
+    return out.with_name(f'.{out.stem}.part{out.suffix}')
+
+
+def write_atomic(out: Path, write: Callable[[Path], object]) -> str:
+    """Call write(tmp) and rename tmp to out once it returns.
+
+    A failed or interrupted export leaves no partial file behind.
+    """
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = partial_path(out)
+    try:
+        write(tmp)
+        os.replace(tmp, out)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    return str(out)
+
+
+def export_image_pil(image_path: str, watermark_config: dict, out_path: str, fmt: Optional[str] = None,
+                     quality: Optional[int] = None, target_size: Optional[tuple] = None,
+                     large_image_mp: Optional[float] = LARGE_IMAGE_MP) -> str:
+    """export_image with the Pillow compositor; see exporter.export_image."""
+    out = Path(out_path)
+    fmt = format_for(out, fmt)
+    large = is_large_image(image_path, large_image_mp)
+
+    def write(tmp: Path):
+        if large:
+            export_image_large(image_path, watermark_config, str(tmp), fmt, quality, target_size)
+        else:
+            _export_pil(image_path, watermark_config, tmp, fmt, quality, target_size)
+
+    return write_atomic(out, write)
+
+
+def job_export_args(job: dict) -> Tuple[dict, Optional[tuple]]:
+    """(watermark config, target size) of an export_job dict, sized from the catalog."""
+    size = catalog_image_size(job['src'])
+    cfg = job['config']
+    if size and job.get('preview_size'):
+        cfg = config_from_preview(cfg, size, job['preview_size'])
+    return cfg, calc_target_size(size, job.get('resize'))
+
+
+def export_job_pil(job: dict) -> str:
+    """exporter.export_job with the Pillow compositor, whatever job['engine'] says."""
+    cfg, target_size = job_export_args(job)
+    return export_image_pil(job['src'], cfg, job['out'], job.get('fmt'), job.get('quality'), target_size,
+                            large_image_mp=job.get('large_image_mp', LARGE_IMAGE_MP))
+
+
+# ----- worker processes -----
+
+def init_worker_process(priority: str):
+    # follow the export pool's priority so worker processes yield to the UI
+    if priority not in ('low', 'lowest'):
+        return
+    try:
+        if hasattr(os, 'nice'):
+            os.nice(10 if priority == 'lowest' else 5)
+        elif sys.platform == 'win32':
+            import ctypes
+            # IDLE_PRIORITY_CLASS / BELOW_NORMAL_PRIORITY_CLASS
+            cls = 0x40 if priority == 'lowest' else 0x4000
+            k32 = ctypes.windll.kernel32
+            k32.SetPriorityClass(k32.GetCurrentProcess(), cls)
+    except Exception:
+        pass
+
+
+def run_export_job(job: dict) -> Tuple[str, Optional[str], Optional[str], float]:
+    """Run one export in a worker process: (src, out or None, error or None, seconds)."""
+    t0 = time.perf_counter()
+    try:
+        out = export_job_pil(job)
+        return job['src'], out, None, time.perf_counter() - t0
+    except Exception as e:
+        return job['src'], None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}", time.perf_counter() - t0
@@ -0,0 +1,48 @@
+"""Header-only image probing.
+
+Reads image dimensions without decoding pixel data, so it is cheap enough to call
+for every file of a batch. Sizes are reported as displayed, i.e. with the EXIF
+orientation applied (width/height swapped for 90/270 degree orientations).
+"""
+from typing import Optional, Tuple
+
+from PIL import Image
+
+# EXIF orientations that rotate by 90/270 degrees
+_SWAPPING_ORIENTATIONS = {5, 6, 7, 8}
+_ORIENTATION_TAG = 0x0112
+
+
+def probe_orientation(img: Image.Image) -> int:
+    """EXIF orientation (1-8) of an opened Pillow image; 1 when absent."""
+    try:
+        return int(img.getexif().get(_ORIENTATION_TAG, 1) or 1)
+    except Exception:
+        return 1
+
+
+def probe_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """Return the oriented (width, height) of path from its header, or None.
+
+    Tries Pillow first (lazy open only parses the header), then QImageReader.
+    """
+    try:
+        with Image.open(path) as img:
+            w, h = img.size
+            if probe_orientation(img) in _SWAPPING_ORIENTATIONS:
+                w, h = h, w
+            return w, h
+    except Exception:
+        pass
+    try:
+        from PySide6.QtGui import QImageReader, QImageIOHandler
+        reader = QImageReader(path)
+        size = reader.size()
+        if not size.isValid():
+            return None
+        w, h = size.width(), size.height()
+        if reader.transformation() & QImageIOHandler.TransformationRotate90:
+            w, h = h, w
+        return w, h
+    except Exception:
+        return None
@@ -0,0 +1,174 @@
+"""Process-pool export engine.
+
+Batch exports in worker threads share the GIL and the GUI process's Qt state, so
+they stop scaling after a few cores. This engine ships the plain export_job dicts
+to a pool of worker processes instead. Workers always use the Qt-free Pillow
+compositor (engine='pil'): Qt text rendering needs a QGuiApplication, which a
+worker process does not have. The worker side lives in pil_exporter, which does
+not import Qt, so a spawned worker never loads it.
+
+Results are collected by a StreamWorker in the GUI process and re-emitted as Qt
+signals, so callers handle them on the UI thread like any other worker result.
+"""
+import concurrent.futures as cf
+import functools
+import multiprocessing
+import os
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from PySide6.QtCore import QObject, Signal
+
+from src.config.config_store import get_pool_settings
+from src.io.admission import MemoryBudget, estimate_export_bytes, get_export_budget
+from src.io.pil_exporter import init_worker_process, run_export_job
+from src.utils.workers import StreamWorker
+
+
+def default_worker_count() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def _collect(submit, jobs: Iterator[dict], window: int, budget: Optional[MemoryBudget] = None, cancel=None):
+    # keep up to window jobs submitted and yield results as they complete; the next
+    # job is only built and pickled when one finishes. With a budget, a job is only
+    # submitted once its estimated memory fits (all workers share the machine's RAM);
+    # until then it is held back while the results of running jobs come in.
+    pending: Dict[cf.Future, Tuple[str, int]] = {}
+    held = None         # (job, bytes, waiting since) of the next job, not admitted yet
+    exhausted = False
+    try:
+        while True:
+            if cancel is not None and cancel():
+                return
+            while len(pending) < window:
+                if held is None:
+                    job = None if exhausted else next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    held = (job, estimate_export_bytes(job) if budget is not None else 0, None)
+                job, need, since = held
+                if budget is not None:
+                    if pending:
+                        if not budget.try_acquire(need):
+                            held = (job, need, since or time.perf_counter())
+                            break
+                    elif not budget.acquire(need, cancel):
+                        # nothing of ours is running: the memory is held elsewhere
+                        # (e.g. a hot folder), block until it is free or cancelled
+                        return
+                    if since is not None:
+                        budget.note_wait(time.perf_counter() - since)
+                held = None
+                try:
+                    pending[submit(job)] = (job.get('src', ''), need)
+                except Exception as e:
+                    if budget is not None:
+                        budget.release(need)
+                    yield job.get('src', ''), None, f"{type(e).__name__}: {e}", 0.0
+            if not pending:
+                if held is None:
+                    return
+                continue
+            done, _ = cf.wait(pending, timeout=0.2, return_when=cf.FIRST_COMPLETED)
+            for f in done:
+                src, need = pending.pop(f)
+                if budget is not None:
+                    budget.release(need)
+                try:
+                    yield f.result()
+                except Exception as e:
+                    # the worker process died (BrokenProcessPool) or the job could not be pickled
+                    yield src, None, f"{type(e).__name__}: {e}", 0.0
+    finally:
+        # also runs when the consumer stops early: jobs not yet started never run
+        for f, (_, need) in pending.items():
+            f.cancel()
+            if budget is not None:
+                # reservations of running jobs are returned early; they finish soon
+                budget.release(need)
+
+
+class ProcessExportPool(QObject):
+    """Run export_job dicts in worker processes and report each result.
+
+    The executor is created on first use and kept for later batches, so process
+    start-up is paid once per session. start(worker) runs the collecting
+    StreamWorker (e.g. MainWindow._start_tracked).
+    """
+    jobDone = Signal(str, str, float)     # src, out, seconds in the worker
+    jobFailed = Signal(str, str)          # src, error message
+    batchFinished = Signal(bool)          # True if cancelled
+
+    def __init__(self, start, workers: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self._start = start
+        self.workers = workers or default_worker_count()
+        # memory admission (see src/io/admission.py); None runs without a budget
+        self.budget: Optional[MemoryBudget] = get_export_budget()
+        self._executor: Optional[cf.ProcessPoolExecutor] = None
+        self._collector: Optional[StreamWorker] = None
+
+    def set_workers(self, workers: int):
+        workers = max(1, int(workers))
+        if workers != self.workers:
+            self.workers = workers
+            if self._collector is None:
+                # applied from the next batch on; a running batch keeps its pool
+                self._shutdown_executor()
+
+    def _get_executor(self) -> cf.ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn everywhere: fork would copy the GUI process's Qt state
+            ctx = multiprocessing.get_context('spawn')
+            priority = str(get_pool_settings().get('export', {}).get('priority', 'normal')).lower()
+            self._executor = cf.ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                    initializer=init_worker_process, initargs=(priority,))
+        return self._executor
+
+    def _shutdown_executor(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def busy(self) -> bool:
+        return self._collector is not None
+
+    def submit(self, jobs: Iterable[dict]):
+        """Start a batch. Jobs are pulled lazily, about two per worker in flight."""
+        if self._collector is not None:
+            raise RuntimeError('an export batch is already running')
+        executor = self._get_executor()
+        if getattr(executor, '_broken', False):
+            # a worker of an earlier batch died and took the pool down; start a fresh one
+            self._executor = None
+            executor = self._get_executor()
+        submit = functools.partial(executor.submit, run_export_job)
+        collector = StreamWorker(_collect, submit, iter(jobs), self.workers * 2, self.budget,
+                                 chunk_size=1, chunk_interval=0.0)
+        collector.signals.chunk.connect(self._on_results)
+        collector.signals.finished.connect(self._on_finished)
+        self._collector = collector
+        self._start(collector)
+
+    def cancel(self):
+        """Stop submitting and drop the jobs that have not started; running ones finish."""
+        if self._collector is not None:
+            self._collector.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self._shutdown_executor()
+
+    def _on_results(self, results: list):
+        for src, out, err, secs in results:
+            if err is None:
+                self.jobDone.emit(src, out, secs)
+            else:
+                self.jobFailed.emit(src, err)
+
+    def _on_finished(self, cancelled: bool):
+        self._collector = None
+        self.batchFinished.emit(cancelled)
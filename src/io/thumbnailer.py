@@ -7,7 +7,13 @@ try:
 except Exception:
     # fallback for very old Pillow
     _RESAMPLE = Image.ANTIALIAS
+import io
+import math
 import os
+from src.core.pil_compositor import load_reduced, to_8bit
+from src.io.catalog import get_catalog
+from src.utils.cache import thumbnail_key
+from src.utils.thumb_store import get_thumb_store
 from src.utils.logger import get_logger
 
 # 允许加载被截断的图像，避免部分 JPG/PNG 因损坏或流式下载未完成而报错
@@ -15,71 +21,212 @@ ImageFile.LOAD_TRUNCATED_IMAGES = True
 _log = get_logger('thumbnailer')
 
 
-def make_thumbnail(src_path: str, dst_path: str, size=(256, 256)):
+def _fit_size(w: int, h: int, box) -> tuple:
+    scale = min(box[0] / w, box[1] / h)
+    return max(1, math.ceil(w * scale)), max(1, math.ceil(h * scale))
+
+
+def open_image_reduced(src_path: str, size=(256, 256)) -> Image.Image:
+    """Open src_path decoded at the smallest power-of-two scale that still covers size.
+
+    Decoding goes through pil_compositor.load_reduced; EXIF orientation is applied
+    only after the reduction, so no full-size copy is made, and 16-bit grayscale is
+    scaled to 8-bit. The result still needs a final thumbnail()/resize to the exact size.
+    """
+    img = Image.open(src_path)
+    w, h = img.size
+    box = tuple(size)
     try:
-        img = Image.open(src_path)
-        # 统一方向（有些图片含 EXIF 旋转信息）
-        try:
-            img = ImageOps.exif_transpose(img)
-        except Exception:
-            pass
-        img = img.convert('RGBA')
-        img.thumbnail(size, _RESAMPLE)
-        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-        # always save as PNG for consistent decoding
-        if not dst_path.lower().endswith('.png'):
-            dst_path = os.path.splitext(dst_path)[0] + '.png'
-        img.save(dst_path, format='PNG')
-        return dst_path
-    except Exception as e:
-        # return None to signal failure to the caller
-        try:
-            # ensure directory exists for potential debug traces
-            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-        except Exception:
-            pass
+        if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            # size is in display orientation; the decoder works on the stored one
+            box = (box[1], box[0])
+    except Exception:
+        pass
+    img = load_reduced(img, _fit_size(w, h, box))
+    # 16-bit grayscale would clip to white in the RGBA conversion
+    img = to_8bit(img)
+    # 统一方向（有些图片含 EXIF 旋转信息）
+    try:
+        img = ImageOps.exif_transpose(img)
+    except Exception:
+        pass
+    return img
+
+
+# EXIF orientation -> transpose that brings the stored pixels upright
+_TRANSPOSE = getattr(Image, 'Transpose', Image)
+_ORIENT_TRANSPOSE = {
+    2: _TRANSPOSE.FLIP_LEFT_RIGHT, 3: _TRANSPOSE.ROTATE_180, 4: _TRANSPOSE.FLIP_TOP_BOTTOM,
+    5: _TRANSPOSE.TRANSPOSE, 6: _TRANSPOSE.ROTATE_270, 7: _TRANSPOSE.TRANSVERSE, 8: _TRANSPOSE.ROTATE_90,
+}
+# IFD1 (the thumbnail directory); ExifTags.IFD only exists on newer Pillow
+_IFD1 = -1
+_THUMB_OFFSET_TAG = 0x0201
+_THUMB_LENGTH_TAG = 0x0202
+
+
+def read_embedded_thumbnail(src_path: str):
+    """Return the EXIF-embedded JPEG thumbnail of src_path, oriented, or None.
+
+    Only the APP1 header is parsed, the main image is never decoded, so this is
+    cheap enough to run for every file of a large import. Letterbox bars that
+    some cameras add to fit 3:2 photos into 160x120 are cropped away.
+    """
+    try:
+        with Image.open(src_path) as img:
+            if img.format not in ('JPEG', 'MPO'):
+                return None
+            w, h = img.size
+            raw = img.info.get('exif')
+            if not raw:
+                return None
+            exif = img.getexif()
+            orientation = int(exif.get(0x0112, 1) or 1)
+            ifd1 = exif.get_ifd(_IFD1)
+    except Exception:
         return None
-def _save_thumbnail(img: Image.Image, dst_path: str, size=(256, 256)) -> str:
-    img = img.convert('RGBA')
+    try:
+        off = int(ifd1.get(_THUMB_OFFSET_TAG, 0))
+        length = int(ifd1.get(_THUMB_LENGTH_TAG, 0))
+    except Exception:
+        return None
+    if off <= 0 or length <= 0:
+        return None
+    # offsets are relative to the TIFF header that follows the 'Exif\0\0' marker
+    if raw.startswith(b'Exif\x00\x00'):
+        raw = raw[6:]
+    data = raw[off:off + length]
+    if len(data) != length:
+        return None
+    try:
+        thumb = Image.open(io.BytesIO(data))
+        thumb.load()
+    except Exception:
+        return None
+    tw, th = thumb.size
+    if tw < 8 or th < 8:
+        return None
+    # crop letterbox/pillarbox so the thumbnail has the main image's aspect
+    aspect = w / h
+    if abs(tw / th - aspect) > 0.02 * aspect:
+        if tw / th > aspect:
+            cw = max(1, round(th * aspect))
+            left = (tw - cw) // 2
+            thumb = thumb.crop((left, 0, left + cw, th))
+        else:
+            ch = max(1, round(tw / aspect))
+            top = (th - ch) // 2
+            thumb = thumb.crop((0, top, tw, top + ch))
+    method = _ORIENT_TRANSPOSE.get(orientation)
+    if method is not None:
+        thumb = thumb.transpose(method)
+    return thumb.convert('RGB')
+
+
+def _encode_thumbnail(img: Image.Image, size=(256, 256)) -> bytes:
+    # img is already reduced (open_image_reduced), so converting first is cheap and
+    # keeps palette/16-bit modes out of the resampler
+    if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        img = img.convert('RGBA')
     img.thumbnail(size, _RESAMPLE)
-    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-    if not dst_path.lower().endswith('.png'):
-        dst_path = os.path.splitext(dst_path)[0] + '.png'
-    img.save(dst_path, format='PNG')
-    return dst_path
+    img = img.convert('RGBA')
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
 
 
-def make_thumbnail(src_path: str, dst_path: str, size=(256, 256)):
-    # 尝试多种策略：原图->EXIF 纠正->降级采样->最小尺寸
+def render_thumbnail(src_path: str, size=(256, 256)):
+    """PNG bytes of a thumbnail of src_path fitted into size, or None."""
+    # 尝试多种策略：缩小解码(含 EXIF 纠正)->降级采样->最小尺寸->EXIF 内嵌缩略图
     try:
-        img = Image.open(src_path)
+        img = open_image_reduced(src_path, size)
     except Exception as e:
         _log.warning(f"open failed: {src_path} -> {e}")
-        return None
-
-    # 尝试 EXIF 旋转纠正
-    try:
-        img = ImageOps.exif_transpose(img)
-    except Exception:
-        pass
+        img = None
+    if img is None:
+        return _encode_embedded_thumbnail(src_path, size)
 
     # 第一轮：原方案
     try:
-        return _save_thumbnail(img, dst_path, size)
+        return _encode_thumbnail(img, size)
     except Exception as e:
         _log.info(f"save thumbnail 1st failed: {src_path} -> {e}")
 
     # 第二轮：降级采样（使用较小目标 size）
     try:
         small = (min(size[0], 160), min(size[1], 160))
-        return _save_thumbnail(img, dst_path, small)
+        return _encode_thumbnail(img, small)
     except Exception as e:
         _log.info(f"save thumbnail 2nd failed: {src_path} -> {e}")
 
     # 第三轮：更小尺寸
     try:
         tiny = (96, 96)
-        return _save_thumbnail(img, dst_path, tiny)
+        return _encode_thumbnail(img, tiny)
     except Exception as e:
         _log.warning(f"save thumbnail 3rd failed: {src_path} -> {e}")
+
+    # 最后：主图解码失败（如截断的 JPG）时退回 EXIF 内嵌缩略图
+    return _encode_embedded_thumbnail(src_path, size)
+
+
+def _encode_embedded_thumbnail(src_path: str, size=(256, 256)):
+    thumb = read_embedded_thumbnail(src_path)
+    if thumb is None:
+        return None
+    try:
+        return _encode_thumbnail(thumb, size)
+    except Exception as e:
+        _log.warning(f"save embedded thumbnail failed: {src_path} -> {e}")
+        return None
+
+
+def make_thumbnail(src_path: str, dst_path: str, size=(256, 256)):
+    """Write a PNG thumbnail of src_path to dst_path; returns the path or None."""
+    data = render_thumbnail(src_path, size)
+    if data is None:
+        return None
+    try:
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        if not dst_path.lower().endswith('.png'):
+            dst_path = os.path.splitext(dst_path)[0] + '.png'
+        with open(dst_path, 'wb') as f:
+            f.write(data)
+        return dst_path
+    except Exception as e:
+        _log.warning(f"write thumbnail failed: {dst_path} -> {e}")
         return None
+
+
+def make_stored_thumbnail(src_path: str, store_dir, key: str, size=(256, 256)):
+    """Render a thumbnail into the packed thumbnail store under key and record it in
+    the catalog, so the next import of an unchanged file can skip decoding.
+    Returns key, or None if no thumbnail could be made."""
+    cat = get_catalog()
+    if cat is not None:
+        try:
+            cat.get_or_probe(src_path)
+        except Exception as e:
+            _log.info(f"catalog probe failed: {src_path} -> {e}")
+    data = render_thumbnail(src_path, size)
+    if data is None:
+        return None
+    get_thumb_store(store_dir).put(key, data)
+    if cat is not None:
+        try:
+            cat.set_thumb(src_path, key)
+        except Exception:
+            pass
+    return key
+
+
+def ensure_stored_thumbnail(src_path: str, store_dir, size=(256, 256)):
+    """Make sure the store holds a thumbnail for src_path; returns its key or None.
+
+    The key needs a stat() of the file, which can be slow on network shares, so
+    background jobs call this instead of computing the key on the UI thread.
+    """
+    key = thumbnail_key(src_path, size)
+    if key in get_thumb_store(store_dir):
+        return key
+    return make_stored_thumbnail(src_path, store_dir, key, size)
@@ -1,18 +1,31 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                                QListWidget, QLabel, QPushButton, QSizePolicy,
-                               QFileDialog, QListWidgetItem, QFontComboBox, QSpinBox, QSlider, QColorDialog, QGridLayout, QCheckBox, QGroupBox, QScrollArea, QProgressDialog, QComboBox, QAbstractItemView, QLineEdit, QMessageBox, QFormLayout, QToolButton, QMenu, QDialog, QListWidget, QInputDialog)
-from PySide6.QtCore import Qt, QThreadPool, QSize, Signal, QRect, QTimer
+                               QFileDialog, QFontComboBox, QSpinBox, QSlider, QColorDialog, QGridLayout, QCheckBox, QGroupBox, QScrollArea, QProgressDialog, QComboBox, QAbstractItemView, QLineEdit, QMessageBox, QFormLayout, QToolButton, QMenu, QDialog, QListWidget, QInputDialog)
+from PySide6.QtCore import Qt, QSize, Signal, QRect, QRectF, QTimer, QModelIndex
 from PySide6.QtGui import QPixmap, QIcon, QFont, QColor, QPainter, QShortcut, QKeySequence, QImage
 from pathlib import Path
-import hashlib
+import functools
 import os
 from typing import Optional
 
-from src.io.thumbnailer import make_thumbnail
-from src.io.file_manager import SUPPORTED_EXT, list_images_in_folder
-from src.utils.workers import Worker
-from src.core.image_processor import compose_preview_qpixmap
-from src.io.exporter import export_image
+from src.io.catalog import get_catalog
+from src.io.thumbnailer import ensure_stored_thumbnail, make_stored_thumbnail, read_embedded_thumbnail
+from src.io.admission import AdmissionCancelled, export_job_admitted, get_export_budget
+from src.io.hot_folder import HotFolderWatcher, ProcessedLedger
+from src.io.process_export import ProcessExportPool, default_worker_count
+from src.io.file_manager import SUPPORTED_EXT, SYMLINKS_FILES, iter_images
+from src.utils.workers import CancelToken, PriorityScheduler, StreamWorker, WindowedSubmitter, Worker
+from src.utils.cache import (ByteLRU, CACHE_MAX_BYTES, CACHE_MAX_FILES, enforce_cache_quota,
+                             thumbnail_key)
+from src.utils.thumb_store import get_thumb_store
+from src.utils.paths import get_hot_folder_ledger_path
+from src.utils.pools import (POOL_EXPORT, POOL_IO, POOL_PREVIEW, POOL_THUMBNAILS, get_pool,
+                             pool_queue_depth, pool_utilization, shutdown_pools)
+from src.core.image_processor import QUALITY_DRAFT, QUALITY_FULL, get_watermark_stamp, stamp_placement
+from src.ui.preview_renderer import PreviewRenderer
+from src.ui.thumb_list import (ThumbListModel, ThumbListView, THUMB_FAILED, THUMB_NONE,
+                               THUMB_PENDING, THUMB_READY)
+from src.io.exporter import export_job, LARGE_IMAGE_MP
 from src.config.config_store import get_appdata_dir, load_config, save_config
 from src.templates.template_manager import TemplateManager
 import importlib
@@ -21,24 +34,121 @@ try:
 except Exception:
     PILImage = None
 
+# size thumbnails are generated at (part of the cache key) and the in-memory budget
+# for decoded list icons
+THUMB_SIZE = (256, 256)
+THUMB_MEMORY_BYTES = 48 * 1024 * 1024
+# label-sized preview bases (see MainWindow._preview_proxy)
+PREVIEW_PROXY_BYTES = 64 * 1024 * 1024
+# proxies decoded ahead on each side of the open image
+PREVIEW_PREFETCH_AHEAD = 3
+# thumbnail job tiers: rows in the viewport, rows within a page of it, all others
+PRIO_VISIBLE = 0
+PRIO_NEAR = 1
+PRIO_REST = 2
+# at most this many rows wait for background (PRIO_REST) generation: the thumbnail
+# store keeps CACHE_MAX_FILES entries, past that each new one evicts one written
+# moments before. Other rows are generated when they scroll into view
+THUMB_BACKGROUND_ROWS = CACHE_MAX_FILES // 2
+
+
+def _load_preview_proxy(path: str, w: int, h: int) -> QImage:
+    """Decode path fitted to (w, h): scaled down or up to fill the label like before.
+
+    The watermark preview metrics are relative to the label (see config_from_preview),
+    so a small image has to be shown enlarged to the label size too.
+    Safe to call from worker threads; returns a null QImage if the file cannot be read.
+    """
+    try:
+        from src.utils.qt_image import qimage_from_path
+        # decode straight to label size; exports read the original themselves.
+        # Formats Qt cannot read go through Pillow in memory
+        img = qimage_from_path(path, max_size=(w, h))
+    except Exception:
+        img = QImage(path)
+    if img.isNull():
+        return img
+    fitted = img.size().scaled(w, h, Qt.KeepAspectRatio)
+    if fitted != img.size() and not fitted.isEmpty():
+        img = img.scaled(fitted, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return img
+
 
 class PreviewLabel(QLabel):
-    """Custom label that draws a QPixmap scaled and centered in paintEvent.
+    """Custom label that draws the preview scaled and centered in paintEvent.
+
+    The preview is layered: a base pixmap (the image) plus an overlay made of the
+    watermark stamp and the drag handle, both placed in base pixel coordinates.
+    Moving the overlay only repaints the rectangles it left and entered. In draft
+    mode (and while dragging) scaling uses the fast transformation.
     Exposes positionChanged(relative_x, relative_y) based on the drawn pixmap area.
     """
     positionChanged = Signal(float, float)  # relative x,y 0..1
+    resized = Signal()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setMouseTracking(True)
         self._dragging = False
         self._preview_pixmap = None
+        self._stamp = None          # QImage drawn into _stamp_rect (base coordinates)
+        self._stamp_rect = QRectF()
+        self._handle = None         # (x, y, radius) in base coordinates
+        self._draft = False
 
     def set_preview_pixmap(self, pix: Optional[QPixmap]):
         self._preview_pixmap = pix
         # trigger repaint; do not call QLabel.setPixmap to avoid changing sizeHint
         self.update()
 
+    def set_overlay(self, stamp: Optional[QImage], target: Optional[QRectF] = None, handle=None):
+        """Replace the watermark layer; only the old and new overlay areas are repainted.
+
+        target is where stamp is drawn in base pixels (larger than stamp for drafts).
+        """
+        old = self._overlay_rect()
+        self._stamp = stamp
+        self._stamp_rect = QRectF(target) if target is not None else QRectF()
+        self._handle = handle
+        new = self._overlay_rect()
+        if old.isValid():
+            self.update(old)
+        if new.isValid():
+            self.update(new)
+
+    def set_draft(self, draft: bool):
+        if draft != self._draft:
+            self._draft = draft
+            if not draft:
+                self.update()
+
+    def _base_transform(self):
+        # (x0, y0, scale) mapping base pixels to widget pixels, or None without a base
+        pix = self._preview_pixmap
+        if pix is None or pix.isNull() or pix.width() == 0 or pix.height() == 0:
+            return None
+        scale = min(self.width() / pix.width(), self.height() / pix.height())
+        x0 = (self.width() - int(pix.width() * scale)) // 2
+        y0 = (self.height() - int(pix.height() * scale)) // 2
+        return x0, y0, scale
+
+    def _overlay_rect(self) -> QRect:
+        xf = self._base_transform()
+        rect = QRect()
+        if xf is None:
+            return rect
+        x0, y0, scale = xf
+        if self._stamp is not None and not self._stamp.isNull():
+            rect = rect.united(self._stamp_rect.toAlignedRect())
+        if self._handle is not None:
+            hx, hy, r = self._handle
+            rect = rect.united(QRect(hx - r, hy - r, 2 * r, 2 * r))
+        if not rect.isValid():
+            return rect
+        # widget pixels, padded for rounding and antialiasing
+        return QRect(int(x0 + rect.x() * scale) - 2, int(y0 + rect.y() * scale) - 2,
+                     int(rect.width() * scale) + 5, int(rect.height() * scale) + 5)
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self._dragging = True
@@ -52,6 +162,13 @@ class PreviewLabel(QLabel):
         if event.button() == Qt.LeftButton:
             self._dragging = False
             self._emit_pos(event)
+            if not self._draft:
+                # repaint what the drag drew with the fast transformation
+                self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resized.emit()
 
     def _emit_pos(self, event):
         # compute position relative to the *drawn* pixmap area (scaled to fit)
@@ -84,66 +201,34 @@ class PreviewLabel(QLabel):
     def paintEvent(self, event):
         painter = QPainter(self)
         # draw background / label defaults
-        painter.fillRect(self.rect(), self.palette().window())
-        if self._preview_pixmap and not self._preview_pixmap.isNull():
-            pw = self._preview_pixmap.width()
-            ph = self._preview_pixmap.height()
-            lw = self.width()
-            lh = self.height()
-            scale = min(lw / pw, lh / ph)
-            draw_w = int(pw * scale)
-            draw_h = int(ph * scale)
-            x0 = (lw - draw_w) // 2
-            y0 = (lh - draw_h) // 2
-            target = QRect(x0, y0, draw_w, draw_h)
-            painter.drawPixmap(target, self._preview_pixmap)
+        painter.fillRect(event.rect(), self.palette().window())
+        xf = self._base_transform()
+        if xf is not None:
+            x0, y0, scale = xf
+            pix = self._preview_pixmap
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, not (self._draft or self._dragging))
+            painter.translate(x0, y0)
+            painter.scale(scale, scale)
+            # Qt clips to the dirty region, so a handle drag only blits two small areas
+            painter.drawPixmap(0, 0, pix)
+            if self._stamp is not None and not self._stamp.isNull():
+                painter.drawImage(self._stamp_rect, self._stamp)
+            if self._handle is not None:
+                hx, hy, r = self._handle
+                outer = QColor('#000000'); inner = QColor('#FFFFFF')
+                outer.setAlphaF(0.8); inner.setAlphaF(0.95)
+                painter.setPen(outer); painter.setBrush(outer)
+                painter.drawEllipse(hx - r, hy - r, r * 2, r * 2)
+                painter.setPen(inner); painter.setBrush(inner)
+                painter.drawEllipse(hx - r // 2, hy - r // 2, (r // 2) * 2, (r // 2) * 2)
         else:
             # fallback to default QLabel paint (shows text)
+            painter.end()
             super().paintEvent(event)
+            return
         painter.end()
 
 
-class ThumbListWidget(QListWidget):
-    """Thumbnail list that accepts external file drops and emits file paths."""
-    filesDropped = Signal(list)
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        try:
-            self.setAcceptDrops(True)
-            self.setDropIndicatorShown(True)
-            # only accept drops (no internal drag), and treat as copy
-            self.setDragDropMode(QAbstractItemView.DropOnly)
-            self.setDefaultDropAction(Qt.CopyAction)
-            # QAbstractItemView handles events on viewport
-            self.viewport().setAcceptDrops(True)
-        except Exception:
-            pass
-
-    def dragEnterEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.acceptProposedAction()
-
-    def dropEvent(self, event):
-        urls = event.mimeData().urls()
-        first_path = None
-        for u in urls:
-            p = u.toLocalFile()
-            if p:
-                first_path = p
-                break
-        if first_path:
-            # emit only one path as list to keep signal shape
-            self.filesDropped.emit([first_path])
-        event.acceptProposedAction()
-
-    def dragMoveEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.acceptProposedAction()
-        else:
-            event.ignore()
-
-
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -158,7 +243,11 @@ class MainWindow(QMainWindow):
 
         # Left: thumbnail list + import buttons
         left_layout = QVBoxLayout()
-        self.thumb_list = ThumbListWidget()
+        # rows live in an array-backed model; icons only for rows near the viewport
+        self.thumb_model = ThumbListModel(self)
+        self.thumb_list = ThumbListView()
+        self.thumb_list.setModel(self.thumb_model)
+        self.thumb_model.failed_icon = QIcon(self._error_placeholder())
         self.thumb_list.setMaximumWidth(260)
         self.thumb_list.setIconSize(QSize(72, 72))
         self.thumb_list.setObjectName('thumb_list')
@@ -185,9 +274,11 @@ class MainWindow(QMainWindow):
         btn_layout.addWidget(self.import_folder_btn)
         btn_layout.addWidget(self.clear_cache_btn)
         left_layout.addLayout(btn_layout)
+        self.scan_recursive_cb = QCheckBox('Include subfolders')
+        left_layout.addWidget(self.scan_recursive_cb)
 
         main_layout.addLayout(left_layout)
-        # accept single-image drag to thumbnail list
+        # drops on the thumbnail list import like drops on the window
         try:
             self.thumb_list.filesDropped.connect(self.on_external_files_dropped)
         except Exception:
@@ -361,6 +452,17 @@ class MainWindow(QMainWindow):
         resize_row2.addWidget(self.resize_height)
         resize_row2.addStretch()
         export_v.addLayout(resize_row2)
+        # batch engine: worker threads in this process, or a pool of worker processes
+        engine_row = QHBoxLayout()
+        engine_row.addWidget(QLabel('Engine'))
+        self.export_engine = QComboBox(); self.export_engine.addItems(['Threads', 'Processes'])
+        self.export_engine.setToolTip('Processes: export batches in separate worker processes (Pillow compositor), scales across all cores')
+        self.export_workers = QSpinBox(); self.export_workers.setRange(1, max(1, os.cpu_count() or 1))
+        self.export_workers.setValue(default_worker_count())
+        engine_row.addWidget(self.export_engine)
+        engine_row.addWidget(QLabel('Workers'))
+        engine_row.addWidget(self.export_workers)
+        export_v.addLayout(engine_row)
         # buttons
         self.export_btn = QPushButton('Export Current…')
         self.export_all_btn = QPushButton('Export All…')
@@ -368,6 +470,22 @@ class MainWindow(QMainWindow):
         export_v.addWidget(self.export_all_btn)
         export_group.setLayout(export_v)
         controls_layout.addWidget(export_group)
+
+        # hot folder: export new arrivals with the settings above
+        watch_group = QGroupBox('Watch Folder')
+        watch_v = QVBoxLayout()
+        watch_btns = QHBoxLayout()
+        self.watch_start_btn = QPushButton('Start Watch…')
+        self.watch_stop_btn = QPushButton('Stop Watch')
+        self.watch_stop_btn.setEnabled(False)
+        watch_btns.addWidget(self.watch_start_btn)
+        watch_btns.addWidget(self.watch_stop_btn)
+        watch_v.addLayout(watch_btns)
+        self.watch_status = QLabel('Not watching')
+        self.watch_status.setWordWrap(True)
+        watch_v.addWidget(self.watch_status)
+        watch_group.setLayout(watch_v)
+        controls_layout.addWidget(watch_group)
         controls_layout.addStretch()
 
         # (anchors moved into Position group above)
@@ -379,8 +497,9 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(controls_widget)
 
 
-        # Thread pool
-        self.pool = QThreadPool.globalInstance()
+        # Thread pools: one per kind of work, so long exports cannot starve
+        # thumbnails or previews (sizes/priorities: config 'pools')
+        self.pool = get_pool(POOL_EXPORT)
 
         # debug toggles
         # 默认关闭缩略图调试日志（发行版更安静）
@@ -389,8 +508,43 @@ class MainWindow(QMainWindow):
         self._running_tasks = []
         self._export_progress = None
         self._cancel_export = False
-        # track pending thumbnail tasks
-        self._pending_thumbs = 0
+        self._export_submitter = None
+        # thumbnail jobs wait here by priority; only about one per pool thread runs
+        self._thumb_sched = PriorityScheduler(functools.partial(self._start_tracked, pool=POOL_THUMBNAILS),
+                                             pool_queue_depth(POOL_THUMBNAILS), self)
+        # refresh icons once when all thumbnail work is done
+        self._thumb_sched.idle.connect(lambda: QTimer.singleShot(120, self._refresh_thumbnails_icons))
+        # rows leaving the list take their queued jobs with them
+        self.thumb_model.modelAboutToBeReset.connect(self._thumb_sched.cancel_all)
+        # rows (first, last) that currently hold icons
+        self._thumb_window = (0, -1)
+        # decoded list icons keyed like the on-disk thumbnails; checked before any file read
+        self._thumb_mem = ByteLRU(THUMB_MEMORY_BYTES, lambda pix: pix.width() * pix.height() * 4)
+        # preview bases fitted to the label, keyed (path, label w, label h); the
+        # original is never kept, so a slider tick only composites the watermark
+        self._preview_proxies = ByteLRU(PREVIEW_PROXY_BYTES, lambda img: img.sizeInBytes())
+        # renders the watermark stamp in the preview pool; only the newest config is
+        # rendered. The label draws it over the proxy, so moving it needs no render
+        self._preview_renderer = PreviewRenderer(get_watermark_stamp, parent=self)
+        self._preview_renderer.rendered.connect(self._on_preview_stamp_rendered)
+        self._preview_stamp = None
+        self._preview_base_key = None
+        # changes arriving faster than this get draft stamps; a full one follows on idle
+        self._preview_quality = QUALITY_FULL
+        self._preview_idle_timer = QTimer(self)
+        self._preview_idle_timer.setSingleShot(True)
+        self._preview_idle_timer.setInterval(200)
+        self._preview_idle_timer.timeout.connect(self._refine_preview)
+        # decodes the proxies of neighbouring images; one job at a time, so the
+        # preview renderer always finds a free preview thread
+        self._prefetch_sched = PriorityScheduler(functools.partial(self._start_tracked, pool=POOL_PREVIEW), 1, self)
+        self.thumb_model.modelAboutToBeReset.connect(self._prefetch_sched.cancel_all)
+        # re-decode the proxy once a resize settles; until then the old one is stretched
+        self._preview_resize_timer = QTimer(self)
+        self._preview_resize_timer.setSingleShot(True)
+        self._preview_resize_timer.setInterval(150)
+        self._preview_resize_timer.timeout.connect(self._on_preview_resize_settled)
+        self.preview_label.resized.connect(lambda: self._preview_resize_timer.start())
 
         # keyboard shortcuts for selection
         try:
@@ -411,20 +565,55 @@ class MainWindow(QMainWindow):
                 # 兜底回退到当前目录（开发环境）
                 self.cache_dir = Path(os.getcwd()) / 'cache' / 'thumbnails'
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        # 每次启动时对缩略图缓存执行一次配额清理：默认 <=200MB、<=10000 文件、<=60 天
-        try:
-            from src.utils.cache import enforce_cache_quota
-            enforce_cache_quota(self.cache_dir, max_bytes=200*1024*1024, max_files=10000, max_age_days=60)
-        except Exception:
-            pass
+        # thumbnails are kept in one pack file + index inside cache_dir; the store
+        # evicts on write once over these limits
+        self._thumb_store = get_thumb_store(self.cache_dir)
+        self._thumb_store.set_quota(max_bytes=CACHE_MAX_BYTES, max_files=CACHE_MAX_FILES)
+        # 每次启动时在后台对缩略图缓存做一次完整配额清理：默认 <=200MB、<=10000 文件、<=60 天
+        quota = Worker(enforce_cache_quota, self.cache_dir)
+        quota.signals.error.connect(self.on_worker_error)
+        self._start_tracked(quota, pool=POOL_IO)
 
         # wiring
         self.import_files_btn.clicked.connect(self.on_import_files)
         self.import_folder_btn.clicked.connect(self.on_import_folder)
-        self.thumb_list.itemClicked.connect(self.on_thumb_clicked)
+        self.thumb_list.clicked.connect(self.on_thumb_clicked)
+        # arrow keys move the current item without a click
+        self.thumb_list.selectionModel().currentChanged.connect(self._on_current_thumb_changed)
+        self.thumb_list.visibleRangeChanged.connect(self.on_visible_rows_changed)
         self.export_btn.clicked.connect(self.on_export_current)
         self.export_all_btn.clicked.connect(self.on_export_all)
+        self._hot_folder = None
+        # one ledger per window, shared by every watch session and closed with the window
+        self._watch_ledger: Optional[ProcessedLedger] = None
+        self._proc_export = ProcessExportPool(functools.partial(self._start_tracked, pool=POOL_IO),
+                                              self.export_workers.value(), self)
+        self._proc_export.jobDone.connect(lambda src, out, secs: self._on_proc_export_result(src, None))
+        self._proc_export.jobFailed.connect(lambda src, err: self._on_proc_export_result(src, err))
+        self._proc_export.batchFinished.connect(self._on_proc_export_finished)
+        self._proc_batch_cb = None
+        self.watch_start_btn.clicked.connect(self.on_watch_start)
+        self.watch_stop_btn.clicked.connect(self.on_watch_stop)
         self.clear_cache_btn.clicked.connect(self.on_clear_cache_clicked)
+        # folder scan progress lives in the status bar, with a stop button
+        self._scan_worker = None
+        self._scan_label = QLabel('')
+        self._scan_stop_btn = QPushButton('Stop scan')
+        self._scan_stop_btn.clicked.connect(self.cancel_folder_scan)
+        self.statusBar().addPermanentWidget(self._scan_label)
+        self.statusBar().addPermanentWidget(self._scan_stop_btn)
+        # busy/total threads per worker pool
+        self._pool_label = QLabel('')
+        self._pool_label.setToolTip('Worker pools: busy threads / threads (+ thumbnail jobs pending)')
+        self.statusBar().addPermanentWidget(self._pool_label)
+        for name in (POOL_THUMBNAILS, POOL_PREVIEW, POOL_EXPORT, POOL_IO):
+            get_pool(name)
+        self._pool_timer = QTimer(self)
+        self._pool_timer.setInterval(500)
+        self._pool_timer.timeout.connect(self._update_pool_status)
+        self._pool_timer.start()
+        self._scan_label.hide()
+        self._scan_stop_btn.hide()
         # template wiring
         self.template_apply_btn.clicked.connect(self.on_template_apply_clicked)
         self.template_save_btn.clicked.connect(self.on_template_save_as)
@@ -461,20 +650,20 @@ class MainWindow(QMainWindow):
         QPushButton[flat="true"] { border: 1px solid transparent; border-radius: 6px; }
         QPushButton[flat="true"]:hover { background: rgba(68,119,255,0.12); }
         /* Left thumbnail list: dark background and light text for better contrast */
-        QListWidget {
+        QListView {
             background: #2b2b2b;
             color: #e6e6e6;
             border: none;
         }
-        QListWidget::item {
+        QListView::item {
             padding: 6px;
             margin: 2px 4px;
         }
-        QListWidget::item:selected {
+        QListView::item:selected {
             background: #3d6eff;
             color: white;
         }
-        QListWidget::item:hover {
+        QListView::item:hover {
             background: rgba(68,119,255,0.08);
         }
         QLabel#preview_label { border: 1px solid #444; }
@@ -482,7 +671,8 @@ class MainWindow(QMainWindow):
 
         # watermark state
         self.current_image_path = None
-        self.current_preview_pixmap = None
+        # label-sized base of the current image (QImage, see _preview_proxy)
+        self.current_preview_image = None
         self.watermark_color = QColor('#FFFFFF')
         # watermark config for preview/export
         self.watermark_config = {
@@ -505,6 +695,17 @@ class MainWindow(QMainWindow):
 
         # init template system (manager + auto-load last)
         self._init_templates()
+        # batch engine choice persists in the app config
+        cfg = self._app_config if isinstance(getattr(self, '_app_config', None), dict) else {}
+        if cfg.get('export_engine') in ('Threads', 'Processes'):
+            self.export_engine.setCurrentText(cfg['export_engine'])
+        try:
+            if cfg.get('export_workers'):
+                self.export_workers.setValue(int(cfg['export_workers']))
+        except Exception:
+            pass
+        self.export_engine.currentTextChanged.connect(self._save_export_engine)
+        self.export_workers.valueChanged.connect(self._save_export_engine)
 
     # output directory will be chosen at export time; keep no persistent field
 
@@ -809,23 +1010,6 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, 'Export', 'Exporting to the source folder is disabled by default. Please choose another folder.'); return
         fmt = self.export_format.currentText().upper()
         quality = int(self.export_quality.value()) if fmt == 'JPEG' else None
-        # build export config that matches preview scale, and never draw handle
-        cfg = dict(self.watermark_config)
-        cfg['show_handle'] = False
-        try:
-            # original image size (from current preview pixmap which holds the original)
-            bw, bh = self.current_preview_pixmap.width(), self.current_preview_pixmap.height()
-            lw, lh = self.preview_label.width(), self.preview_label.height()
-            scale = min(lw / max(1, bw), lh / max(1, bh))
-            if scale > 0:
-                # scale text and related metrics back to original size
-                cfg['font_size'] = int(max(1, round(self.font_size.value() / scale)))
-                cfg['outline_size'] = int(max(1, round(self.outline_size.value() / scale)))
-                # preview offset was roughly font_size//8; scale it
-                prev_off = max(2, int(self.font_size.value() // 8))
-                cfg['shadow_offset'] = int(max(2, round(prev_off / scale)))
-        except Exception:
-            pass
         # naming
         stem = Path(self.current_image_path).stem
         rule = self.naming_rule.currentText()
@@ -835,33 +1019,28 @@ class MainWindow(QMainWindow):
             stem = f"{stem}{self.name_suffix.text()}"
         ext = '.jpg' if fmt == 'JPEG' else '.png'
         out_path = str(Path(out_dir) / f"{stem}{ext}")
-        # resize
-        target_size = self._calc_target_size(self.current_image_path)
+        # export config matching the preview scale and resize are resolved from the header in export_job
+        job = self._make_export_job(self.current_image_path, out_path, fmt, quality)
         try:
-            export_image(self.current_image_path, cfg, out_path, fmt=fmt, quality=quality, target_size=target_size)
+            export_job(job)
             QMessageBox.information(self, 'Export', f'导出成功\n{out_path}')
         except Exception as e:
             print('Export failed:', e)
 
     def on_export_selected(self):
-        items = self.thumb_list.selectedItems()
-        if not items:
+        rows = sorted(idx.row() for idx in self.thumb_list.selectionModel().selectedRows())
+        if not rows:
             # fallback to current item
-            cur = self.thumb_list.currentItem()
-            if cur:
-                items = [cur]
+            cur = self.thumb_list.currentIndex()
+            if cur.isValid():
+                rows = [cur.row()]
             else:
                 return
-        paths = [it.data(Qt.UserRole) for it in items if it.data(Qt.UserRole)]
+        paths = [p for p in (self.thumb_model.path(r) for r in rows) if p]
         self._export_batch(paths)
 
     def on_export_all(self):
-        paths = []
-        for i in range(self.thumb_list.count()):
-            it = self.thumb_list.item(i)
-            p = it.data(Qt.UserRole)
-            if p:
-                paths.append(p)
+        paths = self.thumb_model.paths()
         if not paths:
             return
         self._export_batch(paths)
@@ -893,98 +1072,230 @@ class MainWindow(QMainWindow):
         self._export_done = 0
         self._export_errors = []
         self._cancel_export = False
-        progress.canceled.connect(lambda: setattr(self, '_cancel_export', True))
 
-        def on_one_finished(worker=None):
-            self._export_done += 1
-            try:
-                progress.setValue(self._export_done)
-            except Exception:
-                pass
-            if progress.wasCanceled():
-                # do not cancel running tasks here; we just stop updating further scheduling
-                pass
-            if self._export_done >= self._export_total:
-                try:
-                    progress.setValue(progress.maximum())
-                    progress.close()
-                    progress.deleteLater()
-                except Exception:
-                    pass
-                self._export_progress = None
-                if self._export_errors:
-                    print('Batch export completed with errors:', len(self._export_errors))
-                    QMessageBox.warning(self, 'Export', f'部分导出失败，共 {len(self._export_errors)} 项。')
-                else:
-                    print('Batch export completed.')
-                    QMessageBox.information(self, 'Export', '全部导出成功')
-            # remove finished worker ref
+        budget = get_export_budget()
+        budget.reset_stats()
+
+        def finish(cancelled: bool = False):
+            self._export_submitter = None
+            budget.log_stats(f'export batch of {self._export_total} ({self._export_done} done)')
             try:
-                if worker in self._running_tasks:
-                    self._running_tasks.remove(worker)
+                progress.setValue(progress.maximum())
+                progress.close()
+                progress.deleteLater()
             except Exception:
                 pass
+            self._export_progress = None
+            if self._export_errors:
+                print('Batch export completed with errors:', len(self._export_errors))
+                QMessageBox.warning(self, 'Export', f'部分导出失败，共 {len(self._export_errors)} 项。')
+            elif cancelled:
+                print(f'Batch export cancelled after {self._export_done} of {self._export_total}.')
+            else:
+                print('Batch export completed.')
+                QMessageBox.information(self, 'Export', '全部导出成功')
 
-        for p in paths:
-            if self._cancel_export:
-                break
-            stem = Path(p).stem
-            ext = '.jpg' if fmt == 'JPEG' else '.png'
-            # naming
-            rule = self.naming_rule.currentText()
-            if rule == 'Prefix':
-                stem = f"{self.name_prefix.text()}{stem}"
-            elif rule == 'Suffix':
-                stem = f"{stem}{self.name_suffix.text()}"
-            out_path = str(out_dir_p / f"{stem}{ext}")
-            # snapshot current config
-            cfg = dict(self.watermark_config)
-            cfg['show_handle'] = False
-            # scale sizes for this specific image relative to preview label
+        def on_one_finished(src=None, err=None):
+            if err is not None:
+                self._export_errors.append((src, err))
+            self._export_done += 1
             try:
-                img = QImage(p)
-                if not img.isNull():
-                    lw, lh = self.preview_label.width(), self.preview_label.height()
-                    scale = min(lw / max(1, img.width()), lh / max(1, img.height()))
-                    if scale > 0:
-                        cfg['font_size'] = int(max(1, round(self.font_size.value() / scale)))
-                        cfg['outline_size'] = int(max(1, round(self.outline_size.value() / scale)))
-                        prev_off = max(2, int(self.font_size.value() // 8))
-                        cfg['shadow_offset'] = int(max(2, round(prev_off / scale)))
+                progress.setValue(self._export_done)
             except Exception:
                 pass
-            target_size = self._calc_target_size(p)
-            worker = Worker(export_image, p, cfg, out_path, fmt, quality, target_size)
-            worker.signals.result.connect(lambda res: None)
-            worker.signals.error.connect(lambda err, src=p: self._export_errors.append((src, err)))
-            worker.signals.finished.connect(lambda w=worker: on_one_finished(w))
-            self._running_tasks.append(worker)
-            self.pool.start(worker)
-
-    def _calc_target_size(self, src_path: str):
-        mode = self.resize_mode.currentText()
-        if mode == 'None':
-            return None
-        img = QImage(src_path)
-        if img.isNull():
-            return None
-        if mode == 'Width':
-            w = int(self.resize_width.value());
-            if w <= 0: return None
-            # keep AR
-            h = max(1, int(round(img.height() * (w / img.width()))))
-            return (w, h)
-        if mode == 'Height':
-            h = int(self.resize_height.value());
-            if h <= 0: return None
-            w = max(1, int(round(img.width() * (h / img.height()))))
-            return (w, h)
-        if mode == 'Percent':
-            p = int(self.resize_percent.value());
-            w = max(1, int(round(img.width() * (p / 100.0))))
-            h = max(1, int(round(img.height() * (p / 100.0))))
-            return (w, h)
-        return None
+
+        # naming and watermark settings are fixed now; jobs are built one at a time as
+        # the engine asks for them, so memory does not grow with the batch size
+        ext = '.jpg' if fmt == 'JPEG' else '.png'
+        rule = self.naming_rule.currentText()
+        prefix = self.name_prefix.text() if rule == 'Prefix' else ''
+        suffix = self.name_suffix.text() if rule == 'Suffix' else ''
+        base = self._make_export_job('', '', fmt, quality)
+
+        def iter_jobs():
+            for p in paths:
+                # images are only probed/decoded inside the worker
+                job = dict(base)
+                job['src'] = p
+                job['out'] = str(out_dir_p / f"{prefix}{Path(p).stem}{suffix}{ext}")
+                yield job
+
+        if self.export_engine.currentText() == 'Processes':
+            self._proc_batch_cb = (on_one_finished, finish)
+            progress.canceled.connect(self._proc_export.cancel)
+            self._proc_export.set_workers(self.export_workers.value())
+            self._proc_export.submit(iter_jobs())
+            return
+
+        # at most one job per pool thread is submitted; Cancel takes the queued ones
+        # back and the rest are skipped before they start
+        # jobs also wait for their share of the export memory budget (see admission.py)
+        token = CancelToken()
+        submitter = WindowedSubmitter(self.pool, functools.partial(export_job_admitted, cancel=token), iter_jobs(),
+                                      pool_queue_depth(POOL_EXPORT), token=token, parent=self)
+        submitter.jobDone.connect(lambda job, res: on_one_finished())
+        submitter.jobFailed.connect(
+            lambda job, err: None if err[0] is AdmissionCancelled else on_one_finished(job['src'] if job else None, err))
+        submitter.finished.connect(finish)
+        progress.canceled.connect(submitter.cancel)
+        progress.canceled.connect(lambda: setattr(self, '_cancel_export', True))
+        self._export_submitter = submitter
+        submitter.start()
+
+    def _on_proc_export_result(self, src: str, err):
+        if self._proc_batch_cb is not None:
+            self._proc_batch_cb[0](src, err)
+
+    def _on_proc_export_finished(self, cancelled: bool):
+        cb, self._proc_batch_cb = self._proc_batch_cb, None
+        if cb is not None:
+            cb[1](cancelled)
+
+    def closeEvent(self, event):
+        # stop background producers; worker processes must not outlive the window
+        try:
+            self.on_watch_stop()
+            self.cancel_folder_scan()
+            self._proc_export.shutdown()
+            if self._export_submitter is not None:
+                self._export_submitter.cancel()
+            self._thumb_sched.cancel_all()
+            shutdown_pools()
+            if self._watch_ledger is not None:
+                self._watch_ledger.close()
+                self._watch_ledger = None
+        except Exception:
+            pass
+        super().closeEvent(event)
+
+    def _update_pool_status(self):
+        parts = []
+        usage = pool_utilization()
+        for name in (POOL_THUMBNAILS, POOL_PREVIEW, POOL_EXPORT, POOL_IO):
+            if name not in usage:
+                continue
+            active, total = usage[name]
+            text = f'{name} {active}/{total}'
+            if name == POOL_THUMBNAILS:
+                queued = self._thumb_sched.pending()
+                if queued:
+                    text += f' (+{queued})'
+            parts.append(text)
+        text = ' · '.join(parts)
+        if text != self._pool_label.text():
+            self._pool_label.setText(text)
+
+    def _save_export_engine(self, *args):
+        try:
+            if not isinstance(self._app_config, dict):
+                self._app_config = {}
+            self._app_config['export_engine'] = self.export_engine.currentText()
+            self._app_config['export_workers'] = int(self.export_workers.value())
+            save_config(self._app_config)
+        except Exception:
+            pass
+
+    def on_watch_start(self):
+        in_dir = QFileDialog.getExistingDirectory(self, 'Select folder to watch', str(Path.home()))
+        if not in_dir:
+            return
+        start_dir = getattr(self, '_last_export_dir', str(Path.home()))
+        out_dir = QFileDialog.getExistingDirectory(self, 'Select output folder', start_dir)
+        if not out_dir:
+            return
+        if os.path.normcase(os.path.normpath(out_dir)) == os.path.normcase(os.path.normpath(in_dir)):
+            QMessageBox.warning(self, 'Watch', 'The output folder must differ from the watched folder.')
+            return
+        self._last_export_dir = out_dir
+        self.on_watch_stop()
+        # settings are fixed when the watch starts: template, format, naming, resize
+        fmt = self.export_format.currentText().upper()
+        quality = int(self.export_quality.value()) if fmt == 'JPEG' else None
+        ext = '.jpg' if fmt == 'JPEG' else '.png'
+        rule = self.naming_rule.currentText()
+        prefix = self.name_prefix.text() if rule == 'Prefix' else ''
+        suffix = self.name_suffix.text() if rule == 'Suffix' else ''
+        base = self._make_export_job('', '', fmt, quality)
+        out_dir_p = Path(out_dir)
+
+        def make_job(src: str) -> dict:
+            job = dict(base)
+            job['src'] = src
+            job['out'] = str(out_dir_p / f"{prefix}{Path(src).stem}{suffix}{ext}")
+            return job
+
+        cfg = self._app_config if isinstance(getattr(self, '_app_config', None), dict) else {}
+        if self._watch_ledger is None:
+            self._watch_ledger = ProcessedLedger(get_hot_folder_ledger_path())
+        watcher = HotFolderWatcher([in_dir], make_job, start=functools.partial(self._start_tracked, pool=POOL_EXPORT),
+                                   ledger=self._watch_ledger,
+                                   settle_secs=float(cfg.get('watch_settle_secs', 1.5)),
+                                   max_queue=int(cfg.get('watch_max_queue', 64)),
+                                   max_in_flight=int(cfg.get('watch_max_in_flight', 2)),
+                                   parent=self)
+        watcher.statsChanged.connect(self._on_watch_stats)
+        watcher.fileFailed.connect(lambda src, msg: print('Watch export failed:', src, msg))
+        self._hot_folder = watcher
+        self._watch_dirs = (in_dir, out_dir)
+        self.watch_start_btn.setEnabled(False)
+        self.watch_stop_btn.setEnabled(True)
+        watcher.start()
+        self._on_watch_stats(watcher.stats())
+
+    def on_watch_stop(self):
+        watcher = self._hot_folder
+        if watcher is None:
+            return
+        self._hot_folder = None
+        # stops now; deleted once its running exports are recorded
+        watcher.delete_when_idle()
+        s = watcher.stats()
+        self.watch_status.setText(f"Stopped: {s['exported']} exported, {s['failed']} failed")
+        self.watch_start_btn.setEnabled(True)
+        self.watch_stop_btn.setEnabled(False)
+
+    def _on_watch_stats(self, s: dict):
+        if self._hot_folder is None:
+            return
+        in_dir, out_dir = self._watch_dirs
+        text = (f"Watching {Path(in_dir).name} → {Path(out_dir).name}\n"
+                f"{s['exported']} exported, {s['failed']} failed, "
+                f"{s['pending'] + s['queued'] + s['in_flight']} waiting\n"
+                f"{s['last_minute']}/min, latency {s['latency_avg']:.1f}s (p95 {s['latency_p95']:.1f}s)")
+        self.watch_status.setText(text)
+
+    def _large_image_mp(self) -> Optional[float]:
+        # megapixel threshold for the large-image export path (config: large_image_mp, null disables)
+        cfg = self._app_config if isinstance(getattr(self, '_app_config', None), dict) else {}
+        val = cfg.get('large_image_mp', LARGE_IMAGE_MP)
+        try:
+            return None if val is None else float(val)
+        except Exception:
+            return LARGE_IMAGE_MP
+
+    def _resize_spec(self) -> dict:
+        return {
+            'mode': self.resize_mode.currentText(),
+            'width': int(self.resize_width.value()),
+            'height': int(self.resize_height.value()),
+            'percent': int(self.resize_percent.value()),
+        }
+
+    def _make_export_job(self, src: str, out_path: str, fmt: str, quality: Optional[int]) -> dict:
+        # snapshot current config; metrics are in preview-label pixels and get
+        # scaled per image (see config_from_preview)
+        cfg = dict(self.watermark_config)
+        cfg['show_handle'] = False
+        return {
+            'src': src,
+            'out': out_path,
+            'config': cfg,
+            'fmt': fmt,
+            'quality': quality,
+            'preview_size': (self.preview_label.width(), self.preview_label.height()),
+            'resize': self._resize_spec(),
+            'large_image_mp': self._large_image_mp(),
+        }
 
     def choose_shadow_color(self):
         col = QColorDialog.getColor(QColor('#000000'), self, 'Select shadow color')
@@ -997,305 +1308,520 @@ class MainWindow(QMainWindow):
     def on_import_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, 'Select images', str(Path.home()),
                                                 'Images (*.jpg *.jpeg *.png *.bmp *.tif *.tiff)')
-        for f in files:
-            self.add_image_item(f)
+        self.add_image_items(files)
 
     def on_import_folder(self):
         folder = QFileDialog.getExistingDirectory(self, 'Select folder', str(Path.home()))
         if not folder:
             return
-        # list images non-recursive for now
-        imgs = list_images_in_folder(folder)
-        for p in imgs:
-            self.add_image_item(p)
-
-    def add_image_item(self, path: str):
-        # avoid duplicates
-        for i in range(self.thumb_list.count()):
-            item = self.thumb_list.item(i)
-            if item.data(Qt.UserRole) == path:
-                return
+        self.scan_folder(folder, recursive=self.scan_recursive_cb.isChecked())
 
-        filename = Path(path).name
-        item = QListWidgetItem(filename)
-        item.setData(Qt.UserRole, path)
-        # placeholder icon
-        item.setIcon(QIcon())
-        # reserve item height so icons have space when they are set later
+    def _scan_options(self) -> dict:
+        # optional config keys: scan_max_depth, scan_include, scan_exclude, scan_symlinks
+        cfg = self._app_config if isinstance(getattr(self, '_app_config', None), dict) else {}
+        opts = {'max_depth': None, 'include': None, 'exclude': None, 'symlinks': SYMLINKS_FILES}
         try:
-            item.setSizeHint(QSize(200, 80))
-        except Exception:
-            pass
-        self.thumb_list.addItem(item)
-        # 轻量清理：导入时触发一次快速配额检查（非阻塞）
-        try:
-            from src.utils.cache import enforce_cache_quota
-            enforce_cache_quota(self.cache_dir, max_bytes=200*1024*1024, max_files=10000, max_age_days=60)
+            depth = cfg.get('scan_max_depth')
+            opts['max_depth'] = None if depth is None else max(0, int(depth))
         except Exception:
             pass
+        for name in ('include', 'exclude'):
+            val = cfg.get('scan_' + name)
+            if isinstance(val, str):
+                val = [v.strip() for v in val.split(';') if v.strip()]
+            if isinstance(val, list) and val:
+                opts[name] = [str(v) for v in val]
+        if cfg.get('scan_symlinks') in ('skip', 'files', 'follow'):
+            opts['symlinks'] = cfg['scan_symlinks']
+        return opts
+
+    def scan_folder(self, folder: str, recursive: bool = False):
+        """Enumerate folder in the background and add images to the list as they are found."""
+        # a new scan replaces the running one
+        self.cancel_folder_scan()
+        worker = StreamWorker(iter_images, folder, recursive=recursive, **self._scan_options())
+        self._scan_worker = worker
+        self._scan_first_chunk = True
+        self._scan_found = 0
+        worker.signals.chunk.connect(lambda paths, w=worker: self._on_scan_chunk(w, paths))
+        worker.signals.progress.connect(lambda n, w=worker: self._on_scan_progress(w, n))
+        worker.signals.error.connect(lambda err: print('Folder scan failed:', folder, err[1]))
+        worker.signals.finished.connect(lambda cancelled, w=worker: self._on_scan_finished(w, cancelled))
+        self._scan_label.setText('Scanning…')
+        self._scan_label.show()
+        self._scan_stop_btn.show()
+        self._start_tracked(worker, pool=POOL_IO)
+
+    def cancel_folder_scan(self):
+        if self._scan_worker is not None:
+            self._scan_worker.cancel()
+            self._scan_worker = None
+            self._scan_label.hide()
+            self._scan_stop_btn.hide()
+
+    def _on_scan_chunk(self, worker, paths):
+        if worker is not self._scan_worker:
+            return
+        # select/preview only for the first chunk, later chunks just append
+        self.add_image_items(paths, select=self._scan_first_chunk)
+        self._scan_first_chunk = False
+
+    def _on_scan_progress(self, worker, count: int):
+        if worker is self._scan_worker:
+            self._scan_found = count
+            self._scan_label.setText(f'Scanning… {count} images found')
+
+    def _on_scan_finished(self, worker, cancelled: bool):
+        if worker is not self._scan_worker:
+            return
+        self._scan_worker = None
+        self._scan_label.hide()
+        self._scan_stop_btn.hide()
+        self.statusBar().showMessage(f'Folder scan finished: {self._scan_found} images', 5000)
+
+    def add_image_item(self, path: str):
+        self.add_image_items([path])
 
-        # auto-select newly added item so user sees preview immediately
-        self.thumb_list.setCurrentItem(item)
-        # call preview loader for immediate feedback
-        self.on_thumb_clicked(item)
+    def add_image_items(self, paths, select: bool = True):
+        """Import many images at once: one model insert, one preview, one scheduling pass."""
+        # duplicates (already listed or repeated in paths) are skipped by the model's path index
+        rows = self.thumb_model.add_paths(paths)
+        if not rows:
+            return
+        if select:
+            index = self.thumb_model.index(rows[-1])
+            # auto-select the last new item so user sees preview immediately; only this
+            # one image is decoded here
+            self.thumb_list.setCurrentIndex(index)
+            self.on_thumb_clicked(index)
+        # generate in the background at the lowest priority, up to THUMB_BACKGROUND_ROWS
+        # jobs in total and nearest the selected (last) row first; rows are promoted
+        # once the view reports them as visible
+        room = max(0, THUMB_BACKGROUND_ROWS - self._thumb_sched.pending())
+        if len(rows) > room:
+            rows = rows[len(rows) - room:] if room else []
+        for row in rows:
+            self._load_thumbnail(row, PRIO_REST)
+
+    def on_visible_rows_changed(self, first: int, last: int):
+        # load thumbnails for the visible rows plus one page either side; drop the rest
+        old_lo, old_hi = self._thumb_window
+        if first < 0:
+            self._thumb_window = (0, -1)
+            return
+        count = self.thumb_model.rowCount()
+        margin = max(8, last - first + 1)
+        lo = max(0, first - margin)
+        hi = min(count - 1, last + margin)
+        self._thumb_window = (lo, hi)
+        self.thumb_model.retain_icons(lo, hi)
+        # rows that left the window fall back to background priority
+        for row in range(old_lo, min(old_hi, count - 1) + 1):
+            if row < lo or row > hi:
+                self._demote_thumbnail(row)
+        for row in range(first, last + 1):
+            self._load_thumbnail(row, PRIO_VISIBLE)
+        for row in range(lo, hi + 1):
+            if row < first or row > last:
+                self._load_thumbnail(row, PRIO_NEAR, min(abs(row - first), abs(row - last)))
+
+    def _demote_thumbnail(self, row: int):
+        path = self.thumb_model.path(row)
+        if path and self.thumb_model.state(row) == THUMB_PENDING:
+            self._thumb_sched.cancel((path, 'exif'))
+            self._thumb_sched.set_priority((path, 'full'), (PRIO_REST, 1, row))
+
+    def _in_thumb_window(self, row: int) -> bool:
+        lo, hi = self._thumb_window
+        return lo <= row <= hi
+
+    def _set_row_icon(self, path: str, pix: QPixmap):
+        row = self.thumb_model.row_of(path)
+        if row is None:
+            return
+        if self._in_thumb_window(row):
+            self.thumb_model.set_icon(row, QIcon(pix), THUMB_READY)
+        else:
+            # scrolled away meanwhile: the icon stays in the memory cache only
+            self.thumb_model.set_state(row, THUMB_NONE)
+
+    def _set_row_failed(self, path: str):
+        row = self.thumb_model.row_of(path)
+        if row is not None:
+            self.thumb_model.mark_failed(row)
+
+    def _load_thumbnail(self, row: int, tier: int = PRIO_VISIBLE, distance: int = 0):
+        # tier/distance order the job in the scheduler (see PRIO_*)
+        model = self.thumb_model
+        state = model.state(row)
+        if state == THUMB_FAILED or (state == THUMB_READY and model.has_icon(row)):
+            return
+        path = model.path(row)
+        if not path:
+            return
+        if state == THUMB_PENDING:
+            self._queue_thumbnail(row, path, None, tier, distance)
+            return
+        if tier == PRIO_REST:
+            # offscreen: only make sure the thumbnail exists, nothing to show yet;
+            # the key (a stat per file) is computed by the job, not here
+            model.set_state(row, THUMB_PENDING)
+            self._queue_thumbnail(row, path, '', tier, distance)
+            return
 
-        # schedule thumbnail creation
-        key = hashlib.sha1(path.encode('utf-8')).hexdigest()
-        dst = str(self.cache_dir / f"{key}.png")
+        key = self._thumb_key(path)
         if getattr(self, '_debug_thumbs', False):
-            print(f'Add item: {path} -> thumbnail dst: {dst}')
+            print(f'Load thumbnail: {path} -> thumbnail key: {key}')
 
-        # if cached thumbnail already exists, set it immediately
+        # re-import / scroll back to an unchanged file: icon still in memory
+        icon_pix = self._thumb_mem.get(key)
+        if icon_pix is not None:
+            model.set_icon(row, QIcon(icon_pix), THUMB_READY)
+            return
+
+        # unchanged file with a thumbnail on record: reuse it, no decoding at all
         try:
-            if os.path.exists(dst):
-                pix = QPixmap(dst)
-                if not pix.isNull():
-                    item.setIcon(QIcon(pix.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)))
+            cat = get_catalog()
+            info = cat.lookup(path) if cat is not None else None
+            if info is not None and info.thumb:
+                pix = self._stored_thumb_pixmap(info.thumb)
+                if pix is not None:
+                    model.set_icon(row, QIcon(self._remember_icon(key, pix)), THUMB_READY)
+                    return
         except Exception:
             pass
 
-        worker = Worker(make_thumbnail, path, dst, (256, 256))
-        worker.signals.result.connect(lambda res, it=item: self.on_thumbnail_ready(res, it))
-        # attach per-item error handler so failed thumbnails still get a placeholder
-        worker.signals.error.connect(lambda err, it=item: self.on_thumbnail_error(err, it))
-        # track finished to know when to refresh all icons once
+        # the key covers size and mtime, so a stored entry is current: use it as is
         try:
-            worker.signals.finished.connect(self.on_thumb_task_finished)
+            pix = self._stored_thumb_pixmap(key)
+            if pix is not None:
+                model.set_icon(row, QIcon(self._remember_icon(key, pix)), THUMB_READY)
+                return
         except Exception:
             pass
-        # increment pending count before start to avoid race
-        try:
-            self._pending_thumbs += 1
-        except Exception:
-            self._pending_thumbs = 1
-        self.pool.start(worker)
 
-    def on_thumbnail_ready(self, dst_path: str, item: QListWidgetItem):
-        if getattr(self, '_debug_thumbs', False):
-            print('on_thumbnail_ready called for item:', item.text(), 'dst_path=', dst_path)
-        # If thumbnail file exists, try to use it. Otherwise try to load original image as fallback.
-        tried_paths = []
-        if dst_path and os.path.exists(dst_path):
-            tried_paths.append(dst_path)
-            # 优先尝试直接加载，失败再走 Pillow 转换
-            try:
-                from src.utils.qt_image import qpixmap_from_path_with_pil
-                pix = qpixmap_from_path_with_pil(dst_path)
-            except Exception:
-                pix = QPixmap(dst_path)
-            if not pix.isNull():
-                icon = QIcon(pix.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                item.setIcon(icon)
-                if getattr(self, '_debug_thumbs', False):
-                    print('  set icon from thumbnail file')
-                return
+        model.set_state(row, THUMB_PENDING)
+        self._queue_thumbnail(row, path, key, tier, distance)
+
+    def _queue_thumbnail(self, row: int, path: str, key: Optional[str], tier: int, distance: int):
+        # queue (or reprioritize, when key is None) the jobs for one row
+        sched = self._thumb_sched
+        # JPEGs: show the EXIF-embedded thumbnail first; these jobs only parse the
+        # header and sort ahead of the full decodes of the same tier, so a large
+        # import fills the visible part of the list almost immediately
+        if (tier != PRIO_REST and Path(path).suffix.lower() in ('.jpg', '.jpeg')
+                and not self.thumb_model.has_icon(row)):
+            sched.submit((path, 'exif'), (tier, 0, distance), read_embedded_thumbnail, path,
+                         on_result=lambda img, p=path: self.on_embedded_thumbnail(img, p))
+        if key is None:
+            sched.set_priority((path, 'full'), (tier, 1, distance))
+            return
+        if key:
+            job = (make_stored_thumbnail, path, self.cache_dir, key, THUMB_SIZE)
+        else:
+            job = (ensure_stored_thumbnail, path, self.cache_dir, THUMB_SIZE)
+        sched.submit((path, 'full'), (tier, 1, distance), *job,
+                     on_result=lambda res, p=path: self.on_thumbnail_ready(res, p),
+                     # failed thumbnails still get a placeholder
+                     on_error=lambda err, p=path: self.on_thumbnail_error(err, p))
+
+    def _thumb_key(self, path: str) -> str:
+        return thumbnail_key(path, THUMB_SIZE)
+
+    def _stored_thumb_pixmap(self, key: str) -> Optional[QPixmap]:
+        data = self._thumb_store.get(key)
+        if not data:
+            return None
+        pix = QPixmap()
+        if not pix.loadFromData(data):
+            return None
+        return pix
 
-        # fallback: try to load the original image directly from the item's stored path
-        orig = item.data(Qt.UserRole)
-        if orig:
-            tried_paths.append(orig)
-            try:
-                from src.utils.qt_image import qpixmap_from_path_with_pil
-                pix2 = qpixmap_from_path_with_pil(orig)
-                if not pix2.isNull():
-                    icon = QIcon(pix2.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                    item.setIcon(icon)
-                    if getattr(self, '_debug_thumbs', False):
-                        print('  set icon from original image')
-                    return
-            except Exception:
-                pass
+    def _remember_icon(self, key: str, pix: QPixmap) -> QPixmap:
+        # scale to icon size once and keep that in the memory cache
+        icon_pix = pix.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._thumb_mem.put(key, icon_pix)
+        return icon_pix
 
-        # next fallback: use PIL to downscale original to small QPixmap
-        if PILImage is not None and orig:
+    def thumbnail_cache_stats(self) -> dict:
+        """Hit/miss/eviction counters and size of the in-memory thumbnail cache."""
+        return self._thumb_mem.stats()
+
+    def _start_tracked(self, worker, priority: int = 0, pool: str = POOL_THUMBNAILS):
+        # keep a reference until the worker finishes, otherwise its signals object
+        # can be collected while the task is still running and results get lost
+        self._running_tasks.append(worker)
+
+        def _drop(*args, w=worker):
             try:
-                img = PILImage.open(orig)
-                try:
-                    _ImageOps = importlib.import_module('PIL.ImageOps')
-                    img = _ImageOps.exif_transpose(img)
-                except Exception:
-                    pass
-                img = img.convert('RGBA')
-                # downscale to a small size for icon
-                img.thumbnail((96, 96))
-                # save to a temp file in cache and load via QPixmap
-                key = hashlib.sha1(orig.encode('utf-8')).hexdigest()
-                tmp_path = str(self.cache_dir / f"tmp_icon_{key}.png")
-                img.save(tmp_path, format='PNG')
-                pix3 = QPixmap(tmp_path)
-                if not pix3.isNull():
-                    icon = QIcon(pix3.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                    item.setIcon(icon)
-                    return
-            except Exception:
+                self._running_tasks.remove(w)
+            except ValueError:
                 pass
+        worker.signals.finished.connect(_drop)
+        get_pool(pool).start(worker, priority)
+
+    def _error_placeholder(self) -> QPixmap:
+        pix = QPixmap(64, 64)
+        pix.fill(QColor('#f8d7da'))
+        painter = QPainter(pix)
+        painter.setPen(QColor('#721c24'))
+        font = QFont()
+        font.setPointSize(10)
+        painter.setFont(font)
+        painter.drawText(pix.rect(), Qt.AlignCenter, 'X')
+        painter.end()
+        return pix
 
-        # final fallback: set a simple error placeholder icon so user sees the failure
+    def on_embedded_thumbnail(self, img, path: str):
+        # interim icon; on_thumbnail_ready replaces it with the decoded thumbnail
+        row = self.thumb_model.row_of(path)
+        if img is None or row is None or self.thumb_model.state(row) != THUMB_PENDING:
+            return
+        if not self._in_thumb_window(row):
+            return
         try:
-            pix = QPixmap(64, 64)
-            pix.fill(QColor('#f8d7da'))
-            painter = QPainter(pix)
-            painter.setPen(QColor('#721c24'))
-            font = QFont()
-            font.setPointSize(10)
-            painter.setFont(font)
-            painter.drawText(pix.rect(), Qt.AlignCenter, 'X')
-            painter.end()
-            item.setIcon(QIcon(pix))
-            if getattr(self, '_debug_thumbs', False):
-                print('  set placeholder icon')
+            from src.utils.qt_image import qimage_from_pil
+            pix = QPixmap.fromImage(qimage_from_pil(img))
+            if not pix.isNull():
+                self.thumb_model.set_icon(row, QIcon(pix.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)))
         except Exception:
-            # fallback: leave empty icon
             pass
 
-    def on_thumb_task_finished(self):
-        # decrease pending thumbnail tasks; when all done, refresh icons once
+    def on_thumbnail_ready(self, thumb_key: str, path: str):
+        if getattr(self, '_debug_thumbs', False):
+            print('on_thumbnail_ready called for:', path, 'thumb_key=', thumb_key)
+        row = self.thumb_model.row_of(path)
+        if row is None or not self._in_thumb_window(row):
+            # offscreen: nothing to decode on the UI thread; a stored thumbnail is
+            # picked up from the store once the row scrolls into view
+            if not thumb_key:
+                self._set_row_failed(path)
+            elif row is not None:
+                self.thumb_model.set_state(row, THUMB_NONE)
+            return
+        key = self._thumb_key(path)
+        icon_pix = self._thumb_mem.get(key)
+        if icon_pix is not None:
+            self._set_row_icon(path, icon_pix)
+            return
+        # If the thumbnail was stored, use it. Otherwise try to load original image as fallback.
+        if thumb_key:
+            try:
+                pix = self._stored_thumb_pixmap(thumb_key)
+            except Exception:
+                pix = None
+            if pix is not None:
+                self._set_row_icon(path, self._remember_icon(key, pix))
+                if getattr(self, '_debug_thumbs', False):
+                    print('  set icon from thumbnail store')
+                return
+
+        # not stored (evicted or unreadable entry): decode the original in the pool
+        self._queue_thumbnail_fallback(path)
+
+    def _queue_thumbnail_fallback(self, path: str):
+        # last resort when no stored thumbnail can be had: a small decode of the original
+        # in the thumbnail pool, never on the UI thread; the row stays pending meanwhile
+        from src.utils.qt_image import qimage_from_path
+        row = self.thumb_model.row_of(path)
+        if row is None:
+            return
+        if self._in_thumb_window(row):
+            priority = (PRIO_VISIBLE, 2, 0)
+        else:
+            priority = (PRIO_REST, 2, row)
+        self.thumb_model.set_state(row, THUMB_PENDING)
+        self._thumb_sched.submit((path, 'fallback'), priority, qimage_from_path, path, THUMB_SIZE,
+                                 on_result=lambda img, p=path: self._on_thumbnail_fallback(img, p),
+                                 on_error=lambda err, p=path: self._set_row_failed(p))
+
+    def _on_thumbnail_fallback(self, img: QImage, path: str):
+        if img is None or img.isNull():
+            # final fallback: an error placeholder so the user sees the failure
+            self._set_row_failed(path)
+            return
         try:
-            self._pending_thumbs -= 1
+            pix = QPixmap.fromImage(img)
+            self._set_row_icon(path, self._remember_icon(self._thumb_key(path), pix))
         except Exception:
-            self._pending_thumbs = 0
-        if self._pending_thumbs <= 0:
-            self._pending_thumbs = 0
-            # debounce a bit to ensure file writes are flushed
-            QTimer.singleShot(120, self._refresh_thumbnails_icons)
+            self._set_row_failed(path)
 
     def _refresh_thumbnails_icons(self):
-        # Iterate all items and try to set icon from cache; fallback to original
-        for i in range(self.thumb_list.count()):
-            item = self.thumb_list.item(i)
-            orig = item.data(Qt.UserRole)
-            if not orig:
-                continue
+        # only rows around the viewport hold icons; (re)load the ones still missing
+        lo, hi = self._thumb_window
+        for row in range(lo, min(hi, self.thumb_model.rowCount() - 1) + 1):
             try:
-                key = hashlib.sha1(orig.encode('utf-8')).hexdigest()
-                dst = str(self.cache_dir / f"{key}.png")
-                pix = None
-                if os.path.exists(dst):
-                    try:
-                        from src.utils.qt_image import qpixmap_from_path_with_pil
-                        pix = qpixmap_from_path_with_pil(dst)
-                    except Exception:
-                        pix = QPixmap(dst)
-                if (pix is None) or pix.isNull():
-                    try:
-                        from src.utils.qt_image import qpixmap_from_path_with_pil
-                        pix = qpixmap_from_path_with_pil(orig)
-                    except Exception:
-                        pix = QPixmap(orig)
-                if pix and not pix.isNull():
-                    item.setIcon(QIcon(pix.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)))
-                else:
-                    # placeholder
-                    tmp = QPixmap(64, 64)
-                    tmp.fill(QColor('#f0f0f0'))
-                    item.setIcon(QIcon(tmp))
+                self._load_thumbnail(row)
             except Exception:
                 pass
+        if getattr(self, '_debug_thumbs', False):
+            print('thumbnail memory cache:', self.thumbnail_cache_stats())
 
     def on_worker_error(self, err_tuple):
         exctype, value, tb = err_tuple
         print('Worker error:', exctype, value)
         print(tb)
 
-    def on_thumbnail_error(self, err_tuple, item: QListWidgetItem):
+    def on_thumbnail_error(self, err_tuple, path: str):
         # 当缩略图生成失败时，尽力从原图直接生成小图标作为兜底
         if getattr(self, '_debug_thumbs', False):
-            print('on_thumbnail_error for', item.text(), 'err=', err_tuple[1])
-        try:
-            orig = item.data(Qt.UserRole)
-            if orig and os.path.exists(orig):
-                pix2 = QPixmap(orig)
-                if not pix2.isNull():
-                    icon = QIcon(pix2.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                    item.setIcon(icon)
-                    return
-        except Exception:
-            pass
+            print('on_thumbnail_error for', path, 'err=', err_tuple[1])
+        if path and os.path.exists(path):
+            self._queue_thumbnail_fallback(path)
+            return
         # 最终占位
         try:
-            pix = QPixmap(64, 64)
-            pix.fill(QColor('#f8d7da'))
-            painter = QPainter(pix)
-            painter.setPen(QColor('#721c24'))
-            font = QFont()
-            font.setPointSize(10)
-            painter.setFont(font)
-            painter.drawText(pix.rect(), Qt.AlignCenter, 'X')
-            painter.end()
-            item.setIcon(QIcon(pix))
+            self._set_row_failed(path)
         except Exception:
             # fallback: no icon
             pass
 
-    def on_thumb_clicked(self, item: QListWidgetItem):
-        path = item.data(Qt.UserRole)
+    def on_thumb_clicked(self, index: QModelIndex):
+        path = index.data(Qt.UserRole)
         if not path:
             return
         # normalize path to avoid mixed slashes
         norm_path = os.path.normpath(path)
+        if norm_path == self.current_image_path and self.current_preview_image is not None:
+            # already open: a click also fires currentChanged, an import selects and
+            # opens; rendering it again would only restart the preview
+            return
         self.current_image_path = norm_path
         # reset anchor to center on new image for predictable behavior
         self.watermark_config['anchor'] = 'center'
         # update position label on the button
         self._update_position_button('center')
 
-        try:
-            from src.utils.qt_image import qpixmap_from_path_with_pil
-            pix = qpixmap_from_path_with_pil(norm_path)
-        except Exception:
-            pix = QPixmap(norm_path)
-        if pix.isNull():
-            # try PIL fallback: open and write a temporary PNG then load
-            if PILImage is not None:
-                try:
-                    key = hashlib.sha1(norm_path.encode('utf-8')).hexdigest()
-                    tmp_path = str(self.cache_dir / f"tmp_preview_{key}.png")
-                    img = PILImage.open(norm_path)
-                    img = img.convert('RGBA')
-                    img.save(tmp_path)
-                    pix = QPixmap(tmp_path)
-                    try:
-                        os.remove(tmp_path)
-                    except Exception:
-                        pass
-                except Exception as e:
-                    print('Preview load fallback failed for', norm_path, '->', e)
-            else:
-                print('Pillow not available: cannot fallback to open', norm_path)
-                # give clearer UI feedback
-                self.preview_label.setText('Unable to load image (Pillow not installed)')
-
-        if pix.isNull():
+        img = self._preview_proxy(norm_path)
+        if img is None:
+            self.current_preview_image = None
             self.preview_label.setText('Unable to load image')
             return
 
-        self.current_preview_pixmap = pix
+        self.current_preview_image = img
+        # switching images is not slider/typing input: render it at full quality and
+        # leave no idle window that would turn the next switch into a draft
+        self._preview_idle_timer.stop()
         self.update_preview()
+        self._preview_idle_timer.stop()
+        self._prefetch_previews(index.row())
+
+    def _preview_proxy(self, path: str, decode: bool = True) -> Optional[QImage]:
+        """The preview base of path fitted to the preview label, decoded once per label size.
+
+        Returns None if the image cannot be read (or, with decode=False, is not cached).
+        """
+        w = max(1, self.preview_label.width())
+        h = max(1, self.preview_label.height())
+        key = (path, w, h)
+        img = self._preview_proxies.get(key)
+        if img is not None or not decode:
+            return img
+        img = _load_preview_proxy(path, w, h)
+        if img.isNull():
+            if PILImage is None:
+                print('Pillow not available: cannot fallback to open', path)
+            return None
+        self._preview_proxies.put(key, img)
+        return img
+
+    def _prefetch_previews(self, row: int):
+        """Decode proxies for the images around row (and the selection) in the background."""
+        self._prefetch_sched.cancel_all()
+        w = max(1, self.preview_label.width())
+        h = max(1, self.preview_label.height())
+        count = self.thumb_model.rowCount()
+        # nearest first, the next image before the previous one
+        wanted = []
+        for d in range(1, PREVIEW_PREFETCH_AHEAD + 1):
+            wanted.append((row + d, (d, 0)))
+            wanted.append((row - d, (d, 1)))
+        try:
+            selected = sorted(idx.row() for idx in self.thumb_list.selectionModel().selectedRows())
+        except Exception:
+            selected = []
+        for i, r in enumerate(selected[:2 * PREVIEW_PREFETCH_AHEAD]):
+            wanted.append((r, (PREVIEW_PREFETCH_AHEAD + 1, i)))
+        for r, priority in wanted:
+            if r == row or not 0 <= r < count:
+                continue
+            path = self.thumb_model.index(r, 0).data(Qt.UserRole)
+            if not path:
+                continue
+            key = (os.path.normpath(path), w, h)
+            if key in self._preview_proxies:
+                continue
+            self._prefetch_sched.submit(key, priority, _load_preview_proxy, key[0], w, h,
+                                        on_result=lambda img, k=key: self._on_preview_prefetched(k, img))
+
+    def _on_preview_prefetched(self, key, img: QImage):
+        if img.isNull():
+            return
+        if key[1:] != (self.preview_label.width(), self.preview_label.height()):
+            # decoded for a label size that is gone
+            return
+        self._preview_proxies.put(key, img)
+
+    def _on_current_thumb_changed(self, current: QModelIndex, previous: QModelIndex):
+        # keyboard navigation; on_thumb_clicked ignores the image already open
+        if current.isValid():
+            self.on_thumb_clicked(current)
+
+    def _on_preview_resize_settled(self):
+        # proxies of the old label size are stale now
+        self._prefetch_sched.cancel_all()
+        self._preview_proxies.clear()
+        if self.current_image_path and self.current_preview_image is not None:
+            self.update_preview()
+            current = self.thumb_list.currentIndex()
+            if current.isValid():
+                self._prefetch_previews(current.row())
 
     def on_external_files_dropped(self, paths: list):
-        # only import the first supported image per request
-        for p in paths:
-            _, ext = os.path.splitext(p.lower())
+        """Import dropped paths: images in one batch, a dropped folder is scanned like Import Folder."""
+        images = []
+        folder = None
+        for path in paths:
+            if folder is None and os.path.isdir(path):
+                folder = path
+                continue
+            _, ext = os.path.splitext(path.lower())
             if ext in SUPPORTED_EXT:
-                self.add_image_item(p)
-                break
+                images.append(path)
+        self.add_image_items(images)
+        if folder is not None:
+            self.scan_folder(folder, recursive=self.scan_recursive_cb.isChecked())
 
     def on_clear_cache_clicked(self):
         try:
             from src.utils.cache import clear_cache_dir
             files_deleted, bytes_freed = clear_cache_dir(self.cache_dir)
+            cat = get_catalog()
+            if cat is not None:
+                cat.clear_thumbs()
+            self._thumb_mem.clear()
             QMessageBox.information(self, 'Cache', f'已清理 {files_deleted} 个文件，释放 {bytes_freed/1024/1024:.1f} MB')
         except Exception as e:
             QMessageBox.warning(self, 'Cache', f'清理失败：{e}')
 
     def update_preview(self):
-        # if there is a current preview pixmap, draw watermark overlay using core compositor
-        if not self.current_preview_pixmap:
+        # collect the watermark config, show the proxy and ask the background
+        # renderer for the stamp; it arrives in _on_preview_stamp_rendered
+        if self.current_preview_image is None:
             return
-        base = self.current_preview_pixmap
         w = self.preview_label.width()
         h = self.preview_label.height()
-        scaled = base.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        base = None
+        if self.current_image_path:
+            # while a resize is in progress only reuse cached proxies
+            base = self._preview_proxy(self.current_image_path,
+                                       decode=not self._preview_resize_timer.isActive())
+        if base is None:
+            base = self.current_preview_image
+            if base.size() != base.size().scaled(w, h, Qt.KeepAspectRatio):
+                base = base.scaled(w, h, Qt.KeepAspectRatio, Qt.FastTransformation)
+        else:
+            self.current_preview_image = base
 
         # update watermark_config from controls
         self.watermark_config.update({
@@ -1321,14 +1847,52 @@ class MainWindow(QMainWindow):
             'shadow_offset': max(2, int(self.font_size.value() // 8)),
         })
 
-        composed = compose_preview_qpixmap(scaled, self.watermark_config)
-        # prevent feedback loop where setting a larger pixmap makes the label expand
-        try:
-            final = composed.scaled(self.preview_label.width(), self.preview_label.height(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        except Exception:
-            final = composed
-
-        self.preview_label.set_preview_pixmap(final)
+        if base.cacheKey() != self._preview_base_key:
+            # the proxy already fits the label; set_preview_pixmap never changes sizeHint
+            self._preview_base_key = base.cacheKey()
+            self.preview_label.set_preview_pixmap(QPixmap.fromImage(base))
+        # a change within the idle interval of the previous one means a slider is
+        # moving or the user is typing: render a draft, refine once input settles
+        interacting = self._preview_idle_timer.isActive()
+        self._preview_idle_timer.start()
+        self._preview_quality = QUALITY_DRAFT if interacting else QUALITY_FULL
+        self.preview_label.set_draft(interacting)
+        if self.watermark_config['text']:
+            self._preview_renderer.request(dict(self.watermark_config), self._preview_quality)
+        else:
+            self._preview_renderer.invalidate()
+            self._preview_stamp = None
+        # place the current stamp right away; a restyled one follows when rendered
+        self._update_preview_overlay()
+
+    def _refine_preview(self):
+        self.preview_label.set_draft(False)
+        if self._preview_quality == QUALITY_DRAFT and self.watermark_config.get('text'):
+            self._preview_quality = QUALITY_FULL
+            self._preview_renderer.request(dict(self.watermark_config), QUALITY_FULL)
+
+    def _on_preview_stamp_rendered(self, generation: int, stamp):
+        self._preview_stamp = stamp
+        self._update_preview_overlay()
+
+    def _update_preview_overlay(self):
+        # position the stamp and the handle over the displayed base
+        pix = self.preview_label._preview_pixmap
+        if pix is None or pix.isNull():
+            return
+        w, h = pix.width(), pix.height()
+        cfg = self.watermark_config
+        stamp = self._preview_stamp
+        image, target = None, None
+        if stamp is not None:
+            image = stamp.image
+            target = stamp_placement(stamp, cfg, w, h)
+        handle = None
+        if cfg.get('show_handle'):
+            p = cfg.get('position', {'x': 0.5, 'y': 0.5})
+            # handle size relative to image size
+            handle = (int(p.get('x', 0.5) * w), int(p.get('y', 0.5) * h), max(6, int(min(w, h) * 0.02)))
+        self.preview_label.set_overlay(image, target, handle)
 
     def choose_color(self):
         col = QColorDialog.getColor(self.watermark_color, self, 'Select watermark color')
@@ -1364,14 +1928,8 @@ class MainWindow(QMainWindow):
             event.acceptProposedAction()
 
     def dropEvent(self, event):
-        urls = event.mimeData().urls()
-        for u in urls:
-            path = u.toLocalFile()
-            if not path:
-                continue
-            _, ext = os.path.splitext(path.lower())
-            if ext in SUPPORTED_EXT:
-                self.add_image_item(path)
+        paths = [u.toLocalFile() for u in event.mimeData().urls()]
+        self.on_external_files_dropped([p for p in paths if p])
 
     def on_preview_pos_changed(self, rx: float, ry: float):
         # update watermark position (relative)
@@ -1382,7 +1940,8 @@ class MainWindow(QMainWindow):
         self._update_position_button('center')
         # update preview with or without handle based on checkbox
         self.watermark_config['show_handle'] = bool(self.show_handle_cb.isChecked())
-        self.update_preview()
+        # only the overlay moves; the stamp itself does not depend on the position
+        self._update_preview_overlay()
 
     def _update_position_button(self, anchor: str):
         try:
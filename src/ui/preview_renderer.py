@@ -0,0 +1,85 @@
+"""Background preview rendering, latest request wins.
+
+Every control change asks for a new preview layer, often faster than one can be
+rendered. The renderer keeps at most one job in the preview pool; requests made
+meanwhile replace each other, so only the newest arguments are rendered next.
+Each request gets a generation id and a result is only delivered if it is newer
+than the last one shown, so a slow stale render never overwrites a fresher one.
+"""
+from typing import Callable, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from src.utils.logger import get_logger
+from src.utils.pools import POOL_PREVIEW, get_pool
+from src.utils.workers import Worker
+
+_log = get_logger('preview')
+
+
+class PreviewRenderer(QObject):
+    """Run render(*args) off the UI thread; rendered(generation, result) on the UI thread.
+
+    render must be thread-safe and work on QImage (e.g. get_watermark_stamp).
+    start(worker) runs a Worker; by default the shared preview pool is used.
+    """
+    rendered = Signal(int, object)
+
+    def __init__(self, render: Callable, start: Optional[Callable] = None, parent=None):
+        super().__init__(parent)
+        self._render = render
+        if start is None:
+            start = get_pool(POOL_PREVIEW).start
+        self._start = start
+        self._generation = 0
+        self._shown = 0         # newest generation delivered
+        self._floor = 0         # results up to this generation are dropped
+        self._pending = None    # (generation, args) waiting for the running job
+        self._running: Optional[Worker] = None
+        self.dropped = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def request(self, *args) -> int:
+        """Queue render(*args), replacing a request not started yet; returns its generation id.
+
+        Pass copies of anything the caller keeps mutating (e.g. the config dict).
+        """
+        self._generation += 1
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = (self._generation, args)
+        if self._running is None:
+            self._kick()
+        return self._generation
+
+    def invalidate(self):
+        """Drop queued work and every result requested so far."""
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = None
+        self._floor = self._generation
+
+    def _kick(self):
+        generation, args = self._pending
+        self._pending = None
+        worker = Worker(self._render, *args)
+        worker.signals.result.connect(lambda res, g=generation: self._on_result(g, res))
+        worker.signals.error.connect(lambda err: _log.warning(f"preview render failed: {err[1]}"))
+        worker.signals.finished.connect(self._on_finished)
+        self._running = worker
+        self._start(worker)
+
+    def _on_result(self, generation: int, result):
+        if generation <= self._shown or generation <= self._floor:
+            self.dropped += 1
+            return
+        self._shown = generation
+        self.rendered.emit(generation, result)
+
+    def _on_finished(self):
+        self._running = None
+        if self._pending is not None:
+            self._kick()
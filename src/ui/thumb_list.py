@@ -0,0 +1,223 @@
+"""Virtualized thumbnail list: an array-backed model plus the list view showing it.
+
+The model keeps only paths (a list plus a path -> row dict) and one state byte per
+row. Icons exist just for the rows the view reported as visible or near; the
+window drops the rest, so memory stays bounded however many images are loaded.
+"""
+import os
+from typing import Dict, Iterable, List, Optional
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPoint, QSize, Qt, QTimer, Signal
+from PySide6.QtGui import QIcon
+from PySide6.QtWidgets import QAbstractItemView, QListView
+
+# per-row thumbnail state
+THUMB_NONE = 0      # nothing loaded
+THUMB_PENDING = 1   # worker queued/running, interim icon allowed
+THUMB_READY = 2     # final icon set
+THUMB_FAILED = 3    # failed_icon shown, do not retry
+
+ITEM_SIZE = QSize(200, 80)
+
+
+class ThumbListModel(QAbstractListModel):
+    """List model over image paths; Qt.UserRole returns the path of a row."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._paths: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._state = bytearray()
+        self._icons: Dict[int, QIcon] = {}
+        # shown for THUMB_FAILED rows; one shared icon instead of one per row
+        self.failed_icon: Optional[QIcon] = None
+
+    # -- Qt model API ----------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if row >= len(self._paths):
+            return None
+        if role == Qt.DisplayRole:
+            return os.path.basename(self._paths[row])
+        if role == Qt.DecorationRole:
+            icon = self._icons.get(row)
+            if icon is None and self._state[row] == THUMB_FAILED:
+                return self.failed_icon
+            return icon
+        if role == Qt.UserRole:
+            return self._paths[row]
+        if role == Qt.ToolTipRole:
+            return self._paths[row]
+        if role == Qt.SizeHintRole:
+            return ITEM_SIZE
+        return None
+
+    # -- rows ------------------------------------------------------------------
+
+    def add_paths(self, paths: Iterable[str]) -> List[int]:
+        """Append paths not already listed; returns the new rows."""
+        new = []
+        seen = set()
+        for p in paths:
+            if p in self._rows or p in seen:
+                continue
+            seen.add(p)
+            new.append(p)
+        if not new:
+            return []
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        for i, p in enumerate(new):
+            self._rows[p] = first + i
+        self._paths.extend(new)
+        self._state.extend(bytes(len(new)))
+        self.endInsertRows()
+        return list(range(first, first + len(new)))
+
+    def clear(self):
+        self.beginResetModel()
+        self._paths = []
+        self._rows = {}
+        self._state = bytearray()
+        self._icons = {}
+        self.endResetModel()
+
+    def path(self, row: int) -> Optional[str]:
+        if 0 <= row < len(self._paths):
+            return self._paths[row]
+        return None
+
+    def paths(self) -> List[str]:
+        return list(self._paths)
+
+    def row_of(self, path: str) -> Optional[int]:
+        return self._rows.get(path)
+
+    # -- thumbnails ------------------------------------------------------------
+
+    def state(self, row: int) -> int:
+        return self._state[row] if 0 <= row < len(self._state) else THUMB_NONE
+
+    def set_state(self, row: int, state: int):
+        if 0 <= row < len(self._state):
+            self._state[row] = state
+
+    def has_icon(self, row: int) -> bool:
+        return row in self._icons
+
+    def set_icon(self, row: int, icon: QIcon, state: Optional[int] = None):
+        if not (0 <= row < len(self._paths)):
+            return
+        self._icons[row] = icon
+        if state is not None:
+            self._state[row] = state
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+    def mark_failed(self, row: int):
+        if not (0 <= row < len(self._paths)):
+            return
+        self._icons.pop(row, None)
+        self._state[row] = THUMB_FAILED
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+    def retain_icons(self, first: int, last: int):
+        """Drop icons outside rows first..last; their rows reload when shown again."""
+        for row in [r for r in self._icons if r < first or r > last]:
+            del self._icons[row]
+            if self._state[row] == THUMB_READY:
+                self._state[row] = THUMB_NONE
+
+
+class ThumbListView(QListView):
+    """Thumbnail list view: accepts external file drops and reports the visible rows."""
+    filesDropped = Signal(list)
+    # first, last row currently in the viewport (-1, -1 when empty)
+    visibleRangeChanged = Signal(int, int)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # every row has the same size: lets Qt lay out 50k rows without asking each one
+        self.setUniformItemSizes(True)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        try:
+            self.setAcceptDrops(True)
+            self.setDropIndicatorShown(True)
+            # only accept drops (no internal drag), and treat as copy
+            self.setDragDropMode(QAbstractItemView.DropOnly)
+            self.setDefaultDropAction(Qt.CopyAction)
+            # QAbstractItemView handles events on viewport
+            self.viewport().setAcceptDrops(True)
+        except Exception:
+            pass
+        # coalesce scroll/resize/insert bursts into one range report
+        self._range_timer = QTimer(self)
+        self._range_timer.setSingleShot(True)
+        self._range_timer.setInterval(30)
+        self._range_timer.timeout.connect(self._emit_visible_range)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_range_update)
+
+    def setModel(self, model):
+        super().setModel(model)
+        if model is not None:
+            model.rowsInserted.connect(self.schedule_range_update)
+            model.modelReset.connect(self.schedule_range_update)
+
+    def schedule_range_update(self, *args):
+        self._range_timer.start()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_range_update()
+
+    def _row_near(self, y: int, step: int) -> int:
+        # probe a few pixels so list spacing between items does not miss a row
+        x = max(1, self.spacing() + 1)
+        for dy in range(0, max(8, self.spacing() * 2 + 2), 2):
+            idx = self.indexAt(QPoint(x, y + dy * step))
+            if idx.isValid():
+                return idx.row()
+        return -1
+
+    def visible_range(self):
+        model = self.model()
+        count = model.rowCount() if model is not None else 0
+        if count == 0:
+            return -1, -1
+        rect = self.viewport().rect()
+        first = self._row_near(rect.top(), 1)
+        last = self._row_near(rect.bottom(), -1)
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = count - 1
+        return first, max(first, last)
+
+    def _emit_visible_range(self):
+        first, last = self.visible_range()
+        self.visibleRangeChanged.emit(first, last)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        # every local file and folder; the window sorts out what to import
+        paths = [u.toLocalFile() for u in event.mimeData().urls()]
+        paths = [p for p in paths if p]
+        if paths:
+            self.filesDropped.emit(paths)
+        event.acceptProposedAction()
+
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+        else:
+            event.ignore()
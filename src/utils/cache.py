@@ -1,8 +1,16 @@
+import hashlib
 import os
-import shutil
-import time
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from src.utils.thumb_store import INDEX_NAME, PACK_NAME, get_thumb_store
+
+# default thumbnail cache limits
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+CACHE_MAX_FILES = 10000
+CACHE_MAX_AGE_DAYS = 60
 
 
 def get_dir_size(path: Path) -> int:
@@ -19,83 +27,147 @@ def get_dir_size(path: Path) -> int:
     return total
 
 
-def clear_cache_dir(path: Path) -> Tuple[int, int]:
-    """Delete all files under path and recreate dir. Returns (files_deleted, bytes_freed)."""
+def _remove_loose_files(path: Path) -> Tuple[int, int]:
+    """Delete files other than the thumbnail store itself (e.g. PNGs left by the
+    old one-file-per-thumbnail layout). The cache dir is flat, so no walk."""
+    keep = (PACK_NAME, INDEX_NAME)
     files_deleted = 0
     bytes_freed = 0
-    if path.exists():
-        for root, _, files in os.walk(path):
-            for f in files:
-                fp = Path(root) / f
-                try:
-                    sz = fp.stat().st_size
-                except Exception:
-                    sz = 0
-                try:
-                    fp.unlink(missing_ok=True)
-                    files_deleted += 1
-                    bytes_freed += sz
-                except Exception:
-                    pass
-    path.mkdir(parents=True, exist_ok=True)
-    return files_deleted, bytes_freed
-
-
-def enforce_cache_quota(path: Path, *, max_bytes: int = 200 * 1024 * 1024, max_files: int = 10000, max_age_days: int = 60) -> Tuple[int, int]:
-    """Ensure cache directory stays within limits by deleting old files.
-    Returns (files_deleted, bytes_freed).
-    """
-    now = time.time()
-    max_age_sec = max(0, max_age_days) * 24 * 3600
-    entries = []  # (path, size, mtime)
-    if not path.exists():
-        path.mkdir(parents=True, exist_ok=True)
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
         return 0, 0
-    for root, _, files in os.walk(path):
-        for f in files:
-            fp = Path(root) / f
-            try:
-                st = fp.stat()
-                entries.append((fp, st.st_size, st.st_mtime))
-            except Exception:
-                pass
-
-    files_deleted = 0
-    bytes_freed = 0
-
-    # 先删过期文件
-    if max_age_sec > 0:
-        for fp, sz, mt in list(entries):
-            if now - mt > max_age_sec:
-                try:
-                    fp.unlink(missing_ok=True)
-                    files_deleted += 1
-                    bytes_freed += sz
-                    entries.remove((fp, sz, mt))
-                except Exception:
-                    pass
-
-    # 检查总量与数量
-    total_bytes = sum(sz for _, sz, _ in entries)
-    total_files = len(entries)
-
-    if total_files <= max_files and total_bytes <= max_bytes:
-        return files_deleted, bytes_freed
-
-    # 按 mtime 从旧到新排序，优先删除旧文件
-    entries.sort(key=lambda t: t[2])
-    i = 0
-    while (total_files > max_files or total_bytes > max_bytes) and i < len(entries):
-        fp, sz, _ = entries[i]
+    for entry in entries:
+        if not entry.is_file() or entry.name.startswith(keep):
+            continue
         try:
-            fp.unlink(missing_ok=True)
+            sz = entry.stat().st_size
+            os.unlink(entry.path)
             files_deleted += 1
             bytes_freed += sz
-            total_files -= 1
-            total_bytes -= sz
-            i += 1
         except Exception:
-            i += 1
             pass
+    return files_deleted, bytes_freed
 
+
+def clear_cache_dir(path: Path) -> Tuple[int, int]:
+    """Empty the thumbnail store in path. Returns (files_deleted, bytes_freed)."""
+    path.mkdir(parents=True, exist_ok=True)
+    files_deleted, bytes_freed = get_thumb_store(path).clear()
+    loose_files, loose_bytes = _remove_loose_files(path)
+    return files_deleted + loose_files, bytes_freed + loose_bytes
+
+
+def enforce_cache_quota(path: Path, *, max_bytes: int = CACHE_MAX_BYTES, max_files: int = CACHE_MAX_FILES, max_age_days: int = CACHE_MAX_AGE_DAYS) -> Tuple[int, int]:
+    """Full quota pass over the thumbnail store in path: recount from the index,
+    drop expired entries, evict least recently used ones and compact if needed.
+    Also installs the size limits so later writes are kept in bounds incrementally;
+    meant to run once at startup, off the UI thread.
+    Returns (files_deleted, bytes_freed).
+    """
+    store = get_thumb_store(path)
+    store.rescan()
+    store.set_quota(max_bytes=max_bytes, max_files=max_files)
+    files_deleted, bytes_freed = store.enforce_quota(max_bytes=max_bytes, max_files=max_files, max_age_days=max_age_days)
+    if store.created_new:
+        # first run with the packed store: drop the old per-image PNGs once
+        store.created_new = False
+        loose_files, loose_bytes = _remove_loose_files(path)
+        files_deleted += loose_files
+        bytes_freed += loose_bytes
     return files_deleted, bytes_freed
+
+
+def thumbnail_key(path: str, size: Tuple[int, int]) -> str:
+    """Cache key for a thumbnail of path at size.
+
+    Built from the path, the file's byte size and mtime and the requested size, so
+    a file edited in place gets a new key instead of its stale thumbnail.
+    """
+    try:
+        st = os.stat(path)
+        stamp = f"{st.st_size}|{st.st_mtime_ns}"
+    except OSError:
+        stamp = "0|0"
+    raw = f"{os.path.normcase(os.path.abspath(path))}|{stamp}|{int(size[0])}x{int(size[1])}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ByteLRU:
+    """Thread-safe LRU bounded by the summed byte cost of its values.
+
+    cost(value) returns the bytes a value holds (e.g. width * height * 4 for a
+    decoded image). Hit/miss/eviction counters are kept for tuning the budget.
+    """
+
+    def __init__(self, max_bytes: int, cost: Callable[[Any], int]):
+        self.max_bytes = int(max_bytes)
+        self._cost = cost
+        self._items = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        nbytes = max(0, int(self._cost(value)))
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if nbytes > self.max_bytes:
+                # larger than the whole budget: never cache
+                return
+            self._items[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, sz) = self._items.popitem(last=False)
+                self._bytes -= sz
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> dict:
+        """Counters and current size: hits, misses, hit_rate, evictions, entries, bytes."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -17,3 +17,11 @@ def get_logs_dir() -> Path:
 
 def get_templates_dir() -> Path:
     return get_temp_base_dir() / 'templates'
+
+
+def get_catalog_path() -> Path:
+    return get_temp_base_dir() / 'catalog.sqlite3'
+
+
+def get_hot_folder_ledger_path() -> Path:
+    return get_temp_base_dir() / 'hot_folder.sqlite3'
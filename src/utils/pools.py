@@ -0,0 +1,101 @@
+"""Named thread pools, one per kind of work.
+
+Thumbnails, previews, exports and file I/O (folder scans, cache maintenance)
+each get their own QThreadPool, so a long export cannot starve the thumbnails
+or the preview. Thread count, thread priority and queue depth come from
+get_pool_settings() (config key 'pools').
+"""
+import threading
+from typing import Dict, Optional
+
+from PySide6.QtCore import QThread, QThreadPool
+
+from src.config.config_store import DEFAULT_POOLS, get_pool_settings
+
+POOL_THUMBNAILS = 'thumbnails'
+POOL_PREVIEW = 'preview'
+POOL_EXPORT = 'export'
+POOL_IO = 'io'
+
+_PRIORITIES = {
+    'lowest': QThread.LowestPriority,
+    'low': QThread.LowPriority,
+    'normal': QThread.NormalPriority,
+    'high': QThread.HighPriority,
+}
+
+_pools: Dict[str, QThreadPool] = {}
+_queues: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _default_threads(name: str, cpus: int) -> int:
+    if name == POOL_EXPORT:
+        # leave one core for the UI and the interactive pools
+        return max(1, cpus - 1)
+    if name == POOL_THUMBNAILS:
+        return max(2, cpus // 2)
+    return 2
+
+
+def _configure(pool: QThreadPool, name: str, settings: dict):
+    cpus = max(1, QThread.idealThreadCount())
+    try:
+        threads = int(settings.get('threads') or 0)
+    except Exception:
+        threads = 0
+    pool.setMaxThreadCount(threads if threads > 0 else _default_threads(name, cpus))
+    prio = _PRIORITIES.get(str(settings.get('priority', 'normal')).lower(), QThread.NormalPriority)
+    try:
+        pool.setThreadPriority(prio)
+    except Exception:
+        pass
+    try:
+        queue = int(settings.get('queue') or 0)
+    except Exception:
+        queue = 0
+    _queues[name] = queue if queue > 0 else pool.maxThreadCount()
+
+
+def get_pool(name: str) -> QThreadPool:
+    """The shared pool for name (one of the POOL_* names)."""
+    if name not in DEFAULT_POOLS:
+        raise KeyError(f"Unknown pool: {name}")
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = QThreadPool()
+            pool.setObjectName(f'pool-{name}')
+            _configure(pool, name, get_pool_settings().get(name, DEFAULT_POOLS[name]))
+            _pools[name] = pool
+        return pool
+
+
+def pool_queue_depth(name: str) -> int:
+    """How many jobs a scheduler feeding this pool should keep submitted."""
+    get_pool(name)
+    return _queues[name]
+
+
+def reconfigure_pools(cfg: Optional[dict] = None):
+    """Apply changed settings to the pools already created."""
+    settings = get_pool_settings(cfg)
+    with _lock:
+        for name, pool in _pools.items():
+            _configure(pool, name, settings.get(name, DEFAULT_POOLS[name]))
+
+
+def pool_utilization() -> Dict[str, tuple]:
+    """name -> (active threads, max threads) for the pools created so far."""
+    with _lock:
+        return {name: (pool.activeThreadCount(), pool.maxThreadCount()) for name, pool in _pools.items()}
+
+
+def shutdown_pools(msecs: int = 2000):
+    """Wait briefly for running jobs and drop everything still queued."""
+    with _lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.clear()
+    for pool in pools:
+        pool.waitForDone(msecs)
@@ -1,4 +1,7 @@
-from PySide6.QtGui import QImage, QPixmap
+import math
+
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QImage, QImageIOHandler, QImageReader, QPixmap
 
 def qimage_from_pil(img):
     """Convert a Pillow Image to QImage (deep-copied to own memory)."""
@@ -11,22 +14,60 @@ def qimage_from_pil(img):
     return qimg.copy()
 
 
-def qpixmap_from_path_with_pil(path: str):
-    """Try load QPixmap directly; if fails, use Pillow to decode then convert to QPixmap."""
-    pm = QPixmap(path)
-    if not pm.isNull():
-        return pm
-    # fallback via PIL
-    try:
-        import importlib
-        PILImage = importlib.import_module('PIL.Image')
-        img = PILImage.open(path)
-        from PIL import ImageOps as _IO
+def qimage_from_path(path: str, max_size=None) -> QImage:
+    """Decode path to a QImage, falling back to Pillow; null QImage on failure.
+
+    EXIF orientation is applied so previews match exports and probe_image_size.
+    With max_size=(w, h) the image is decoded reduced: JPEGs at the smallest
+    power-of-two DCT scale that still covers the fitted size (QImageReader
+    setScaledSize), then smoothly scaled to fit inside max_size.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    if max_size and bytes(reader.format()).lower() in (b'jpeg', b'jpg'):
+        raw = reader.size()
+        if raw.isValid():
+            bw, bh = int(max_size[0]), int(max_size[1])
+            if reader.transformation() & QImageIOHandler.TransformationRotate90:
+                bw, bh = bh, bw
+            scale = min(bw / raw.width(), bh / raw.height())
+            if scale < 1.0:
+                fw, fh = raw.width() * scale, raw.height() * scale
+                k = 1
+                while k < 8 and raw.width() / (k * 2) >= fw and raw.height() / (k * 2) >= fh:
+                    k *= 2
+                if k > 1:
+                    reader.setScaledSize(QSize(math.ceil(raw.width() / k), math.ceil(raw.height() / k)))
+    qimg = reader.read()
+    if qimg.isNull():
+        # fallback via PIL
         try:
-            img = _IO.exif_transpose(img)
+            from src.io.thumbnailer import open_image_reduced
+            if max_size:
+                img = open_image_reduced(path, max_size)
+            else:
+                import importlib
+                PILImage = importlib.import_module('PIL.Image')
+                img = PILImage.open(path)
+                from PIL import ImageOps as _IO
+                try:
+                    img = _IO.exif_transpose(img)
+                except Exception:
+                    pass
+            qimg = qimage_from_pil(img)
         except Exception:
-            pass
-        qimg = qimage_from_pil(img)
-        return QPixmap.fromImage(qimg)
-    except Exception:
+            return QImage()
+    if max_size and (qimg.width() > max_size[0] or qimg.height() > max_size[1]):
+        qimg = qimg.scaled(int(max_size[0]), int(max_size[1]), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return qimg
+
+
+def qpixmap_from_path_with_pil(path: str, max_size=None):
+    """Try load QPixmap directly; if fails, use Pillow to decode then convert to QPixmap.
+
+    See qimage_from_path for orientation and max_size handling.
+    """
+    qimg = qimage_from_path(path, max_size)
+    if qimg.isNull():
         return QPixmap()
+    return QPixmap.fromImage(qimg)
@@ -0,0 +1,310 @@
+"""Packed thumbnail store.
+
+All thumbnails live in one append-only pack file (thumbs.pack) next to a SQLite
+index (thumbs.index.sqlite3) mapping each cache key to (offset, length, crc).
+Reads go through a read-only mmap of the pack. Replacing or deleting an entry
+only updates the index; the old bytes become dead space that compact() reclaims
+by rewriting the live entries into a fresh pack.
+
+Entry count and live/dead byte totals are kept in memory and updated on every
+write, so quota checks never walk the filesystem. With set_quota() limits in
+place, put() evicts least recently used entries itself; rescan() recounts from
+the index and is only needed once per start.
+"""
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+PACK_NAME = 'thumbs.pack'
+INDEX_NAME = 'thumbs.index.sqlite3'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    crc INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+'''
+_INDEX_ACCESSED = 'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)'
+
+# last-access times are only rewritten when older than this, so reads rarely write
+_TOUCH_INTERVAL = 3600.0
+# compact when dead space exceeds both this and the live data
+_COMPACT_MIN_DEAD = 8 * 1024 * 1024
+
+
+class ThumbStore:
+    """Thread-safe pack + index store for encoded thumbnails (bytes by key)."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pack_path = self.directory / PACK_NAME
+        self.index_path = self.directory / INDEX_NAME
+        # True when this opened a fresh store (callers may migrate old cache files)
+        self.created_new = not self.pack_path.exists()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False, timeout=10)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        except Exception:
+            pass
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_INDEX_ACCESSED)
+        self._conn.commit()
+        self._pack = open(self.pack_path, 'a+b')
+        self._map = None
+        # limits applied on every put(); None = unlimited
+        self.max_bytes = None
+        self.max_files = None
+        self._recount()
+
+    def _recount(self):
+        count, live = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM entries').fetchone()
+        self._count = int(count)
+        self._live_bytes = int(live)
+        self._pack_size = os.path.getsize(self.pack_path)
+
+    # -- internals -------------------------------------------------------------
+
+    def _unmap(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except Exception:
+                pass
+            self._map = None
+
+    def _read(self, offset: int, length: int) -> Optional[bytes]:
+        end = offset + length
+        if end > self._pack_size:
+            return None
+        if self._map is None or len(self._map) < end:
+            # pack grew since it was mapped
+            self._unmap()
+            self._pack.flush()
+            self._map = mmap.mmap(self._pack.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:end]
+
+    def _evict_lru(self, max_bytes: int, max_files: int):
+        """Drop least recently used rows until within both limits (no commit)."""
+        if self._count <= max_files and self._live_bytes <= max_bytes:
+            return []
+        cur = self._conn.execute('SELECT key, length FROM entries ORDER BY accessed')
+        rows = []
+        count, live = self._count, self._live_bytes
+        for k, n in cur:
+            if count <= max_files and live <= max_bytes:
+                break
+            rows.append((k, n))
+            count -= 1
+            live -= n
+        cur.close()
+        self._drop_rows(rows)
+        return rows
+
+    def _maybe_compact(self):
+        if self.dead_bytes > max(_COMPACT_MIN_DEAD, self._live_bytes):
+            self.compact()
+
+    def _drop_rows(self, rows):
+        """Delete (key, length) rows from the index and update the counters."""
+        if not rows:
+            return
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k, _ in rows])
+        self._count -= len(rows)
+        self._live_bytes -= sum(int(n) for _, n in rows)
+
+    # -- public API ------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Stored bytes for key, or None (missing or failed crc check)."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT offset, length, crc, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            offset, length, crc, accessed = row
+            try:
+                data = self._read(offset, length)
+            except Exception:
+                data = None
+            if data is None or zlib.crc32(data) != crc:
+                # torn write or interrupted compaction: treat as a miss
+                self._drop_rows([(key, length)])
+                self._conn.commit()
+                return None
+            now = time.time()
+            if now - accessed > _TOUCH_INTERVAL:
+                self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+            return data
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM entries WHERE key = ?', (key,)).fetchone() is not None
+
+    def put(self, key: str, data: bytes):
+        """Append data to the pack and point key at it (replacing any old entry)."""
+        data = bytes(data)
+        with self._lock:
+            self._pack.seek(0, os.SEEK_END)
+            offset = self._pack.tell()
+            self._pack.write(data)
+            self._pack.flush()
+            self._pack_size = offset + len(data)
+            old = self._conn.execute('SELECT length FROM entries WHERE key = ?', (key,)).fetchone()
+            if old is not None:
+                self._drop_rows([(key, old[0])])
+            now = time.time()
+            self._conn.execute(
+                'INSERT INTO entries (key, offset, length, crc, created, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, offset, len(data), zlib.crc32(data), now, now))
+            self._count += 1
+            self._live_bytes += len(data)
+            if self.max_bytes is not None or self.max_files is not None:
+                max_bytes = self.max_bytes if self.max_bytes is not None else self._live_bytes
+                max_files = self.max_files if self.max_files is not None else self._count
+                self._evict_lru(max_bytes, max_files)
+            self._conn.commit()
+            self._maybe_compact()
+
+    def set_quota(self, *, max_bytes: Optional[int] = None, max_files: Optional[int] = None):
+        """Limits enforced incrementally by put(); None disables a limit."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.max_files = max_files
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._conn.execute('SELECT length FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._drop_rows([(key, row[0])])
+                self._conn.commit()
+
+    def clear(self) -> Tuple[int, int]:
+        """Drop every entry and truncate the pack. Returns (entries_deleted, bytes_freed)."""
+        with self._lock:
+            deleted, freed = self._count, self._pack_size
+            self._conn.execute('DELETE FROM entries')
+            self._conn.commit()
+            self._unmap()
+            self._pack.truncate(0)
+            self._pack.flush()
+            self._pack_size = 0
+            self._count = 0
+            self._live_bytes = 0
+            return deleted, freed
+
+    def enforce_quota(self, *, max_bytes: int, max_files: int, max_age_days: int) -> Tuple[int, int]:
+        """Evict expired, then least recently used entries until within limits.
+
+        Only the accessed index is touched, O(log n) per evicted entry. Returns
+        (entries_deleted, bytes_freed); freed bytes only leave the disk once the
+        pack is compacted, which happens here when dead space has grown large.
+        """
+        deleted = 0
+        freed = 0
+        with self._lock:
+            if max_age_days > 0:
+                cutoff = time.time() - max_age_days * 24 * 3600
+                rows = self._conn.execute(
+                    'SELECT key, length FROM entries WHERE accessed < ?', (cutoff,)).fetchall()
+                self._drop_rows(rows)
+                deleted += len(rows)
+                freed += sum(n for _, n in rows)
+            rows = self._evict_lru(max_bytes, max(0, max_files))
+            deleted += len(rows)
+            freed += sum(n for _, n in rows)
+            if deleted:
+                self._conn.commit()
+            self._maybe_compact()
+        return deleted, freed
+
+    def rescan(self):
+        """Recount entries and bytes from the index and the pack size on disk."""
+        with self._lock:
+            self._recount()
+
+    def compact(self) -> int:
+        """Rewrite live entries into a new pack; returns the bytes reclaimed."""
+        with self._lock:
+            before = self._pack_size
+            tmp_path = self.pack_path.with_name(PACK_NAME + '.tmp')
+            rows = self._conn.execute('SELECT key, offset, length FROM entries ORDER BY offset').fetchall()
+            moves = []
+            pos = 0
+            with open(tmp_path, 'wb') as out:
+                for key, offset, length in rows:
+                    data = self._read(offset, length)
+                    if data is None:
+                        continue
+                    out.write(data)
+                    moves.append((pos, key))
+                    pos += length
+            # a crash between the replace and the commit leaves offsets that fail
+            # the crc check on read, i.e. cache misses, never wrong thumbnails
+            self._unmap()
+            self._pack.close()
+            try:
+                self._conn.executemany('UPDATE entries SET offset = ? WHERE key = ?', moves)
+                os.replace(tmp_path, self.pack_path)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                self._pack = open(self.pack_path, 'a+b')
+                self._pack_size = os.path.getsize(self.pack_path)
+            lost = len(rows) - len(moves)
+            if lost:
+                kept = {k for _, k in moves}
+                self._drop_rows([(k, n) for k, _, n in rows if k not in kept])
+                self._conn.commit()
+            return before - self._pack_size
+
+    @property
+    def dead_bytes(self) -> int:
+        return max(0, self._pack_size - self._live_bytes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': self._count,
+                'live_bytes': self._live_bytes,
+                'dead_bytes': self.dead_bytes,
+                'pack_bytes': self._pack_size,
+            }
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+            try:
+                self._pack.close()
+            except Exception:
+                pass
+            self._conn.close()
+
+
+_stores: Dict[str, ThumbStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_thumb_store(directory: Path) -> ThumbStore:
+    """Shared ThumbStore for directory (one per process and directory)."""
+    key = os.path.normcase(os.path.abspath(str(directory)))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ThumbStore(Path(directory))
+            _stores[key] = store
+        return store
@@ -1,4 +1,8 @@
-from PySide6.QtCore import QObject, Signal, QRunnable, Slot
+from PySide6.QtCore import QObject, Signal, QRunnable, Slot, QTimer
+import heapq
+import itertools
+import threading
+import time
 import traceback
 import sys
 
@@ -31,3 +35,257 @@ class Worker(QRunnable):
             self.signals.result.emit(result)
         finally:
             self.signals.finished.emit()
+
+
+class CancelToken:
+    """Thread-safe cancellation flag; calling it returns whether it was cancelled."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def __call__(self) -> bool:
+        return self._event.is_set()
+
+
+_SKIPPED = object()
+
+
+class WindowedSubmitter(QObject):
+    """Feed a (lazy) sequence of jobs to a QThreadPool, at most max_in_flight at a time.
+
+    fn(job) runs in the pool. The next job is only created and submitted when one
+    finishes, so memory does not depend on the batch size. cancel() takes the
+    queued workers back out of the pool and jobs that reach a thread afterwards
+    are skipped, so only the ones already running complete.
+    """
+    jobDone = Signal(object, object)     # job, result
+    jobFailed = Signal(object, tuple)    # job, (exctype, value, tb)
+    finished = Signal(bool)              # True if cancelled
+
+    def __init__(self, pool, fn, jobs, max_in_flight: int = None, priority: int = 0,
+                 token: CancelToken = None, parent=None):
+        super().__init__(parent)
+        self.pool = pool
+        self.fn = fn
+        self._jobs = iter(jobs)
+        self.max_in_flight = max(1, max_in_flight or pool.maxThreadCount())
+        self.priority = priority
+        # pass a token in to let fn check it too (e.g. while it waits for a resource)
+        self.token = token if token is not None else CancelToken()
+        self._in_flight = {}
+        self._exhausted = False
+        self._done = False
+
+    def start(self):
+        self._fill()
+
+    def cancel(self):
+        if self._done or self.token.cancelled:
+            return
+        self.token.cancel()
+        for worker in list(self._in_flight):
+            if self.pool.tryTake(worker):
+                # never started: it will not emit anything
+                del self._in_flight[worker]
+        self._check_done()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _run_one(self, job):
+        # the token is checked right before the job starts
+        if self.token.cancelled:
+            return _SKIPPED
+        return self.fn(job)
+
+    def _fill(self):
+        while not self.token.cancelled and not self._exhausted and len(self._in_flight) < self.max_in_flight:
+            try:
+                job = next(self._jobs)
+            except StopIteration:
+                self._exhausted = True
+                break
+            except Exception:
+                # building the job failed: report it like a failed run
+                exctype, value = sys.exc_info()[:2]
+                self.jobFailed.emit(None, (exctype, value, traceback.format_exc()))
+                continue
+            worker = Worker(self._run_one, job)
+            worker.signals.result.connect(lambda res, j=job: self._on_result(j, res))
+            worker.signals.error.connect(lambda err, j=job: self.jobFailed.emit(j, err))
+            worker.signals.finished.connect(lambda w=worker: self._on_finished(w))
+            self._in_flight[worker] = job
+            self.pool.start(worker, self.priority)
+        self._check_done()
+
+    def _on_result(self, job, result):
+        if result is not _SKIPPED:
+            self.jobDone.emit(job, result)
+
+    def _on_finished(self, worker):
+        self._in_flight.pop(worker, None)
+        self._fill()
+
+    def _check_done(self):
+        if self._done or self._in_flight:
+            return
+        if self._exhausted or self.token.cancelled:
+            self._done = True
+            self.finished.emit(self.token.cancelled)
+
+
+class StreamWorkerSignals(QObject):
+    """Signals of a StreamWorker."""
+    chunk = Signal(list)
+    progress = Signal(int)  # items produced so far
+    error = Signal(tuple)
+    finished = Signal(bool)  # True if cancelled
+
+
+class StreamWorker(QRunnable):
+    """Run a generator function in the thread pool and emit its items in chunks.
+
+    fn is called as fn(*args, cancel=<callable>, **kwargs) and must yield items.
+    The first item is emitted at once; after that items are batched up to
+    chunk_size or chunk_interval seconds, so the receiver is not flooded. cancel()
+    stops the generator at its next check.
+    """
+    def __init__(self, fn, *args, chunk_size: int = 500, chunk_interval: float = 0.25, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+        self.signals = StreamWorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    @Slot()
+    def run(self):
+        buf = []
+        count = 0
+        last_emit = 0.0
+        try:
+            for item in self.fn(*self.args, cancel=self.is_cancelled, **self.kwargs):
+                if self._cancelled:
+                    break
+                buf.append(item)
+                count += 1
+                now = time.monotonic()
+                if len(buf) >= self.chunk_size or now - last_emit >= self.chunk_interval:
+                    self.signals.chunk.emit(buf)
+                    self.signals.progress.emit(count)
+                    buf = []
+                    last_emit = now
+            if buf and not self._cancelled:
+                self.signals.chunk.emit(buf)
+                self.signals.progress.emit(count)
+        except Exception:
+            exctype, value = sys.exc_info()[:2]
+            tb = traceback.format_exc()
+            self.signals.error.emit((exctype, value, tb))
+        finally:
+            self.signals.finished.emit(self._cancelled)
+
+
+class PriorityScheduler(QObject):
+    """Runs keyed jobs on a thread pool, lowest priority value first.
+
+    Only max_in_flight jobs are handed to the pool at a time; everything else waits
+    here, where it can still be reprioritized or cancelled. Priorities are any
+    comparable values (e.g. tuples). start is called as start(worker) to launch a
+    Worker, so callers can keep references to running workers.
+    """
+    idle = Signal()
+
+    def __init__(self, start, max_in_flight: int = 4, parent=None):
+        super().__init__(parent)
+        self._start = start
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._heap = []      # (priority, seq, key); stale when seq != self._queued[key][1]
+        self._queued = {}    # key -> [priority, seq, fn, args, on_result, on_error]
+        self._running = set()
+        self._seq = itertools.count()
+        self._pump_pending = False
+
+    def submit(self, key, priority, fn, *args, on_result=None, on_error=None):
+        """Queue fn(*args) under key; a key already queued only gets the new priority."""
+        if key in self._running:
+            return
+        if key in self._queued:
+            self.set_priority(key, priority)
+            return
+        seq = next(self._seq)
+        self._queued[key] = [priority, seq, fn, args, on_result, on_error]
+        heapq.heappush(self._heap, (priority, seq, key))
+        self._schedule_pump()
+
+    def set_priority(self, key, priority):
+        entry = self._queued.get(key)
+        if entry is None or entry[0] == priority:
+            return
+        seq = next(self._seq)
+        entry[0], entry[1] = priority, seq
+        heapq.heappush(self._heap, (priority, seq, key))
+        if len(self._heap) > 4 * len(self._queued) + 64:
+            # mostly stale entries from reprioritizing: rebuild
+            self._heap = [(e[0], e[1], k) for k, e in self._queued.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, key) -> bool:
+        """Drop a queued job; jobs already running are left to finish."""
+        return self._queued.pop(key, None) is not None
+
+    def cancel_all(self):
+        self._queued.clear()
+        self._heap = []
+
+    def is_queued(self, key) -> bool:
+        return key in self._queued
+
+    def pending(self) -> int:
+        return len(self._queued) + len(self._running)
+
+    def _schedule_pump(self):
+        # coalesce submits of one event-loop turn, so they are ordered before starting
+        if not self._pump_pending:
+            self._pump_pending = True
+            QTimer.singleShot(0, self._pump)
+
+    def _pump(self):
+        self._pump_pending = False
+        while len(self._running) < self.max_in_flight and self._heap:
+            priority, seq, key = heapq.heappop(self._heap)
+            entry = self._queued.get(key)
+            if entry is None or entry[1] != seq:
+                continue
+            del self._queued[key]
+            _, _, fn, args, on_result, on_error = entry
+            worker = Worker(fn, *args)
+            if on_result is not None:
+                worker.signals.result.connect(on_result)
+            if on_error is not None:
+                worker.signals.error.connect(on_error)
+            worker.signals.finished.connect(lambda k=key: self._finished(k))
+            self._running.add(key)
+            self._start(worker)
+        if not self._running and not self._queued:
+            self._heap = []
+            self.idle.emit()
+
+    def _finished(self, key):
+        self._running.discard(key)
+        self._pump()
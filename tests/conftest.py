@@ -0,0 +1,27 @@
+import os
+import sys
+from pathlib import Path
+
+# Qt must not need a display; the repo root makes `src` importable
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PySide6.QtGui import QGuiApplication
+    return QGuiApplication.instance() or QGuiApplication([])
+
+
+@pytest.fixture
+def gray16():
+    """Factory writing a flat 16-bit grayscale image: gray16(path, value, size) -> str(path)."""
+    import numpy as np
+    from PIL import Image
+
+    def make(path, value=30000, size=(600, 400)):
+        Image.fromarray(np.full(size[::-1], value, np.uint16)).save(path)
+        return str(path)
+    return make
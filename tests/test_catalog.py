@@ -0,0 +1,16 @@
+from src.io import catalog
+
+
+def test_failed_open_is_not_retried(monkeypatch):
+    calls = []
+
+    def broken(path):
+        calls.append(path)
+        raise OSError('disk I/O error')
+
+    monkeypatch.setattr(catalog, 'ImageCatalog', broken)
+    monkeypatch.setattr(catalog, '_catalog', None)
+    monkeypatch.setattr(catalog, '_catalog_failed', False)
+    assert catalog.get_catalog() is None
+    assert catalog.get_catalog() is None
+    assert len(calls) == 1
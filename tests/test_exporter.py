@@ -0,0 +1,53 @@
+import numpy as np
+from PIL import Image
+
+from src.io.pil_exporter import export_image_large
+
+CONFIG = {'text': 'Watermark', 'font_size': 36, 'opacity': 0.8, 'color': '#ffffff',
+          'position': {'x': 0.5, 'y': 0.5}, 'anchor': 'center'}
+
+
+def test_large_path_keeps_16bit_depth(tmp_path, gray16):
+    src = gray16(tmp_path / 'g16.tif')
+    out = export_image_large(src, CONFIG, str(tmp_path / 'out.tif'), 'TIFF')
+    img = Image.open(out)
+    assert img.mode == 'I;16'
+    px = np.asarray(img.convert('I'))
+    # untouched pixels keep their 16-bit value; no clipped block around the text
+    assert px[0, 0] == 30000
+    assert (px == 255).sum() == 0
+    assert (px == 30000).mean() > 0.9
+    # white text at 80% opacity: 0.8 * 65535 + 0.2 * 30000
+    assert abs(int(px.max()) - 58428) <= 2
+
+
+def test_large_path_16bit_to_jpeg_is_scaled_not_clipped(tmp_path, gray16):
+    src = gray16(tmp_path / 'g16.tif')
+    out = export_image_large(src, CONFIG, str(tmp_path / 'out.jpg'), 'JPEG', quality=95)
+    px = np.asarray(Image.open(out).convert('L'))
+    assert abs(int(px[0, 0]) - 117) <= 2
+
+
+def test_large_path_16bit_resized(tmp_path, gray16):
+    src = gray16(tmp_path / 'g16.tif')
+    out = export_image_large(src, CONFIG, str(tmp_path / 'out.png'), 'PNG', target_size=(300, 200))
+    img = Image.open(out)
+    assert img.size == (300, 200)
+    assert np.asarray(img.convert('I'))[0, 0] == 30000
+
+
+def test_large_path_cmyk_to_png(tmp_path):
+    src = tmp_path / 'cmyk.tif'
+    Image.new('CMYK', (600, 400), (0, 200, 200, 0)).save(src)
+    out = export_image_large(str(src), CONFIG, str(tmp_path / 'out.png'), 'PNG')
+    img = Image.open(out)
+    assert img.mode == 'RGB'
+    r, g, b = img.getpixel((5, 5))
+    assert r > 200 and g < 80 and b < 80
+
+
+def test_large_path_rgba_to_jpeg(tmp_path):
+    src = tmp_path / 'rgba.png'
+    Image.new('RGBA', (600, 400), (20, 40, 200, 128)).save(src)
+    out = export_image_large(str(src), CONFIG, str(tmp_path / 'out.jpg'), 'JPEG')
+    assert Image.open(out).mode == 'RGB'
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.core.pil_compositor import open_for_export
+
+
+def _sources(tmp_path, gray16):
+    Image.new('RGB', (600, 400), (200, 40, 40)).convert('P', palette=Image.ADAPTIVE).save(tmp_path / 'pal.png')
+    Image.new('1', (600, 400), 1).save(tmp_path / 'bw.png')
+    return [str(tmp_path / 'pal.png'), str(tmp_path / 'bw.png'), gray16(tmp_path / 'g16.tif')]
+
+
+@pytest.mark.parametrize('native_mode', [False, True])
+def test_open_for_export_reduces_palette_bilevel_and_16bit(tmp_path, gray16, native_mode):
+    for path in _sources(tmp_path, gray16):
+        img, src_size = open_for_export(path, (300, 200), native_mode=native_mode)
+        assert src_size == (600, 400)
+        assert img.size == (300, 200)
+
+
+def test_open_for_export_native_keeps_16bit(tmp_path, gray16):
+    img, _ = open_for_export(gray16(tmp_path / 'g16.tif'), (300, 200), native_mode=True)
+    assert img.mode == 'I;16'
+    assert img.getpixel((10, 10)) == 30000
+
+
+# ----- parity with the Qt compositor -----
+
+PARITY_BASE = {'text': 'Watermark 2024', 'font_family': 'DejaVu Sans', 'font_size': 36,
+               'opacity': 0.8, 'color': '#ffffff'}
+PARITY_CASES = {
+    'plain': {},
+    'rotation': {'rotation': 30},
+    'outline': {'outline': True, 'outline_size': 3},
+    'shadow': {'shadow': True, 'shadow_alpha': 0.6},
+    'top-left': {'anchor': 'top-left', 'position': {'x': 0.1, 'y': 0.1}},
+    'bottom-right': {'anchor': 'bottom-right', 'position': {'x': 0.9, 'y': 0.9}},
+}
+
+
+def _parity_sources(tmp_path, gray16):
+    Image.new('RGB', (600, 400), (60, 90, 160)).save(tmp_path / 'rgb.png')
+    Image.new('RGBA', (600, 400), (60, 90, 160, 255)).save(tmp_path / 'rgba.png')
+    Image.new('L', (600, 400), 90).save(tmp_path / 'l.png')
+    Image.new('RGB', (600, 400), (60, 90, 160)).convert('P', palette=Image.ADAPTIVE).save(tmp_path / 'p.png')
+    gray16(tmp_path / 'g16.tif')
+    return {name: str(tmp_path / name) for name in ('rgb.png', 'rgba.png', 'l.png', 'p.png', 'g16.tif')}
+
+
+def _qt_rgb(qimg):
+    from PySide6.QtGui import QImage
+    q = qimg.convertToFormat(QImage.Format_RGB888)
+    w, h = q.width(), q.height()
+    rows = np.frombuffer(q.constBits(), np.uint8, q.bytesPerLine() * h).reshape(h, q.bytesPerLine())
+    return rows[:, :w * 3].reshape(h, w, 3).astype(int)
+
+
+def _ink_bbox(img, background):
+    ys, xs = np.nonzero(np.abs(img - background).sum(-1) > 30)
+    assert len(xs), 'no watermark drawn'
+    return xs.min(), ys.min(), xs.max(), ys.max()
+
+
+@pytest.mark.parametrize('case', sorted(PARITY_CASES))
+def test_pil_compositor_matches_qt(qapp, tmp_path, gray16, case):
+    from src.core.image_processor import compose_export_qimage
+    from src.core.pil_compositor import compose_image_pil, resolve_font_path
+
+    if resolve_font_path('DejaVu Sans') is None:
+        pytest.skip('DejaVu Sans not installed')
+    cfg = dict(PARITY_BASE, **PARITY_CASES[case])
+    for name, path in _parity_sources(tmp_path, gray16).items():
+        background = _qt_rgb(compose_export_qimage(path, {'text': ''}))
+        qt = _qt_rgb(compose_export_qimage(path, cfg))
+        pil = np.asarray(compose_image_pil(path, cfg).convert('RGB')).astype(int)
+        assert qt.shape == pil.shape, name
+        # same source pixels (16-bit sources scaled like Qt, not clipped)
+        assert np.abs(pil[0, 0] - background[0, 0]).max() <= 1, name
+        qb, pb = _ink_bbox(qt, background), _ink_bbox(pil, background)
+        # FreeType and Qt advance widths differ by a few percent
+        tolerance = max(6, 0.03 * (qb[2] - qb[0]))
+        assert max(abs(a - b) for a, b in zip(qb, pb)) <= tolerance, (name, qb, pb)
+        assert np.abs(qt - pil).mean() < 4.0, name
+
+
+def test_font_fallback_when_glyphs_are_missing(monkeypatch):
+    import src.core.pil_compositor as pc
+
+    serif = '/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf'
+    sans = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+    if not (os.path.exists(serif) and os.path.exists(sans)):
+        pytest.skip('DejaVu fonts not installed')
+    # DejaVu Serif has no Hebrew; DejaVu Sans stands in for a CJK fallback here
+    monkeypatch.setattr(pc, '_font_index', {
+        ('dejavu serif', False, False): (serif, 0),
+        ('noto sans cjk sc', False, False): (sans, 0),
+    })
+    assert pc.resolve_font('DejaVu Serif', text='Watermark') == (serif, 0)
+    assert pc.resolve_font('DejaVu Serif', text='Watermark א') == (sans, 0)
+    # unknown family: the first fallback that covers the text
+    assert pc.resolve_font('No Such Font', text='א') == (sans, 0)
@@ -0,0 +1,23 @@
+import io
+
+from PIL import Image
+
+from src.io.thumbnailer import open_image_reduced, render_thumbnail
+
+
+def test_16bit_tiff_thumbnail(tmp_path, gray16):
+    src = gray16(tmp_path / 'g16.tif', size=(1800, 1200))
+    data = render_thumbnail(src, (256, 256))
+    assert data is not None
+    thumb = Image.open(io.BytesIO(data))
+    assert thumb.size == (256, 171)
+    # scaled like Qt reads it (30000 / 257), not clipped to white
+    assert abs(thumb.convert('L').getpixel((10, 10)) - 117) <= 1
+
+
+def test_open_image_reduced_palette_and_bilevel(tmp_path):
+    Image.new('RGB', (1800, 1200), (200, 40, 40)).convert('P', palette=Image.ADAPTIVE).save(tmp_path / 'pal.png')
+    Image.new('1', (1800, 1200), 1).save(tmp_path / 'bw.png')
+    for name in ('pal.png', 'bw.png'):
+        img = open_image_reduced(str(tmp_path / name), (256, 256))
+        assert img.size == (450, 300)